@@ -0,0 +1,93 @@
+"""
+Benchmark dos backends de modelo (`backends.py`): vazão por tamanho de lote.
+
+Compara, sobre os mesmos arrays (256, 256, 3) de `preprocess_image`
+(imagens sintéticas de `synthetic.py`):
+    - heuristic: regras de cor (`extract_color_features_batch` + limiares);
+    - onnx: modelo de teste em float32;
+    - onnx-int8: o mesmo modelo quantizado (`<modelo>.int8.onnx`).
+
+Reporta imagens/s (melhor de `--repeat`) para cada tamanho de lote e
+número de threads intra-op, e a concordância dos rótulos com a heurística.
+
+Uso:
+    python benchmarks/bench_backends.py [--images 256] [--batch 1 8 32] [--threads 1 0]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from synthetic import CLASS_MIXES, make_array
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def make_arrays(model, n: int, seed: int = 0) -> np.ndarray:
+    """Lote (n, 256, 256, 3) de imagens sintéticas com frações de manchas variadas."""
+    rng = np.random.default_rng(seed)
+    kinds = list(CLASS_MIXES)
+    arrays = [
+        model.preprocess_image(Image.fromarray(
+            make_array(kinds[i % len(kinds)], 0.3, seed=20_000 + i, spot_fraction=float(rng.uniform(0, 0.45)))
+        ))
+        for i in range(n)
+    ]
+    return np.stack(arrays)
+
+
+def throughput(backend, arrays: np.ndarray, batch_size: int, repeat: int) -> float:
+    """Imagens por segundo classificando `arrays` em lotes de `batch_size`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(arrays), batch_size):
+            backend.classify_batch(arrays[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return len(arrays) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 0],
+                        help="Threads intra-op do ONNX Runtime (0 = padrão)")
+    parser.add_argument("--model", default=None, help="Modelo ONNX (padrão: modelo de teste)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from backends import ONNX_MODEL_PATH, HeuristicBackend, OnnxBackend
+    from core import SimpleAgroVisionModel
+
+    model = SimpleAgroVisionModel()
+    arrays = make_arrays(model, args.images)
+    path = args.model or ONNX_MODEL_PATH
+
+    # Um backend por vez: cada sessão do ONNX Runtime guarda a própria arena
+    backends = [("heuristic", "-", lambda: HeuristicBackend(model))]
+    for threads in args.threads:
+        for name, int8 in (("onnx", False), ("onnx-int8", True)):
+            backends.append((name, threads, lambda t=threads, q=int8: OnnxBackend(
+                model, path, intra_op_threads=t, int8=q, max_batch_size=max(args.batch),
+            )))
+
+    reference = [status for _, _, status in HeuristicBackend(model).classify_batch(arrays)]
+    print(f"{args.images} imagens 256x256, {os.cpu_count()} CPUs, modelo {os.path.basename(path)}")
+    header = "".join(f"{f'lote {b}':>10}" for b in args.batch)
+    print(f"{'backend':<11}{'threads':>8}{header}{'concordância':>14}   (imagens/s)")
+    for name, threads, factory in backends:
+        backend = factory()
+        rates = "".join(f"{throughput(backend, arrays, b, args.repeat):>10.0f}" for b in args.batch)
+        statuses = [status for _, _, status in backend.classify_batch(arrays)]
+        agreement = np.mean([a == b for a, b in zip(statuses, reference)])
+        print(f"{name:<11}{threads:>8}{rates}{agreement:>14.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark do micro-batching: classificação por requisição vs. `MicroBatcher`.
+
+Simula C clientes concorrentes, cada um enviando arrays 256x256 já
+pré-processados em sequência, e mede para cada configuração:
+    - vazão (classificações por segundo)
+    - latência por requisição (p50 e p99, em ms)
+
+"individual" é o caminho sem agrupamento: cada requisição roda
+`extract_color_features` + `classify_features` no pool de threads.
+
+Uso:
+    python benchmarks/bench_batching.py [--clients 1 8 64] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def make_arrays(n: int, seed: int = 0) -> list:
+    """Arrays com proporções variadas de verde e manchas (rótulos misturados)."""
+    rng = np.random.default_rng(seed)
+    arrays = []
+    for i in range(n):
+        base = rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)
+        base[..., 1] = np.maximum(base[..., 1], (i * 37) % 256)
+        arrays.append(base)
+    return arrays
+
+
+async def run_clients(classify, arrays: list, clients: int, total: int) -> tuple:
+    latencies = []
+    next_index = 0
+
+    async def client() -> None:
+        nonlocal next_index
+        while next_index < total:
+            array = arrays[next_index % len(arrays)]
+            next_index += 1
+            t0 = time.perf_counter()
+            await classify(array)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+async def bench(model, arrays: list, clients: int, total: int, mode: str, batch_size: int, wait_ms: float):
+    from batching import MicroBatcher
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+    if mode == "individual":
+        def scalar(array):
+            features = model.extract_color_features(array)
+            return model.classify_features(features, array)
+
+        async def classify(array):
+            return await loop.run_in_executor(executor, scalar, array)
+
+        result = await run_clients(classify, arrays, clients, total)
+    else:
+        batcher = MicroBatcher(model, max_batch_size=batch_size, max_wait_ms=wait_ms)
+        result = await run_clients(batcher.submit, arrays, clients, total)
+        await batcher.close()
+
+    executor.shutdown()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[1.0, 2.0])
+    parser.add_argument("--feature-kernel", default="float")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from core import SimpleAgroVisionModel
+
+    model = SimpleAgroVisionModel(feature_kernel=args.feature_kernel)
+    arrays = make_arrays(64)
+
+    modes = [("individual", 0.0)] + [("lote", w) for w in args.wait_ms]
+    print(f"{'clientes':>9}  {'modo':<16}{'vazão (/s)':>12}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for clients in args.clients:
+        for mode, wait_ms in modes:
+            throughput, p50, p99 = asyncio.run(
+                bench(model, arrays, clients, args.requests, mode, args.batch_size, wait_ms)
+            )
+            name = mode if mode == "individual" else f"lote {wait_ms:g} ms"
+            print(f"{clients:>9}  {name:<16}{throughput:>12.0f}{p50:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Validação e benchmark da cascata de resoluções (`cascade.CascadeClassifier`).
+
+Conjunto rotulado sintético (`synthetic.py`), com sementes diferentes das
+usadas na calibração das tolerâncias:
+    - as três classes (healthy/stressed/damaged), rotuladas por `EXPECTED_STATUS`;
+    - uma varredura da fração de manchas em torno dos limiares (0 a 40%),
+      rotulada pelo caminho completo (256x256);
+    - fotos de 12 MP com manchas quadradas pequenas (6, 8 e 10 px, 2 a 30%
+      da folha), que o resize mistura à folha: o caso em que amostrar a
+      miniatura sem o mesmo filtro do caminho completo muda o status.
+
+Para cada formato e conjunto, confere que a cascata dá o mesmo status que o caminho
+completo em todas as imagens (e o esperado nas classes), conta o estágio
+que decidiu cada uma e compara o tempo por imagem (arquivo em memória:
+decodificação + análise).
+
+Uso:
+    python benchmarks/bench_cascade.py [--megapixels 0.3 2 8] [--seeds 3] [--formats jpeg png]
+                                       [--spot-px 6 8 10] [--spot-megapixels 12]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from synthetic import EXPECTED_STATUS, make_file
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Sementes da validação (a calibração usou 0 a ~1100)
+SEED_OFFSET = 5000
+
+SWEEP = np.round(np.linspace(0.0, 0.4, 21), 3)
+SPOT_SWEEP = np.round(np.linspace(0.02, 0.30, 15), 3)
+
+
+def make_samples(directory: str, megapixels, seeds: int, fmt: str):
+    """[(caminho, status esperado ou None)]"""
+    samples = []
+    for mp in megapixels:
+        for seed in range(SEED_OFFSET, SEED_OFFSET + seeds):
+            for kind, status in EXPECTED_STATUS.items():
+                samples.append((make_file(directory, kind, mp, fmt, seed), status))
+            for i, fraction in enumerate(SWEEP):
+                kind = list(EXPECTED_STATUS)[i % len(EXPECTED_STATUS)]
+                samples.append((make_file(directory, kind, mp, fmt, seed, float(fraction)), None))
+    return samples
+
+
+def make_spot_samples(directory: str, spot_sizes, megapixels: float, seeds: int, fmt: str):
+    """[(caminho, None)]: folhas com manchas quadradas de `spot_px` pixels."""
+    return [
+        (make_file(directory, "healthy", megapixels, fmt, seed, float(fraction), spot_px), None)
+        for spot_px in spot_sizes
+        for seed in range(SEED_OFFSET, SEED_OFFSET + seeds)
+        for fraction in SPOT_SWEEP
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.3, 2.0, 8.0])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--formats", nargs="+", default=["jpeg", "png"])
+    parser.add_argument("--spot-px", type=int, nargs="*", default=[6, 8, 10],
+                        help="lados das manchas pequenas (vazio: pula o conjunto)")
+    parser.add_argument("--spot-megapixels", type=float, default=12.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from cascade import CascadeClassifier
+    from core import SimpleAgroVisionModel
+
+    model = SimpleAgroVisionModel()
+    cascade = CascadeClassifier(model)
+
+    def full_path(data: bytes):
+        img_array = model.preprocess_image(Image.open(io.BytesIO(data)))
+        return model.classify_features(model.extract_color_features(img_array), img_array)[2]
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'formato':<8}{'conjunto':<10}{'imagens':>8}{'iguais':>8}{'classes ok':>12}"
+              f"{'ms completo':>13}{'ms cascata':>12}{'ganho':>7}   estágios")
+        for fmt, group in ((fmt, group) for fmt in args.formats for group in ("suaves", "pontuais")):
+            if group == "suaves":
+                samples = make_samples(tmp, args.megapixels, args.seeds, fmt)
+            elif args.spot_px:
+                samples = make_spot_samples(tmp, args.spot_px, args.spot_megapixels, 1, fmt)
+            else:
+                continue
+            blobs = []
+            for path, _ in samples:
+                with open(path, "rb") as f:
+                    blobs.append(f.read())
+
+            references = [full_path(data) for data in blobs]
+            decisions = [cascade.classify(data) for data in blobs]
+            agree = sum(d.status == r for d, r in zip(decisions, references))
+            labelled = [(d.status, expected) for d, (_, expected) in zip(decisions, samples) if expected]
+            class_ok = sum(status == expected for status, expected in labelled)
+            stages = Counter(d.stage for d in decisions)
+            for (path, _), decision, reference in zip(samples, decisions, references):
+                if decision.status != reference:
+                    failed = True
+                    print(f"  DIVERGE {os.path.basename(path)}: cascata {decision.status} "
+                          f"(estágio {decision.stage}) x completo {reference}")
+
+            timings = {}
+            for name, fn in (("completo", full_path), ("cascata", cascade.classify)):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    for data in blobs:
+                        fn(data)
+                    best = min(best, time.perf_counter() - start)
+                timings[name] = best / len(blobs) * 1000
+
+            distribution = " ".join(
+                f"{stage}:{stages[stage] / len(blobs):.0%}" for stage in sorted(stages)
+            )
+            print(
+                f"{fmt:<8}{group:<10}{len(blobs):>8}{agree:>8}{f'{class_ok}/{len(labelled)}':>12}"
+                f"{timings['completo']:>13.2f}{timings['cascata']:>12.2f}"
+                f"{timings['completo'] / timings['cascata']:>6.1f}x   {distribution}"
+            )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
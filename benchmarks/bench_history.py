@@ -0,0 +1,101 @@
+"""
+Benchmark do histórico de análises (`history.HistoryStore`).
+
+Grava N registros sintéticos (um ano de análises em 50 talhões) em lotes
+e mede:
+    - vazão das inserções em lote (registros/s);
+    - consultas: mais recentes (geral e por talhão), intervalo de um dia
+      por status e resumos por status (geral, último mês, por talhão).
+
+Uso:
+    python benchmarks/bench_history.py [--records 1000000] [--batch 10000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+STATUSES = ("healthy", "warning", "danger")
+LABELS = {"healthy": "Saudável", "warning": "Estresse", "danger": "Danos"}
+
+
+def make_records(n: int, start: float, seed: int = 0):
+    """Registros em ordem de tempo, ao longo de um ano a partir de `start`."""
+    from history import HistoryRecord
+
+    rng = np.random.default_rng(seed)
+    timestamps = np.sort(start + rng.random(n) * 365 * 86400)
+    plots = rng.integers(0, 50, n)
+    features = rng.random((n, 4))
+    statuses = rng.choice(len(STATUSES), n, p=(0.7, 0.2, 0.1))
+    for i in range(n):
+        status = STATUSES[statuses[i]]
+        yield HistoryRecord(
+            float(timestamps[i]), f"{i:016x}", f"talhao-{plots[i]:02d}",
+            tuple(features[i].tolist()), LABELS[status], status,
+        )
+
+
+def timed(fn, repeat: int = 20) -> tuple:
+    """(melhor tempo em ms, resultado)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from history import HistoryStore
+
+    start = 1_700_000_000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "historico.sqlite"))
+
+        begin = time.perf_counter()
+        batch = []
+        for record in make_records(args.records, start):
+            batch.append(record)
+            if len(batch) == args.batch:
+                store.add_many(batch)
+                batch = []
+        store.add_many(batch)
+        elapsed = time.perf_counter() - begin
+        size_mb = os.path.getsize(store.path) / 1e6
+        print(f"{args.records} registros em {elapsed:.1f}s ({args.records / elapsed:,.0f}/s), {size_mb:.0f} MB")
+
+        end = start + 365 * 86400
+        day = end - 86400
+        queries = [
+            ("total", lambda: store.count()),
+            ("20 mais recentes", lambda: store.recent(20)),
+            ("20 recentes de um talhão", lambda: store.recent(20, plot="talhao-07")),
+            ("20 recentes 'danger'", lambda: store.recent(20, status="danger")),
+            ("último dia, 'danger'", lambda: store.range(day, end, status="danger")),
+            ("resumo geral", lambda: store.summary()),
+            ("resumo do último mês", lambda: store.summary(end - 30 * 86400, end)),
+            ("resumo de um talhão", lambda: store.summary(plot="talhao-07")),
+        ]
+        print(f"{'consulta':<28}{'ms':>8}{'linhas':>9}")
+        for name, query in queries:
+            ms, result = timed(query)
+            rows = result if isinstance(result, int) else len(result)
+            print(f"{name:<28}{ms:>8.2f}{rows:>9}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de ingestão: caminho exato vs. caminho rápido de `preprocess_image`.
+
+Gera imagens sintéticas grandes (JPEG e PNG), e para cada combinação
+(arquivo, caminho) mede em um subprocesso novo:
+    - tempo de decodificação + preprocess (mediana de N repetições)
+    - pico de memória residente acima da linha de base do processo
+
+Uso:
+    python benchmarks/bench_ingest.py [--megapixels 24] [--repeats 5]
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def _reset_peak_rss() -> None:
+    """Zera o pico de RSS (VmHWM) no Linux: após exec, o valor vem do processo pai."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: KiB no Linux, bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def make_image(path: str, megapixels: float, seed: int = 0) -> None:
+    """Gera uma imagem 3:2 com textura suave de folhagem (comprime como foto)."""
+    width = int((megapixels * 1e6 * 1.5) ** 0.5)
+    height = int(width / 1.5)
+    rng = np.random.default_rng(seed)
+
+    # Ruído de baixa frequência ampliado: evita um arquivo trivialmente compressível
+    coarse = rng.integers(0, 256, (height // 64 + 1, width // 64 + 1, 3), dtype=np.uint8)
+    image = Image.fromarray(coarse).resize((width, height), Image.BILINEAR)
+    arr = np.asarray(image).astype(np.int16)
+    arr[..., 1] += 60
+    noise = rng.integers(-12, 13, arr.shape, dtype=np.int16)
+    Image.fromarray(np.clip(arr + noise, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+
+def run_case(path: str, fast: bool, repeats: int) -> dict:
+    """Executado no subprocesso: mede um caminho de ingestão para um arquivo."""
+    sys.path.insert(0, SRC_DIR)
+    from core import SimpleAgroVisionModel
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    model = SimpleAgroVisionModel(fast_ingest=fast)
+    _reset_peak_rss()
+    baseline = _peak_rss_mb()
+
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.preprocess_image(Image.open(io.BytesIO(data)))
+        times.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "median_ms": statistics.median(times),
+        "peak_mb": _peak_rss_mb() - baseline,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        path, fast, repeats = args.child
+        print(json.dumps(run_case(path, fast == "1", int(repeats))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for ext in ("jpg", "png"):
+            path = os.path.join(tmp, f"sample.{ext}")
+            make_image(path, args.megapixels)
+            files.append(path)
+
+        print(f"{'arquivo':<12}{'caminho':<10}{'mediana (ms)':>14}{'pico (MB)':>12}")
+        for path in files:
+            for fast in (False, True):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", path, "1" if fast else "0", str(args.repeats)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                print(
+                    f"{os.path.basename(path):<12}{'rápido' if fast else 'exato':<10}"
+                    f"{result['median_ms']:>14.1f}{result['peak_mb']:>12.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark do modo ortomosaico: vazão por número de processos.
+
+Monta um mosaico sintético (talhões de `synthetic.py` lado a lado, com uma
+borda preta sem dados), grava como .npy (mapeado, "mmap") e JPEG
+(decodificado para memória compartilhada, "shm") e mede a análise por tile
+com 1, 2, 4... processos. Reporta MP/s e a eficiência em relação a 1
+processo (1.00 = escala linear).
+
+Uso:
+    python benchmarks/bench_orthomosaic.py [--side 8000] [--tile 512] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from synthetic import make_array
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+KINDS = ("healthy", "stressed", "damaged")
+
+
+def make_mosaic(side: int, seed: int = 0) -> np.ndarray:
+    """Mosaico side x side em blocos de 2000 px, com uma borda sem dados à esquerda."""
+    block = 2000
+    # Proporção 4:3 de `make_array`: altura = block
+    patches = {kind: make_array(kind, block * block * 4 / 3 / 1e6, seed)[:block, :block] for kind in KINDS}
+    mosaic = np.zeros((side, side, 3), dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    for y in range(0, side, block):
+        for x in range(0, side, block):
+            patch = patches[KINDS[rng.integers(len(KINDS))]]
+            h, w = mosaic[y:y + block, x:x + block].shape[:2]
+            mosaic[y:y + h, x:x + w] = patch[:h, :w]
+    border = max(side // 10, 1024)
+    mosaic[:, :border] = 0
+    return mosaic
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--side", type=int, default=8000)
+    parser.add_argument("--tile", type=int, default=512)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--feature-kernel", default="uint8")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from orthomosaic import SharedMosaic, analyze_mosaic
+
+    Image.MAX_IMAGE_PIXELS = None
+    mosaic = make_mosaic(args.side)
+    megapixels = mosaic.shape[0] * mosaic.shape[1] / 1e6
+    print(f"Mosaico {args.side}x{args.side} ({megapixels:.0f} MP), tiles de {args.tile} px, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"mmap": os.path.join(tmp, "mosaico.npy"), "shm": os.path.join(tmp, "mosaico.jpg")}
+        np.save(paths["mmap"], mosaic)
+        Image.fromarray(mosaic).save(paths["shm"], quality=90)
+        del mosaic
+
+        print(f"{'fonte':<7}{'carga s':>9}{'processos':>11}{'s':>8}{'MP/s':>8}{'eficiência':>12}")
+        for kind, path in paths.items():
+            start = time.perf_counter()
+            with SharedMosaic.load(path) as shared:
+                load = time.perf_counter() - start
+                baseline = None
+                for workers in args.workers:
+                    start = time.perf_counter()
+                    grid = analyze_mosaic(shared, args.tile, workers, args.feature_kernel)
+                    elapsed = time.perf_counter() - start
+                    baseline = baseline or elapsed * workers
+                    print(
+                        f"{kind:<7}{load:>9.2f}{workers:>11}{elapsed:>8.2f}{megapixels / elapsed:>8.0f}"
+                        f"{baseline / (elapsed * workers):>12.2f}"
+                    )
+            print(f"       status: {grid.counts()}")
+
+
+if __name__ == "__main__":
+    main()
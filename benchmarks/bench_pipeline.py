@@ -0,0 +1,276 @@
+"""
+Suíte de benchmark do pipeline de imagem.
+
+Para cada combinação (formato, resolução), gera imagens sintéticas
+determinísticas das três classes (`synthetic.py`) e mede, em um subprocesso
+novo, cada etapa do pipeline:
+
+    decode      Image.open + load
+    preprocess  preprocess_image sobre a imagem já decodificada
+    features    extract_color_features sobre o array 256x256
+    classify    classify sobre o array 256x256
+    end_to_end  bytes -> preprocess_image -> classify
+
+Para cada etapa: vazão (operações/s), latência (média, p50, p90, p99, mín.)
+e pico de memória residente acima da linha de base. Os resultados vão para
+um JSON com metadados do ambiente; `--compare` aponta regressões em
+relação a uma execução anterior.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--megapixels 0.3 2 12 24 50]
+        [--formats jpeg png] [-o resultados.json] [--compare base.json]
+"""
+
+import argparse
+import ctypes
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+
+from bench_ingest import _peak_rss_mb, _reset_peak_rss
+from synthetic import CLASS_MIXES, EXPECTED_STATUS, FORMATS, make_file, size_for_megapixels
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+STAGES = ("decode", "preprocess", "features", "classify", "end_to_end")
+
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _release_free_memory() -> None:
+    """Devolve ao sistema a memória livre do heap (glibc), para a linha de base não
+    incluir sobras de etapas anteriores que seriam reaproveitadas sem subir o RSS."""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _measure(fn: Callable[[int], object], n_inputs: int, min_repeats: int, max_repeats: int, budget_s: float) -> Dict:
+    """Roda `fn(i)` alternando as entradas até `max_repeats` ou o tempo limite."""
+    gc.collect()
+    _release_free_memory()
+    _reset_peak_rss()
+    baseline = _current_rss_mb()
+    fn(0)  # aquecimento; também define o pico de memória da etapa
+    peak = _peak_rss_mb() - baseline
+
+    times: List[float] = []
+    deadline = time.perf_counter() + budget_s
+    while len(times) < max_repeats and (len(times) < min_repeats or time.perf_counter() < deadline):
+        t0 = time.perf_counter()
+        fn(len(times) % n_inputs)
+        times.append((time.perf_counter() - t0) * 1000)
+
+    arr = np.array(times)
+    return {
+        "repeats": len(times),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "min_ms": float(arr.min()),
+        "throughput_per_s": float(1000 / arr.mean()),
+        "peak_rss_mb": max(0.0, peak),
+    }
+
+
+def run_case(paths: List[str], options: Dict) -> Dict:
+    """Executado no subprocesso: mede todas as etapas para um (formato, resolução)."""
+    sys.path.insert(0, SRC_DIR)
+    from core import SimpleAgroVisionModel
+
+    model = SimpleAgroVisionModel(fast_ingest=options["fast_ingest"], feature_kernel=options["feature_kernel"])
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+
+    def open_image(i: int) -> Image.Image:
+        return Image.open(io.BytesIO(blobs[i]))
+
+    decoded = []
+    for i in range(len(blobs)):
+        image = open_image(i)
+        image.load()
+        decoded.append(image)
+    arrays = [model.preprocess_image(image) for image in decoded]
+    labels = [model.classify(arr)[2] for arr in arrays]
+
+    stage_fns = {
+        "decode": lambda i: open_image(i).load(),
+        "preprocess": lambda i: model.preprocess_image(decoded[i]),
+        "features": lambda i: model.extract_color_features(arrays[i]),
+        "classify": lambda i: model.classify(arrays[i]),
+        "end_to_end": lambda i: model.classify(model.preprocess_image(open_image(i))),
+    }
+
+    stages = {}
+    for stage in options["stages"]:
+        stages[stage] = _measure(
+            stage_fns[stage], len(blobs),
+            options["min_repeats"], options["max_repeats"], options["stage_seconds"],
+        )
+    return {"labels": labels, "stages": stages}
+
+
+def environment() -> Dict:
+    """Metadados para comparar execuções entre máquinas e versões."""
+    import PIL
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict], baseline_path: str, threshold: float, metric: str = "p50_ms") -> int:
+    """Imprime a razão (atual / base) de `metric` por etapa; retorna nº de regressões."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["format"], r["megapixels"], r["stage"]): r for r in json.load(f)["results"]
+        }
+
+    regressions = 0
+    print(f"\nComparação com {baseline_path} ({metric}, limiar {threshold:.0%}):")
+    for r in results:
+        base = baseline.get((r["format"], r["megapixels"], r["stage"]))
+        if base is None:
+            continue
+        ratio = r[metric] / base[metric] if base[metric] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESSÃO"
+            regressions += 1
+        print(f"  {r['format']:<5}{r['megapixels']:>6g} MP  {r['stage']:<11}{ratio:>7.2f}x{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.3, 2, 12, 24, 50])
+    parser.add_argument("--formats", nargs="+", choices=sorted(FORMATS), default=["jpeg", "png"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--min-repeats", type=int, default=5)
+    parser.add_argument("--max-repeats", type=int, default=200)
+    parser.add_argument(
+        "--stage-seconds", type=float, default=2.0,
+        help="Tempo alvo por etapa após o mínimo de repetições (padrão: %(default)s s)",
+    )
+    parser.add_argument("--fast-ingest", action="store_true")
+    parser.add_argument("--feature-kernel", default="float")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data-dir", default=None,
+        help="Diretório para reaproveitar as imagens geradas (padrão: temporário)",
+    )
+    parser.add_argument("-o", "--output", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regressão tolerada (padrão: 10%%)")
+    parser.add_argument(
+        "--metric", default="p50_ms", choices=["min_ms", "mean_ms", "p50_ms", "p90_ms", "p99_ms"],
+        help="Métrica da comparação; min_ms é a mais estável em máquinas compartilhadas",
+    )
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        paths, options = json.loads(args.child[0]), json.loads(args.child[1])
+        print(json.dumps(run_case(paths, options)))
+        return
+
+    options = {
+        "fast_ingest": args.fast_ingest,
+        "feature_kernel": args.feature_kernel,
+        "stages": args.stages,
+        "min_repeats": args.min_repeats,
+        "max_repeats": args.max_repeats,
+        "stage_seconds": args.stage_seconds,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+
+        results = []
+        print(
+            f"{'formato':<8}{'MP':>6}  {'etapa':<11}{'vazão/s':>10}{'p50 ms':>10}"
+            f"{'p90 ms':>10}{'p99 ms':>10}{'pico MB':>9}"
+        )
+        for fmt in args.formats:
+            for megapixels in args.megapixels:
+                paths = [make_file(data_dir, kind, megapixels, fmt, args.seed) for kind in CLASS_MIXES]
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", json.dumps(paths), json.dumps(options)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                case = json.loads(out.strip().splitlines()[-1])
+
+                expected = [EXPECTED_STATUS[kind] for kind in CLASS_MIXES]
+                if case["labels"] != expected:
+                    print(f"  aviso: rótulos {case['labels']} diferentes do esperado {expected}", file=sys.stderr)
+
+                width, height = size_for_megapixels(megapixels)
+                file_bytes = sum(os.path.getsize(p) for p in paths) // len(paths)
+                for stage, stats in case["stages"].items():
+                    results.append({
+                        "format": fmt,
+                        "megapixels": megapixels,
+                        "width": width,
+                        "height": height,
+                        "file_bytes": file_bytes,
+                        "stage": stage,
+                        **stats,
+                    })
+                    print(
+                        f"{fmt:<8}{megapixels:>6g}  {stage:<11}{stats['throughput_per_s']:>10.1f}"
+                        f"{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                        f"{stats['peak_rss_mb']:>9.1f}"
+                    )
+
+    report = {"environment": environment(), "options": options, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados salvos em {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold, args.metric)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
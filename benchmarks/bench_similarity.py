@@ -0,0 +1,118 @@
+"""
+Benchmark da busca de casos semelhantes (`similarity.py`): latência e recall.
+
+O acervo é montado a partir de vetores reais: features de cor (4) e,
+com `--histogram`, também histogramas de cor (4 + 24) de imagens
+sintéticas (`synthetic.py`) pré-processadas pelo modelo; cada registro é
+um desses vetores com ruído gaussiano. As consultas vêm de imagens com
+outras sementes.
+
+Para cada tamanho de acervo, reporta o tempo de montagem, a memória dos
+vetores e a latência por consulta (p50/p99, uma consulta por vez) do
+índice exato (`BruteForceIndex`) e do IVF (`IVFIndex`), além do recall@k
+do IVF em relação ao exato.
+
+Uso:
+    python benchmarks/bench_similarity.py [--sizes 10000 100000 1000000] [--histogram] [--nprobe 16]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from synthetic import CLASS_MIXES, make_array
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Desvio do ruído somado aos vetores de base (features em [0, 1])
+NOISE = 0.01
+
+
+def base_vectors(n_images: int, histogram: bool, seed: int) -> np.ndarray:
+    """Vetores (n, d) de imagens sintéticas com frações de manchas variadas."""
+    from core import SimpleAgroVisionModel
+    from similarity import color_histogram, feature_vector
+
+    model = SimpleAgroVisionModel()
+    rng = np.random.default_rng(seed)
+    kinds = list(CLASS_MIXES)
+    vectors = []
+    for i in range(n_images):
+        array = make_array(kinds[i % len(kinds)], 0.1, seed=seed + i, spot_fraction=float(rng.uniform(0, 0.45)))
+        img_array = model.preprocess_image(Image.fromarray(array))
+        hist = color_histogram(img_array) if histogram else None
+        vectors.append(feature_vector(model.extract_color_features(img_array), hist))
+    return np.stack(vectors)
+
+
+def percentiles(samples) -> str:
+    p50, p99 = np.percentile(np.asarray(samples) * 1000, [50, 99])
+    return f"{p50:>7.3f}{p99:>8.3f}"
+
+
+def time_queries(index, queries: np.ndarray, k: int):
+    """(latências em s, ids (q, k)) consultando um vetor por vez."""
+    latencies, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        ids.append(found[0])
+    return latencies, ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--histogram", action="store_true", help="Vetores com histogramas de cor (4 + 24)")
+    parser.add_argument("--images", type=int, default=300, help="Imagens de base do acervo")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=16)
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from similarity import BruteForceIndex, IVFIndex
+
+    base = base_vectors(args.images, args.histogram, seed=0)
+    queries = base_vectors(args.queries, args.histogram, seed=50_000)
+    dim = base.shape[1]
+    rng = np.random.default_rng(0)
+    print(f"dimensão {dim}, {args.queries} consultas, k={args.k}, nprobe={args.nprobe}")
+    print(f"{'acervo':>10}{'MB':>7}{'s montagem':>12}   {'exato p50/p99 ms':>16}"
+          f"   {'listas':>6}{'s treino':>10}{'ivf p50/p99 ms':>16}{'recall':>8}")
+
+    for size in args.sizes:
+        vectors = base[rng.integers(0, len(base), size)]
+        vectors += rng.normal(0, NOISE, vectors.shape).astype(np.float32)
+        ids = np.arange(1, size + 1)
+
+        start = time.perf_counter()
+        exact = BruteForceIndex(dim)
+        for i in range(0, size, 100_000):
+            exact.add(ids[i:i + 100_000], vectors[i:i + 100_000])
+        build = time.perf_counter() - start
+        exact_latency, exact_ids = time_queries(exact, queries, args.k)
+
+        # Mesma regra de `SimilarityIndex`: ~4·√n listas, treino em até 64 vetores por lista
+        nlist = max(16, int(4 * math.sqrt(size)))
+        sample = vectors[rng.choice(size, min(size, 64 * nlist), replace=False)]
+        start = time.perf_counter()
+        ivf = IVFIndex.train(sample, nlist, args.nprobe)
+        ivf.add(ids, vectors)
+        train = time.perf_counter() - start
+        ivf_latency, ivf_ids = time_queries(ivf, queries, args.k)
+        recall = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact_ids, ivf_ids)])
+
+        print(f"{size:>10}{exact.nbytes / 2**20:>7.1f}{build:>12.2f}   {percentiles(exact_latency):>16}"
+              f"   {nlist:>6}{train:>10.1f}{percentiles(ivf_latency):>16}{recall:>8.3f}")
+        del exact, ivf, vectors
+
+
+if __name__ == "__main__":
+    main()
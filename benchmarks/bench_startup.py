@@ -0,0 +1,109 @@
+"""
+Benchmark de partida: importação, cold start e pool de processos.
+
+Cada medida roda num interpretador novo (subprocesso), comparando o núcleo
+sem Streamlit (`core`) com o app (`app`, que importa Streamlit e executa a
+configuração da página ao ser importado):
+    - importação: tempo de `import <módulo>`;
+    - cold start: importação + modelo + primeira classificação de um JPEG;
+    - pool: `multiprocessing.Pool` com contexto "spawn" (o padrão no Windows
+      e no macOS), do início até o primeiro resultado de um worker que
+      importa o módulo e classifica a foto.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--workers 2]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from synthetic import make_file
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+MODULES = ("core", "app")
+
+# Executado em um interpretador novo; imprime um JSON com os tempos em segundos.
+# argv: módulo, caminho da foto, número de workers (0 = sem pool)
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+module_name, path, workers = sys.argv[1], sys.argv[2], int(sys.argv[3])
+sys.path.insert(0, sys.argv[4])
+
+
+def first_classification(module_name, path):
+    import importlib
+    from PIL import Image
+    module = importlib.import_module(module_name)
+    model = module.SimpleAgroVisionModel()
+    with Image.open(path) as image:
+        return model.classify(model.preprocess_image(image))[2]
+
+
+if __name__ == "__main__":
+    if workers:
+        import multiprocessing as mp
+        with mp.get_context("spawn").Pool(workers) as pool:
+            pool.apply(first_classification, (module_name, path))
+            result = {"pool": time.perf_counter() - start}
+    else:
+        import importlib
+        importlib.import_module(module_name)
+        imported = time.perf_counter() - start
+        first_classification(module_name, path)
+        result = {"import": imported, "cold": time.perf_counter() - start}
+    print(json.dumps(result))
+"""
+
+
+def run_probe(script: str, module: str, path: str, workers: int) -> dict:
+    env = dict(os.environ, AGROVISION_METRICS_PORT="0", AGROVISION_HISTORY_PATH="")
+    output = subprocess.run(
+        [sys.executable, script, module, path, str(workers), SRC_DIR],
+        capture_output=True, text=True, env=env, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--megapixels", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_file(tmp, "healthy", args.megapixels, "jpeg")
+        script = os.path.join(tmp, "probe.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(PROBE)
+
+        print(f"Mediana de {args.repeat} execuções (ms); foto de {args.megapixels} MP; pool com {args.workers} workers")
+        print(f"{'módulo':<8}{'importação':>12}{'cold start':>12}{'pool':>10}")
+        results = {}
+        for module in MODULES:
+            runs = [run_probe(script, module, path, 0) for _ in range(args.repeat)]
+            pools = [run_probe(script, module, path, args.workers)["pool"] for _ in range(args.repeat)]
+            results[module] = {
+                "import": statistics.median(run["import"] for run in runs),
+                "cold": statistics.median(run["cold"] for run in runs),
+                "pool": statistics.median(pools),
+            }
+            row = results[module]
+            print(f"{module:<8}{row['import'] * 1000:>12.0f}{row['cold'] * 1000:>12.0f}{row['pool'] * 1000:>10.0f}")
+
+        core, app = results["core"], results["app"]
+        print(
+            f"core/app: importação {core['import'] / app['import']:.2f}x, "
+            f"cold start {core['cold'] / app['cold']:.2f}x, pool {core['pool'] / app['pool']:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
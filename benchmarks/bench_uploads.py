@@ -0,0 +1,89 @@
+"""
+Benchmark do upload de vários arquivos no app (`app.analyze_uploads`).
+
+Gera N fotos sintéticas (`synthetic.py`, classes misturadas, sementes
+distintas) e compara, com caches vazios:
+    - "computo": laço sequencial com só o custo da análise
+      (decode + preprocess_image + extract_color_features + classify_features);
+    - "app": `analyze_uploads`, como no clique de "ANALISAR N IMAGENS"
+      (threads de pré-processamento, classificação em lotes, callback de
+      progresso, caches e hash perceptual).
+
+O objetivo é o tempo de ponta a ponta do app ficar próximo do cômputo
+(ou abaixo, com mais de um núcleo).
+
+Uso:
+    python benchmarks/bench_uploads.py [--images 100] [--megapixels 2] [--workers 4]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from synthetic import EXPECTED_STATUS, make_file
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+class FileUpload(io.BytesIO):
+    """Imita o `UploadedFile` do Streamlit (file_id, name, getvalue)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.file_id = path
+        self.name = os.path.basename(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--megapixels", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.workers:
+        os.environ["AGROVISION_UPLOAD_WORKERS"] = str(args.workers)
+    os.environ.setdefault("AGROVISION_HISTORY_PATH", "")
+    sys.path.insert(0, SRC_DIR)
+    import app
+
+    kinds = list(EXPECTED_STATUS)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [
+            make_file(tmp, kinds[i % len(kinds)], args.megapixels, "jpeg", seed=i)
+            for i in range(args.images)
+        ]
+        uploads = [FileUpload(path) for path in paths]
+        print(f"{args.images} fotos JPEG de {args.megapixels} MP, {app.UPLOAD_WORKERS} threads, lotes de {app.UPLOAD_BATCH}")
+
+        model = app.SimpleAgroVisionModel()
+        start = time.perf_counter()
+        for upload in uploads:
+            img_array = model.preprocess_image(Image.open(io.BytesIO(upload.getvalue())))
+            model.classify_features(model.extract_color_features(img_array), img_array)
+        compute = time.perf_counter() - start
+
+        app.get_result_cache.clear()
+        app.get_phash_index.clear()
+        progress = []
+        start = time.perf_counter()
+        results = app.analyze_uploads(uploads, lambda done, upload: progress.append(time.perf_counter() - start))
+        end_to_end = time.perf_counter() - start
+
+        errors = sum(result["analysis"] is None for result in results)
+        print(f"{'modo':<10}{'s':>8}{'ms/foto':>10}")
+        print(f"{'computo':<10}{compute:>8.2f}{compute / args.images * 1000:>10.1f}")
+        print(f"{'app':<10}{end_to_end:>8.2f}{end_to_end / args.images * 1000:>10.1f}"
+              f"   ({end_to_end / compute:.2f}x o cômputo, {errors} erros)")
+        print(f"primeiro resultado em {progress[0] * 1000:.0f} ms; "
+              f"{len(progress)} atualizações de progresso")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark do modo vídeo: vazão com e sem o reaproveitamento de quadros.
+
+Simula a câmera de um trator percorrendo uma faixa de lavoura (trechos
+saudável -> danificado -> estressado, de `synthetic.py`), com paradas no
+início, no meio e no fim. Os quadros são gravados como sequência JPEG
+numerada e analisados por `video.analyze_frames`:
+    - "todos": cada quadro é decodificado e classificado;
+    - "reaproveita": quadros quase iguais ao quadro-chave repetem o resultado.
+
+Reporta quadros/s, quadros reaproveitados e os trechos suavizados.
+
+Uso:
+    python benchmarks/bench_video.py [--width 1280] [--height 720] [--frames 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from synthetic import make_array
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def make_sequence(directory: str, width: int, height: int, frames: int, seed: int = 0) -> str:
+    """Grava a sequência `quadro_00000.jpg`... e retorna o padrão printf."""
+    pattern = os.path.join(directory, "quadro_%05d.jpg")
+    if os.path.exists(pattern % (frames - 1)):
+        return pattern
+
+    # Faixa da lavoura: três talhões lado a lado, cada um com o dobro da largura do quadro
+    field_mp = (2 * width) ** 2 * 3 / 4 / 1e6
+    field = np.concatenate(
+        [make_array(kind, field_mp, seed)[:height] for kind in ("healthy", "damaged", "stressed")], axis=1
+    )
+    travel = field.shape[1] - width
+
+    # Parado 20% do tempo no início, no meio e no fim; andando no resto
+    stop = frames // 5
+    moving = frames - 3 * stop
+    positions = np.concatenate([
+        np.zeros(stop),
+        np.linspace(0, travel / 2, moving // 2),
+        np.full(stop, travel / 2),
+        np.linspace(travel / 2, travel, moving - moving // 2),
+        np.full(stop, travel),
+    ]).astype(int)
+
+    rng = np.random.default_rng(seed)
+    for index, x in enumerate(positions):
+        crop = field[:, x:x + width].astype(np.int16)
+        crop += rng.integers(-3, 4, crop.shape, dtype=np.int16)  # ruído do sensor
+        Image.fromarray(np.clip(crop, 0, 255).astype(np.uint8)).save(pattern % index, quality=85)
+    return pattern
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fast-ingest", action="store_true")
+    parser.add_argument("--data-dir", default=None, help="Diretório para reaproveitar os quadros gerados")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    from core import SimpleAgroVisionModel
+    from video import CHANGE_THRESHOLD, analyze_frames, iter_sequence_frames, smooth_segments
+
+    model = SimpleAgroVisionModel(fast_ingest=args.fast_ingest)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        pattern = make_sequence(data_dir, args.width, args.height, args.frames)
+
+        print(f"{args.frames} quadros {args.width}x{args.height} (JPEG)")
+        print(f"{'modo':<13}{'quadros/s':>10}{'ms/quadro':>11}{'reaproveitados':>16}")
+        reference = None
+        for name, threshold in (("todos", 0.0), ("reaproveita", CHANGE_THRESHOLD)):
+            start = time.perf_counter()
+            results = list(analyze_frames(iter_sequence_frames(pattern), model, threshold))
+            elapsed = time.perf_counter() - start
+            reused = sum(r.reused for r in results)
+            agreement = ""
+            if reference is None:
+                reference = results
+            else:
+                same = sum(a.status == b.status for a, b in zip(reference, results))
+                agreement = f"  (mesmo status em {same / len(results):.1%} dos quadros)"
+            print(
+                f"{name:<13}{len(results) / elapsed:>10.1f}{elapsed / len(results) * 1000:>11.2f}"
+                f"{reused:>10} ({reused / len(results):.0%}){agreement}"
+            )
+
+        print("\nTrechos (modo reaproveita):")
+        for segment in smooth_segments(results, min_frames=15):
+            print(
+                f"  {segment.start_time:>6.2f}s - {segment.end_time:>6.2f}s  {segment.status:<8}"
+                f"{segment.frames:>5} quadros ({segment.classified_frames} classificados)"
+            )
+
+
+if __name__ == "__main__":
+    main()
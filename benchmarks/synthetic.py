@@ -0,0 +1,121 @@
+"""
+Gerador determinístico de imagens sintéticas de folhagem.
+
+Cada classe combina uma textura de folha verde com manchas
+amareladas/amarronzadas em proporção controlada, cobrindo as três saídas
+do modelo:
+
+    healthy   folhagem verde, ~1% de manchas        -> "healthy"
+    stressed  folhagem amarelada, ~11% de manchas   -> "warning"
+    damaged   ~34% de manchas                       -> "danger"
+
+(proporções medidas após o redimensionamento para 256x256)
+
+Com `spot_px`, as manchas viram quadrados de `spot_px` pixels espalhados ao
+acaso (lesões pequenas numa foto de alta resolução), que o redimensionamento
+para 256x256 mistura à folha em vez de preservar.
+
+A mesma (classe, resolução, semente) gera sempre os mesmos pixels, então
+arquivos de execuções diferentes são comparáveis.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Cor média da folha (RGB), amplitude da textura e fração de manchas por classe.
+# Folha + textura + ruído ficam com r <= 102, fora da faixa das manchas.
+CLASS_MIXES: Dict[str, Tuple[Tuple[int, int, int], int, float]] = {
+    "healthy": ((60, 140, 50), 25, 0.01),
+    "stressed": ((75, 135, 45), 18, 0.09),
+    "damaged": ((75, 120, 45), 18, 0.30),
+}
+
+EXPECTED_STATUS = {"healthy": "healthy", "stressed": "warning", "damaged": "danger"}
+
+# Manchas: r > 102, g > 76, b < 102 (faixa "amarronzada" do modelo)
+SPOT_COLOR = (170, 120, 50)
+
+FORMATS = {"jpeg": ("jpg", {"quality": 90}), "png": ("png", {"compress_level": 6})}
+
+
+def size_for_megapixels(megapixels: float) -> Tuple[int, int]:
+    """(largura, altura) em proporção 4:3 com a área pedida."""
+    width = max(4, int(round((megapixels * 1e6 * 4 / 3) ** 0.5)))
+    return width, max(3, int(round(width * 3 / 4)))
+
+
+def _low_frequency(rng: np.random.Generator, size: Tuple[int, int], cell: int, channels: int) -> np.ndarray:
+    """Ruído suave: grade grossa aleatória ampliada com interpolação bilinear."""
+    width, height = size
+    coarse = rng.integers(0, 256, (height // cell + 2, width // cell + 2, channels), dtype=np.uint8)
+    image = Image.fromarray(coarse.squeeze(-1) if channels == 1 else coarse)
+    return np.asarray(image.resize((width, height), Image.BILINEAR))
+
+
+def make_array(
+    kind: str,
+    megapixels: float,
+    seed: int = 0,
+    spot_fraction: Optional[float] = None,
+    spot_px: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Gera a imagem (H, W, 3) uint8 da classe `kind`.
+
+    `spot_fraction` troca a fração de manchas da classe (imagens perto dos
+    limiares de decisão); `spot_px` troca as manchas suaves por quadrados
+    desse lado.
+    """
+    if kind not in CLASS_MIXES:
+        raise ValueError(f"Classe desconhecida: {kind!r} (opções: {', '.join(CLASS_MIXES)})")
+    base, amplitude, class_spots = CLASS_MIXES[kind]
+    if spot_fraction is None:
+        spot_fraction = class_spots
+    size = size_for_megapixels(megapixels)
+    entropy = [seed, list(CLASS_MIXES).index(kind), int(megapixels * 1000)]
+    rng = np.random.default_rng(entropy + [spot_px] if spot_px else entropy)
+
+    # Textura da folha: variação suave por canal em torno da cor base
+    cell = max(8, size[0] // 48)
+    texture = _low_frequency(rng, size, cell, 3).astype(np.int16) - 128
+    leaf = np.array(base, dtype=np.int16) + texture * amplitude // 128
+
+    if spot_px:
+        # Manchas: cada quadrado da grade de lado spot_px é mancha com a probabilidade pedida
+        width, height = size
+        cells = rng.random((-(-height // spot_px), -(-width // spot_px))) < spot_fraction
+        spots = np.repeat(np.repeat(cells, spot_px, axis=0), spot_px, axis=1)[:height, :width]
+    else:
+        # Manchas: limiar no quantil de um segundo campo suave dá a fração pedida
+        field = _low_frequency(rng, size, max(4, cell // 2), 1)
+        threshold = np.quantile(field[::8, ::8], 1 - spot_fraction)
+        spots = field > threshold
+
+    image = np.where(spots[..., None], np.array(SPOT_COLOR, dtype=np.int16), leaf)
+    # Ruído fino de sensor (faz o JPEG/PNG comprimir como foto)
+    image += rng.integers(-6, 7, image.shape, dtype=np.int16)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def make_file(
+    directory: str,
+    kind: str,
+    megapixels: float,
+    fmt: str,
+    seed: int = 0,
+    spot_fraction: Optional[float] = None,
+    spot_px: Optional[int] = None,
+) -> str:
+    """Grava (ou reaproveita) a imagem sintética e retorna o caminho."""
+    ext, options = FORMATS[fmt]
+    spots = "" if spot_fraction is None else f"_m{spot_fraction:g}"
+    spots += f"_q{spot_px}" if spot_px else ""
+    path = os.path.join(directory, f"{kind}{spots}_{megapixels:g}mp_s{seed}.{ext}")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        Image.fromarray(make_array(kind, megapixels, seed, spot_fraction, spot_px)).save(tmp_path, format=fmt.upper(), **options)
+        os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,161 @@
+"""
+Gera o modelo ONNX de teste `agrovision_tiny.onnx` e a versão int8.
+
+Rede mínima no contrato de `src/backends.py` (entrada float32
+(N, 3, 256, 256) em [0, 1], saída (N, 3) healthy/warning/danger):
+
+    Conv 1x1 (3 -> 8, filtros de cor fixos) -> ReLU
+      -> Conv 3x3 stride 2 (8 -> 16, pesos aleatórios com semente) -> ReLU
+    média global das duas camadas -> concatenação (24) -> Gemm (24 -> 3)
+
+Só a camada final é ajustada: regressão logística sobre imagens sintéticas
+(`benchmarks/synthetic.py`) rotuladas pela heurística do modelo. Serve para
+exercitar o backend ONNX (carga, lotes, threads, int8) e os benchmarks; não
+é um modelo treinado para fotos reais.
+
+Uso:
+    python models/build_tiny_model.py [--images 360]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from backends import STATUSES, TINY_MODEL, quantize_model, to_model_input  # noqa: E402
+from core import SimpleAgroVisionModel  # noqa: E402
+from synthetic import CLASS_MIXES, make_array  # noqa: E402
+
+# Filtros 1x1 sobre RGB em [0, 1]: (pesos R, G, B, viés)
+COLOR_FILTERS = np.array([
+    (1.0, 0.0, 0.0, -0.4),   # vermelho acima da faixa das folhas (manchas)
+    (0.0, 1.0, 0.0, -0.3),
+    (0.0, 0.0, -1.0, 0.4),
+    (1.0, 1.0, -1.0, -0.6),  # amarronzado: R e G altos, B baixo
+    (-1.0, 1.0, 0.0, 0.0),   # verde dominante sobre o vermelho
+    (0.0, 1.0, -1.0, 0.0),
+    (1 / 3, 1 / 3, 1 / 3, 0.0),  # brilho
+    (-1.0, 2.0, -1.0, -0.2),
+], dtype=np.float32)
+
+HIDDEN = 16
+OPSET = 17
+
+
+def build_graph(head: np.ndarray = None, bias: np.ndarray = None, seed: int = 0):
+    """Grafo ONNX; sem `head`, a saída são as 24 features (para o ajuste)."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(seed)
+    w1 = COLOR_FILTERS[:, :3].reshape(8, 3, 1, 1)
+    b1 = COLOR_FILTERS[:, 3]
+    w2 = (rng.standard_normal((HIDDEN, 8, 3, 3)) * np.sqrt(2 / (8 * 9))).astype(np.float32)
+    b2 = np.zeros(HIDDEN, dtype=np.float32)
+
+    initializers = [
+        numpy_helper.from_array(w1, "w1"), numpy_helper.from_array(b1, "b1"),
+        numpy_helper.from_array(w2, "w2"), numpy_helper.from_array(b2, "b2"),
+    ]
+    nodes = [
+        helper.make_node("Conv", ["image", "w1", "b1"], ["c1"], kernel_shape=[1, 1]),
+        helper.make_node("Relu", ["c1"], ["r1"]),
+        helper.make_node("Conv", ["r1", "w2", "b2"], ["c2"], kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["c2"], ["r2"]),
+        helper.make_node("GlobalAveragePool", ["r1"], ["p1"]),
+        helper.make_node("GlobalAveragePool", ["r2"], ["p2"]),
+        helper.make_node("Concat", ["p1", "p2"], ["p"], axis=1),
+        helper.make_node("Flatten", ["p"], ["features"], axis=1),
+    ]
+    if head is None:
+        output = helper.make_tensor_value_info("features", TensorProto.FLOAT, ["N", 8 + HIDDEN])
+    else:
+        initializers += [numpy_helper.from_array(head, "w3"), numpy_helper.from_array(bias, "b3")]
+        nodes.append(helper.make_node("Gemm", ["features", "w3", "b3"], ["scores"]))
+        output = helper.make_tensor_value_info("scores", TensorProto.FLOAT, ["N", len(STATUSES)])
+
+    graph = helper.make_graph(
+        nodes, "agrovision_tiny",
+        [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["N", 3, 256, 256])],
+        [output], initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET)], producer_name="agrovision")
+    model.ir_version = 8
+    return model
+
+
+def make_dataset(n_images: int, seed: int = 0):
+    """Arrays (N, 256, 256, 3) sintéticos e status da heurística."""
+    model = SimpleAgroVisionModel()
+    rng = np.random.default_rng(seed)
+    from PIL import Image
+
+    kinds = list(CLASS_MIXES)
+    arrays, statuses = [], []
+    for i in range(n_images):
+        fraction = float(rng.uniform(0.0, 0.45))
+        array = make_array(kinds[i % len(kinds)], 0.3, seed=10_000 + i, spot_fraction=fraction)
+        img_array = model.preprocess_image(Image.fromarray(array))
+        arrays.append(img_array)
+        statuses.append(model.classify(img_array)[2])
+    return np.stack(arrays), np.array([STATUSES.index(s) for s in statuses])
+
+
+def fit_head(features: np.ndarray, labels: np.ndarray, steps: int = 3000, l2: float = 1e-3):
+    """Regressão logística multinomial; devolve (pesos (24, 3), viés (3,)) sobre as features cruas."""
+    mean, std = features.mean(axis=0), features.std(axis=0) + 1e-6
+    x = (features - mean) / std
+    onehot = np.eye(len(STATUSES))[labels]
+    weights = np.zeros((x.shape[1], len(STATUSES)))
+    bias = np.zeros(len(STATUSES))
+    for _ in range(steps):
+        logits = x @ weights + bias
+        p = np.exp(logits - logits.max(axis=1, keepdims=True))
+        p /= p.sum(axis=1, keepdims=True)
+        grad = p - onehot
+        weights -= 0.5 * (x.T @ grad / len(x) + l2 * weights)
+        bias -= 0.5 * grad.mean(axis=0)
+    # Padronização embutida nos pesos: ((f - mean) / std) W + b
+    head = weights / std[:, None]
+    return head.astype(np.float32), (bias - mean / std @ weights).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=360)
+    parser.add_argument("-o", "--output", default=TINY_MODEL)
+    args = parser.parse_args()
+
+    import onnx
+    import onnxruntime as ort
+
+    arrays, labels = make_dataset(args.images)
+    with tempfile.TemporaryDirectory() as tmp:
+        features_path = os.path.join(tmp, "features.onnx")
+        onnx.save(build_graph(), features_path)
+        session = ort.InferenceSession(features_path, providers=["CPUExecutionProvider"])
+        features = np.concatenate([
+            session.run(None, {"image": to_model_input(arrays[i:i + 32])})[0]
+            for i in range(0, len(arrays), 32)
+        ])
+
+    head, bias = fit_head(features, labels)
+    accuracy = float((np.argmax(features @ head + bias, axis=1) == labels).mean())
+    model = build_graph(head, bias)
+    onnx.checker.check_model(model)
+    onnx.save(model, args.output)
+
+    calibration = (arrays[i:i + 16] for i in range(0, min(len(arrays), 128), 16))
+    int8_output = quantize_model(args.output, calibration)
+    print(f"{args.output} ({os.path.getsize(args.output) / 1024:.1f} KB), "
+          f"{int8_output} ({os.path.getsize(int8_output) / 1024:.1f} KB); "
+          f"concordância com a heurística no ajuste: {accuracy:.1%}")
+
+
+if __name__ == "__main__":
+    main()
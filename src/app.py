@@ -1,11 +1,45 @@
+import atexit
 import io
-from typing import Tuple
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageColor, ImageDraw
 import streamlit as st
 
+from core import (
+    STATUS_COLORS,
+    STREAMING_MEMORY_BUDGET,
+    STREAMING_MIN_PIXELS,
+    SimpleAgroVisionModel,
+)
+from backends import ModelBackend, load_backend
+from history import HistoryRecord, HistoryStore
+from integral import IntegralFeatures
+import metrics
+from metrics import timer
+from phash_index import MAX_DISTANCE as MAX_PHASH_DISTANCE, PHashIndex, image_signature
+from result_cache import CachedAnalysis, ResultCache, content_key
+from similarity import SimilarityIndex, feature_vector
+from streaming import preprocess_in_strips
+from ui_assets import (
+    STATUS_ICONS,
+    completion_html,
+    features_html,
+    header_html,
+    model_explainer_html,
+    panel_title_html,
+    recommendations_html,
+    result_html,
+    sidebar_html,
+    stylesheet,
+    upload_html,
+    welcome_html,
+)
+
 # ==================== CONFIGURAÇÃO DA PÁGINA ====================
 st.set_page_config(
     page_title="AgroVision AI - Análise Inteligente de Plantas",
@@ -19,881 +53,778 @@ st.set_page_config(
     }
 )
 
-# ==================== SISTEMA DE CORES - IDENTIDADE VISUAL ====================
-COLORS = {
-    # Paleta primária - Verde profundo (natureza, confiança, crescimento)
-    "primary_dark": "#065f46",      # Verde escuro para headers
-    "primary": "#10b981",            # Verde vibrante principal
-    "primary_light": "#d1fae5",      # Verde claro para backgrounds
-    
-    # Paleta secundária - Tons neutros sofisticados
-    "neutral_900": "#111827",
-    "neutral_800": "#1f2937",
-    "neutral_700": "#374151",
-    "neutral_600": "#4b5563",
-    "neutral_400": "#9ca3af",
-    "neutral_200": "#e5e7eb",
-    "neutral_100": "#f3f4f6",
-    "neutral_50": "#f9fafb",
-    
-    # Alertas - Semáforo inteligente
-    "success": "#10b981",            # Verde - Saudável
-    "warning": "#f59e0b",            # Âmbar - Alerta
-    "danger": "#ef4444",             # Vermelho - Crítico
-    
-    # Gradientes funcionais
-    "gradient_primary": "linear-gradient(135deg, #10b981 0%, #059669 100%)",
-    "gradient_secondary": "linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%)",
-}
-
 # ==================== DESIGN SYSTEM - CSS AVANÇADO ====================
-st.markdown(f"""
-    <style>
-        /* ==================== RESET E VARIÁVEIS GLOBAIS ==================== */
-        :root {{
-            --primary: {COLORS['primary']};
-            --primary-dark: {COLORS['primary_dark']};
-            --neutral-900: {COLORS['neutral_900']};
-            --success: {COLORS['success']};
-            --warning: {COLORS['warning']};
-            --danger: {COLORS['danger']};
-        }}
-        
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        /* ==================== BODY E CONTAINERS PRINCIPAIS ==================== */
-        .stApp {{
-            background: linear-gradient(180deg, {COLORS['neutral_50']} 0%, {COLORS['neutral_100']} 100%);
-            min-height: 100vh;
-        }}
-        
-        .main {{
-            padding: 0 !important;
-        }}
-        
-        [data-testid="stAppViewContainer"] {{
-            padding-top: 2rem !important;
-            padding-left: 2rem !important;
-            padding-right: 2rem !important;
-        }}
-        
-        /* ==================== TIPOGRAFIA ====================*/
-        h1 {{
-            color: {COLORS['primary_dark']} !important;
-            font-size: 2.5em !important;
-            font-weight: 900 !important;
-            letter-spacing: -0.5px !important;
-            margin: 20px 0 10px 0 !important;
-            text-align: center;
-            line-height: 1.2;
-        }}
-        
-        h2 {{
-            color: {COLORS['primary']} !important;
-            font-size: 2em !important;
-            font-weight: 800 !important;
-            margin: 30px 0 15px 0 !important;
-            letter-spacing: -0.3px;
-        }}
-        
-        h3 {{
-            color: {COLORS['primary_dark']} !important;
-            font-size: 1.5em !important;
-            font-weight: 700 !important;
-            margin: 20px 0 10px 0 !important;
-        }}
-        
-        h4 {{
-            color: {COLORS['neutral_800']} !important;
-            font-size: 1.2em !important;
-            font-weight: 600 !important;
-        }}
-        
-        p {{
-            color: {COLORS['neutral_700']} !important;
-            font-size: 1em !important;
-            line-height: 1.6 !important;
-            letter-spacing: 0.3px;
-        }}
-        
-        /* ==================== SIDEBAR PREMIUM ====================*/
-        [data-testid="stSidebar"] {{
-            background: linear-gradient(180deg, {COLORS['primary_dark']} 0%, {COLORS['primary']} 100%);
-            padding: 30px 20px !important;
-        }}
-        
-        [data-testid="stSidebar"] [data-testid="stVerticalBlock"] {{
-            gap: 1.5rem;
-        }}
-        
-        [data-testid="stSidebar"] h1,
-        [data-testid="stSidebar"] h2,
-        [data-testid="stSidebar"] h3,
-        [data-testid="stSidebar"] p {{
-            color: white !important;
-        }}
-        
-        [data-testid="stSidebar"] h1 {{
-            font-size: 1.8em !important;
-            margin-bottom: 15px !important;
-        }}
-        
-        /* ==================== COMPONENTES DE UPLOAD ====================*/
-        .uploadedFile {{
-            border-radius: 12px !important;
-            border: 2px solid {COLORS['neutral_200']} !important;
-            background: {COLORS['neutral_50']} !important;
-            transition: all 0.3s ease !important;
-        }}
-        
-        .uploadedFile:hover {{
-            border-color: {COLORS['primary']} !important;
-            background: {COLORS['primary_light']} !important;
-        }}
-        
-        /* ==================== BOTÕES PREMIUM ====================*/
-        .stButton > button {{
-            background: linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['primary_dark']} 100%) !important;
-            color: white !important;
-            font-size: 1.05em !important;
-            font-weight: 700 !important;
-            padding: 14px 28px !important;
-            border-radius: 10px !important;
-            border: none !important;
-            box-shadow: 0 8px 16px rgba(16, 185, 129, 0.25) !important;
-            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
-            cursor: pointer !important;
-            width: 100% !important;
-            letter-spacing: 0.5px;
-            text-transform: uppercase;
-        }}
-        
-        .stButton > button:hover {{
-            transform: translateY(-2px) !important;
-            box-shadow: 0 12px 24px rgba(16, 185, 129, 0.35) !important;
-        }}
-        
-        .stButton > button:active {{
-            transform: translateY(0) !important;
-        }}
-        
-        /* ==================== CARDS E CONTAINERS ====================*/
-        .stContainer, .card {{
-            background: white !important;
-            border-radius: 14px !important;
-            padding: 24px !important;
-            box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08) !important;
-            border: 1px solid {COLORS['neutral_200']} !important;
-            transition: all 0.3s ease !important;
-        }}
-        
-        .stContainer:hover {{
-            box-shadow: 0 8px 20px rgba(0, 0, 0, 0.12) !important;
-            transform: translateY(-2px);
-        }}
-        
-        /* ==================== FEATURE BOXES - GRID ====================*/
-        .feature-card {{
-            background: white;
-            border-radius: 14px;
-            padding: 24px;
-            text-align: center;
-            border: 2px solid {COLORS['neutral_200']};
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.06);
-            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        }}
-        
-        .feature-card:hover {{
-            border-color: {COLORS['primary']};
-            box-shadow: 0 8px 24px rgba(16, 185, 129, 0.15);
-            transform: translateY(-4px);
-        }}
-        
-        .feature-icon {{
-            font-size: 3em;
-            margin-bottom: 12px;
-            display: inline-block;
-            animation: float 3s ease-in-out infinite;
-        }}
-        
-        @keyframes float {{
-            0%, 100% {{ transform: translateY(0px); }}
-            50% {{ transform: translateY(-10px); }}
-        }}
-        
-        .feature-title {{
-            font-size: 1.3em;
-            font-weight: 700;
-            color: {COLORS['neutral_800']};
-            margin-bottom: 8px;
-        }}
-        
-        .feature-desc {{
-            color: {COLORS['neutral_600']};
-            font-size: 0.95em;
-        }}
-        
-        /* ==================== RESULTADO - BOXES COLORIDAS ====================*/
-        .result-container {{
-            border-radius: 14px;
-            padding: 28px;
-            margin: 20px 0;
-            border-left: 5px solid;
-            box-shadow: 0 8px 16px rgba(0, 0, 0, 0.08);
-            animation: slideUp 0.5s ease;
-        }}
-        
-        @keyframes slideUp {{
-            from {{
-                opacity: 0;
-                transform: translateY(20px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0);
-            }}
-        }}
-        
-        .result-container.healthy {{
-            background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);
-            border-color: {COLORS['success']};
-        }}
-        
-        .result-container.warning {{
-            background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
-            border-color: {COLORS['warning']};
-        }}
-        
-        .result-container.danger {{
-            background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
-            border-color: {COLORS['danger']};
-        }}
-        
-        .result-icon {{
-            font-size: 3em;
-            margin-bottom: 15px;
-            text-align: center;
-        }}
-        
-        .result-label {{
-            font-size: 1.8em;
-            font-weight: 900;
-            margin-bottom: 12px;
-            letter-spacing: -0.5px;
-        }}
-        
-        .result-container.healthy .result-label {{
-            color: {COLORS['primary_dark']};
-        }}
-        
-        .result-container.warning .result-label {{
-            color: #92400e;
-        }}
-        
-        .result-container.danger .result-label {{
-            color: #7f1d1d;
-        }}
-        
-        .result-text {{
-            font-size: 1.05em;
-            line-height: 1.7;
-            font-weight: 500;
-        }}
-        
-        .result-container.healthy .result-text {{
-            color: {COLORS['primary_dark']};
-        }}
-        
-        .result-container.warning .result-text {{
-            color: #78350f;
-        }}
-        
-        .result-container.danger .result-text {{
-            color: #7f1d1d;
-        }}
-        
-        /* ==================== DIVIDERS ====================*/
-        hr {{
-            border: none;
-            height: 2px;
-            background: linear-gradient(90deg, transparent, {COLORS['primary']}, transparent);
-            margin: 40px 0 !important;
-            opacity: 0.5;
-        }}
-        
-        /* ==================== INFO BOXES ====================*/
-        .stInfo, .info-box {{
-            background: linear-gradient(135deg, {COLORS['primary_light']} 0%, rgba(16, 185, 129, 0.1) 100%) !important;
-            border-left: 5px solid {COLORS['primary']} !important;
-            border-radius: 10px !important;
-            padding: 20px !important;
-            color: {COLORS['primary_dark']} !important;
-        }}
-        
-        .welcome-box {{
-            background: linear-gradient(135deg, {COLORS['primary_light']} 0%, {COLORS['primary_light']} 100%);
-            padding: 40px;
-            border-radius: 16px;
-            text-align: center;
-            border: 3px dashed {COLORS['primary']};
-            transition: all 0.3s ease;
-        }}
-        
-        .welcome-box:hover {{
-            border-color: {COLORS['primary_dark']};
-            box-shadow: 0 8px 24px rgba(16, 185, 129, 0.15);
-        }}
-        
-        /* ==================== EXPANDERS ====================*/
-        [data-testid="stExpander"] {{
-            border: 2px solid {COLORS['primary']} !important;
-            border-radius: 12px !important;
-            background: white !important;
-            overflow: hidden;
-        }}
-        
-        [data-testid="stExpanderButton"] {{
-            background: linear-gradient(90deg, {COLORS['primary_light']} 0%, white 100%) !important;
-            border-radius: 10px 10px 0 0 !important;
-        }}
-        
-        [data-testid="stExpanderButton"]:hover {{
-            background: linear-gradient(90deg, {COLORS['primary']} 0%, rgba(16, 185, 129, 0.1) 100%) !important;
-        }}
-        
-        [data-testid="stExpanderButton"] p {{
-            color: {COLORS['primary_dark']} !important;
-            font-weight: 700 !important;
-            font-size: 1.1em !important;
-            margin: 0 !important;
-        }}
-        
-        /* Garantir legibilidade do conteúdo - MUITO IMPORTANTE */
-        [data-testid="stExpanderContent"] {{
-            background: white !important;
-            padding: 25px !important;
-            border-radius: 0 0 10px 10px !important;
-            color: {COLORS['neutral_800']} !important;
-        }}
-        
-        [data-testid="stExpanderContent"] * {{
-            background: transparent !important;
-        }}
-        
-        [data-testid="stExpanderContent"] p {{
-            color: {COLORS['neutral_800']} !important;
-            font-size: 1em !important;
-            line-height: 1.7 !important;
-        }}
-        
-        [data-testid="stExpanderContent"] h1 {{
-            color: {COLORS['primary_dark']} !important;
-            background: transparent !important;
-        }}
-        
-        [data-testid="stExpanderContent"] h2 {{
-            color: {COLORS['primary']} !important;
-            background: transparent !important;
-            font-size: 1.5em !important;
-        }}
-        
-        [data-testid="stExpanderContent"] h3 {{
-            color: {COLORS['primary_dark']} !important;
-            background: transparent !important;
-        }}
-        
-        [data-testid="stExpanderContent"] ul {{
-            color: {COLORS['neutral_800']} !important;
-        }}
-        
-        [data-testid="stExpanderContent"] li {{
-            color: {COLORS['neutral_800']} !important;
-            margin-bottom: 10px !important;
-            background: transparent !important;
-        }}
-        
-        [data-testid="stExpanderContent"] strong {{
-            color: {COLORS['neutral_900']} !important;
-            font-weight: 700 !important;
-            background: transparent !important;
-        }}
-        
-        [data-testid="stExpanderContent"] div {{
-            background: transparent !important;
-            color: {COLORS['neutral_800']} !important;
-        }}
-        
-        /* ==================== RESPONSIVE DESIGN ====================*/
-        @media (max-width: 768px) {{
-            h1 {{ font-size: 2em !important; }}
-            h2 {{ font-size: 1.6em !important; }}
-            h3 {{ font-size: 1.3em !important; }}
-            
-            [data-testid="stAppViewContainer"] {{
-                padding-left: 1rem !important;
-                padding-right: 1rem !important;
-                padding-top: 1rem !important;
-            }}
-            
-            .feature-card {{
-                padding: 16px;
-            }}
-            
-            .feature-icon {{
-                font-size: 2.5em;
-            }}
-            
-            .result-container {{
-                padding: 20px;
-            }}
-        }}
-        
-        @media (max-width: 480px) {{
-            h1 {{ font-size: 1.6em !important; }}
-            h2 {{ font-size: 1.3em !important; }}
-            
-            .result-icon {{ font-size: 2em; }}
-            .result-label {{ font-size: 1.4em; }}
-        }}
-        
-        /* ==================== ACESSIBILIDADE ====================*/
-        button {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }}
-        
-        .stButton > button:focus {{
-            outline: 3px solid {COLORS['primary']};
-            outline-offset: 2px;
-        }}
-        
-        /* ==================== LOADING STATE ====================*/
-        .loading {{
-            animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite;
-        }}
-        
-        @keyframes pulse {{
-            0%, 100% {{ opacity: 1; }}
-            50% {{ opacity: 0.5; }}
-        }}
-    </style>
-""", unsafe_allow_html=True)
+# Folha de estilo pré-compilada uma vez por processo (ver ui_assets.py)
+st.markdown(stylesheet(), unsafe_allow_html=True)
+
+
+# ==================== CONFIGURAÇÃO DO PIPELINE ====================
+# Modelo, ingestão e kernels de features ficam em core.py (sem Streamlit),
+# que também lê AGROVISION_FAST_INGEST, AGROVISION_FEATURE_KERNEL e os
+# limites da análise em faixas; o app importa de lá só o que usa.
+
+# Quase duplicatas: uploads cujo hash perceptual fica a até N bits de uma
+# imagem já analisada (e com a mesma cor média) reaproveitam o diagnóstico.
+# Desativado por padrão (N < 0); N vai até phash_index.MAX_DISTANCE.
+NEAR_DUPLICATE_DISTANCE = int(os.environ.get("AGROVISION_PHASH_DISTANCE", "-1"))
+if NEAR_DUPLICATE_DISTANCE > MAX_PHASH_DISTANCE:
+    raise ValueError(
+        f"AGROVISION_PHASH_DISTANCE={NEAR_DUPLICATE_DISTANCE}: use até {MAX_PHASH_DISTANCE} bits (ou -1 para desativar)"
+    )
+
+# Mapa por região: grades oferecidas (células por lado) e lado máximo da
+# prévia em que o mapa é desenhado (ver integral.py).
+REGION_GRID_SIZES = (4, 8, 16)
+REGION_PREVIEW_SIZE = 512
+
+# Histórico: cada análise pedida é gravada em SQLite (ver history.py), em
+# lotes de AGROVISION_HISTORY_BATCH registros. Caminho vazio desativa; o
+# padrão fica no diretório de trabalho (ignorado pelo .gitignore, com -wal/-shm).
+HISTORY_PATH = os.environ.get("AGROVISION_HISTORY_PATH", ".agrovision_history.sqlite")
+HISTORY_BATCH = int(os.environ.get("AGROVISION_HISTORY_BATCH", "16"))
+HISTORY_RECENT = 20
+
+# Casos semelhantes: vizinhos mais próximos, nas features de cor, entre as
+# análises do histórico (ver similarity.py); índice exato até
+# AGROVISION_SIMILAR_IVF_MIN registros, particionado (IVF) acima disso.
+SIMILAR_TOP_K = int(os.environ.get("AGROVISION_SIMILAR_TOP_K", "5"))
+SIMILAR_IVF_MIN = int(os.environ.get("AGROVISION_SIMILAR_IVF_MIN", "250000"))
+SIMILAR_NPROBE = int(os.environ.get("AGROVISION_SIMILAR_NPROBE", "16"))
+
+# Vários uploads de uma vez: decodificação/pré-processamento em
+# AGROVISION_UPLOAD_WORKERS threads (o Pillow libera o GIL) e classificação
+# vetorizada em lotes de até AGROVISION_UPLOAD_BATCH imagens; um lote
+# incompleto espera no máximo UPLOAD_BATCH_WAIT segundos (progresso fluido).
+UPLOAD_WORKERS = int(os.environ.get("AGROVISION_UPLOAD_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+UPLOAD_BATCH = int(os.environ.get("AGROVISION_UPLOAD_BATCH", "16"))
+UPLOAD_BATCH_WAIT = 0.1
+GALLERY_THUMB_SIZE = 96
+
+
+# ==================== PIPELINE DE ANÁLISE (CACHE E SESSÃO) ====================
+@st.cache_resource
+def get_model() -> SimpleAgroVisionModel:
+    """Modelo único por processo, compartilhado entre sessões e reexecuções."""
+    return SimpleAgroVisionModel()
+
+
+@st.cache_resource
+def get_backend() -> ModelBackend:
+    """Backend de modelo configurado por AGROVISION_MODEL_BACKEND (ver backends.py)."""
+    return load_backend(model=get_model())
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """
+    Cache compartilhado entre sessões, endereçado pelo hash dos bytes.
+
+    AGROVISION_CACHE_MB limita a camada em memória; AGROVISION_CACHE_DIR
+    ativa a camada em disco (limitada por AGROVISION_CACHE_DISK_MB).
+    """
+    return ResultCache(
+        max_memory_bytes=int(os.environ.get("AGROVISION_CACHE_MB", "64")) * 1024 * 1024,
+        disk_dir=os.environ.get("AGROVISION_CACHE_DIR") or None,
+        max_disk_bytes=int(os.environ.get("AGROVISION_CACHE_DISK_MB", "512")) * 1024 * 1024,
+    )
+
+
+@st.cache_resource
+def get_history() -> HistoryStore:
+    """Histórico compartilhado entre sessões; o lote pendente é gravado ao sair."""
+    store = HistoryStore(HISTORY_PATH, batch_size=HISTORY_BATCH)
+    atexit.register(store.flush)
+    return store
 
 
-class SimpleAgroVisionModel:
+@st.cache_resource
+def get_similarity_index() -> SimilarityIndex:
+    """Índice de casos semelhantes compartilhado entre sessões (atualizado a partir do histórico)."""
+    return SimilarityIndex(dim=4, ivf_min_size=SIMILAR_IVF_MIN, nprobe=SIMILAR_NPROBE)
+
+
+@st.cache_resource
+def get_phash_index() -> PHashIndex:
     """
-    Versão simplificada da ideia do AgroVision AI.
+    Índice de quase duplicatas compartilhado entre sessões.
 
-    Em vez de treinar uma CNN completa, esta POC utiliza
-    features simples de cor (média de canais e proporção
-    de pixels amarelados / amarronzados) para classificar
-    a planta em três categorias:
+    AGROVISION_PHASH_MAX_ENTRIES limita o tamanho; AGROVISION_PHASH_PATH
+    persiste o índice em JSON entre reinícios.
+    """
+    return PHashIndex(
+        max_distance=max(0, NEAR_DUPLICATE_DISTANCE),
+        max_entries=int(os.environ.get("AGROVISION_PHASH_MAX_ENTRIES", "10000")),
+        path=os.environ.get("AGROVISION_PHASH_PATH") or None,
+    )
+
+
+def _analysis_payload(analysis: CachedAnalysis, namespace: str) -> dict:
+    """Diagnóstico guardado no índice de quase duplicatas (sem o array), com o backend que o deu."""
+    return {
+        "backend": namespace,
+        "features": list(analysis.features),
+        "label": analysis.label,
+        "explanation": analysis.explanation,
+        "status": analysis.status,
+    }
 
-    - Planta Saudável
-    - Possível Praga / Estresse Moderado
-    - Possível Doença ou Danos Graves
 
-    Isso mantém a lógica de "visão computacional + decisão automática",
-    mas em uma forma leve e demonstrável.
+def load_upload(uploaded_file) -> dict:
+    """
+    Decodifica e pré-processa cada upload distinto uma única vez.
+
+    O estado fica em `st.session_state["upload"]`, identificado pelo
+    `file_id` do Streamlit; reexecuções do script (inclusive a do clique no
+    botão) apenas o reutilizam. Se o conteúdo já foi analisado antes (por
+    esta ou outra sessão), o resultado vem direto do cache de resultados;
+    se uma imagem quase idêntica já foi analisada, o diagnóstico dela é
+    reaproveitado (`near_duplicate` guarda a distância em bits).
+    """
+    upload = st.session_state.get("upload")
+    if upload is not None and upload["file_id"] == uploaded_file.file_id:
+        return upload
+
+    with timer("read_upload"):
+        image_bytes = uploaded_file.getvalue()
+    upload = prepare_upload(
+        uploaded_file.file_id,
+        uploaded_file.name,
+        image_bytes,
+        get_model(),
+        get_result_cache(),
+        get_phash_index() if NEAR_DUPLICATE_DISTANCE >= 0 else None,
+        get_backend().cache_namespace(),
+    )
+    st.session_state["upload"] = upload
+    return upload
+
+
+def prepare_upload(
+    file_id: str,
+    name: str,
+    image_bytes: bytes,
+    model: SimpleAgroVisionModel,
+    result_cache: ResultCache,
+    phash_index: Optional[PHashIndex],
+    namespace: str,
+) -> dict:
     """
+    Consulta os caches e pré-processa um upload, sem tocar no estado da sessão.
 
-    def preprocess_image(self, image: Image.Image) -> np.ndarray:
-        """
-        Converte a imagem para RGB, redimensiona e retorna um array numpy.
-        """
-        image = image.convert("RGB")
-        image = image.resize((256, 256))
-        return np.array(image)
-
-    def extract_color_features(self, img_array: np.ndarray) -> Tuple[float, float, float, float]:
-        """
-        Extrai features simples de cor:
-        - média de R, G, B
-        - proporção de pixels 'amarelados/amarronzados'
-        """
-        arr = img_array / 255.0
-        r = arr[:, :, 0]
-        g = arr[:, :, 1]
-        b = arr[:, :, 2]
-
-        mean_r = float(r.mean())
-        mean_g = float(g.mean())
-        mean_b = float(b.mean())
-
-        brownish_mask = (r > 0.4) & (g > 0.3) & (b < 0.4)
-        brownish_ratio = float(brownish_mask.mean())
-
-        return mean_r, mean_g, mean_b, brownish_ratio
-
-    def classify(self, img_array: np.ndarray) -> Tuple[str, str, str]:
-        """
-        Classifica a planta com base nas features de cor.
-
-        Retorna:
-            classe (str), explicação (str), status (str)
-        """
-        mean_r, mean_g, mean_b, brownish_ratio = self.extract_color_features(img_array)
-
-        total_mean = mean_r + mean_g + mean_b + 1e-6
-        green_ratio = mean_g / total_mean
-
-        if green_ratio > 0.40 and brownish_ratio < 0.05:
-            label = "Planta Saudável"
-            status = "healthy"
-            explanation = (
-                "A imagem apresenta predominância de tons esverdeados e baixa presença de manchas. "
-                "Sua planta está em perfeito estado de saúde! Mantenha os cuidados regulares."
-            )
-        elif brownish_ratio < 0.15:
-            label = "⚠️ Possível Estresse"
-            status = "warning"
-            explanation = (
-                "Detectamos sinais moderados de variação de cor. Pode indicar estresse hídrico, "
-                "deficiência nutricional ou início de pragas. Recomendamos aumentar a atenção."
-            )
+    Recebe os recursos já resolvidos para poder rodar nas threads do modo
+    com vários arquivos. `namespace` (`ModelBackend.cache_namespace()`)
+    separa nos caches os diagnósticos de cada backend; `key` continua sendo
+    só o hash do conteúdo (histórico, casos semelhantes).
+    """
+    metrics.inc("uploads")
+    key = content_key(image_bytes)
+    cache_key = content_key(image_bytes, namespace)
+    analysis = result_cache.get(cache_key)
+    metrics.inc("result_cache_lookups", result="miss" if analysis is None else "hit")
+
+    if analysis is not None:
+        img_array = analysis.img_array
+    else:
+        with timer("open_upload"):
+            image = model.draft_on_decode(Image.open(io.BytesIO(image_bytes)))
+        if image.width * image.height > STREAMING_MIN_PIXELS:
+            # JPEG/PNG continuam decodificados inteiros: as faixas poupam a
+            # cópia RGB e os temporários do resize (ver STREAMING_MIN_PIXELS)
+            with timer("strips"):
+                img_array = preprocess_in_strips(image, STREAMING_MEMORY_BUDGET, SimpleAgroVisionModel.TARGET_SIZE)
         else:
-            label = "🚨 Danos Graves Detectados"
-            status = "danger"
-            explanation = (
-                "A proporção elevada de manchas amareladas/amarronzadas sugere doença avançada ou danos "
-                "significativos. Recomendamos ação imediata e consulta com especialista."
+            img_array = model.preprocess_image(image)
+
+    signature = near_duplicate = None
+    if analysis is None and phash_index is not None:
+        with timer("phash_lookup"):
+            signature = image_signature(img_array)
+            match = phash_index.lookup(*signature)
+        if match is not None and match[0].get("backend") != namespace:
+            # Diagnóstico de outro backend (ou de antes da troca): não vale para este
+            match = None
+        metrics.inc("near_duplicate_lookups", result="miss" if match is None else "hit")
+        if match is not None:
+            payload, near_duplicate = match
+            # Fica só neste upload: o cache de resultados é por conteúdo exato e
+            # não deve devolver o diagnóstico de outra imagem como se fosse deste
+            analysis = CachedAnalysis(
+                img_array, tuple(payload["features"]), payload["label"], payload["explanation"], payload["status"]
             )
 
-        return label, explanation, status
+    return {
+        "file_id": file_id,
+        "name": name,
+        "key": key,
+        "cache_key": cache_key,
+        "namespace": namespace,
+        "image_bytes": image_bytes,
+        "img_array": img_array,
+        "analysis": analysis,
+        "signature": signature,
+        "near_duplicate": near_duplicate,
+        "requested": False,
+    }
+
 
+def classify_upload(upload: dict) -> CachedAnalysis:
+    """Classifica o upload sob demanda (uma vez) e guarda no cache de resultados."""
+    if upload["analysis"] is None:
+        img_array = upload["img_array"]
+        # Etapa própria: "classify" é a de `SimpleAgroVisionModel.classify`
+        with timer("classify_upload"):
+            # Kernel configurado (AGROVISION_FEATURE_KERNEL) e etapa "features"
+            # das métricas; a imagem integral fica só para o mapa por região
+            features = get_model().extract_color_features(img_array)
+            label, explanation, status = get_backend().classify(img_array, features)
+        metrics.inc("analyses", status=status)
+        upload["analysis"] = CachedAnalysis(img_array, features, label, explanation, status)
+        get_result_cache().put(upload["cache_key"], upload["analysis"])
+        if upload["signature"] is not None:
+            get_phash_index().add(*upload["signature"], _analysis_payload(upload["analysis"], upload["namespace"]))
+    return upload["analysis"]
+
+
+def classify_uploads(uploads: List[dict]) -> None:
+    """Classifica de uma vez (features vetorizadas) os uploads ainda sem análise."""
+    pending = [upload for upload in uploads if upload["analysis"] is None]
+    if not pending:
+        return
+    model = get_model()
+    batch = np.stack([upload["img_array"] for upload in pending])
+    with timer("classify_batch"):
+        features = model.extract_color_features_batch(batch)
+        results = get_backend().classify_batch(batch, features)
+    for upload, row, (label, explanation, status) in zip(pending, features, results):
+        metrics.inc("analyses", status=status)
+        upload["analysis"] = CachedAnalysis(upload["img_array"], tuple(map(float, row)), label, explanation, status)
+        get_result_cache().put(upload["cache_key"], upload["analysis"])
+        if upload["signature"] is not None:
+            get_phash_index().add(*upload["signature"], _analysis_payload(upload["analysis"], upload["namespace"]))
+
+
+def analyze_uploads(uploaded_files: list, on_progress) -> List[dict]:
+    """
+    Pré-processa os arquivos em paralelo e classifica em lotes à medida que
+    ficam prontos; `on_progress(concluídos, upload)` é chamado a cada imagem
+    com resultado. Arquivos que não abrem viram entradas com `error`.
+    """
+    model = get_model()
+    result_cache = get_result_cache()
+    phash_index = get_phash_index() if NEAR_DUPLICATE_DISTANCE >= 0 else None
+    namespace = get_backend().cache_namespace()
+
+    uploads: List[Optional[dict]] = [None] * len(uploaded_files)
+    pending: List[dict] = []
+    pending_since = 0.0
+    done = 0
+
+    def finish(batch: List[dict]) -> None:
+        nonlocal done
+        classify_uploads(batch)
+        for upload in batch:
+            done += 1
+            on_progress(done, upload)
+
+    with ThreadPoolExecutor(UPLOAD_WORKERS) as pool:
+        futures = {
+            pool.submit(
+                prepare_upload, f.file_id, f.name, f.getvalue(), model, result_cache, phash_index, namespace
+            ): i
+            for i, f in enumerate(uploaded_files)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                upload = future.result()
+            except Exception as exc:  # arquivo corrompido ou formato não suportado
+                f = uploaded_files[i]
+                uploads[i] = {"file_id": f.file_id, "name": f.name, "analysis": None, "error": str(exc)}
+                done += 1
+                on_progress(done, uploads[i])
+                continue
+            uploads[i] = upload
+            if upload["analysis"] is not None:
+                finish([upload])
+            else:
+                if not pending:
+                    pending_since = time.perf_counter()
+                pending.append(upload)
+                if len(pending) >= UPLOAD_BATCH or time.perf_counter() - pending_since >= UPLOAD_BATCH_WAIT:
+                    finish(pending)
+                    pending = []
+        finish(pending)
+
+    return uploads
 
 
 def render_sidebar():
     """Renderiza sidebar premium com informações e guia de uso"""
+    logo, how_to_use, tips, footer = sidebar_html()
     with st.sidebar:
-        # Logo e título
-        st.markdown(f"""
-            <div style='text-align: center; margin-bottom: 30px;'>
-                <h1 style='font-size: 2em; color: white; margin: 0;'>🌱</h1>
-                <h3 style='color: white; margin: 10px 0 5px 0;'>AgroVision AI</h3>
-                <p style='color: rgba(255,255,255,0.8); font-size: 0.9em; margin: 0;'>Diagnóstico Inteligente</p>
-            </div>
-        """, unsafe_allow_html=True)
-        
+        st.markdown(logo, unsafe_allow_html=True)
         st.markdown("---")
-        
-        # Seção "Como Usar"
-        st.markdown("""
-        <h4 style='color: white; margin-bottom: 15px; font-size: 1.1em;'>📋 Como Usar</h4>
-        """, unsafe_allow_html=True)
-        
-        steps = [
-            ("1️⃣", "Carregar Imagem", "Envie uma foto clara da folha ou planta"),
-            ("2️⃣", "Analisar", "Clique no botão de análise"),
-            ("3️⃣", "Resultado", "Receba diagnóstico instantâneo")
-        ]
-        
-        for icon, step, desc in steps:
-            st.markdown(f"""
-            <div style='
-                background: rgba(255,255,255,0.1);
-                padding: 12px;
-                border-radius: 8px;
-                margin-bottom: 10px;
-                border-left: 3px solid white;
-            '>
-                <div style='font-size: 1.2em; margin-bottom: 5px;'>{icon} <b style='color:white;'>{step}</b></div>
-                <div style='color: rgba(255,255,255,0.7); font-size: 0.85em;'>{desc}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
+        st.markdown(how_to_use, unsafe_allow_html=True)
         st.markdown("---")
-        
-        # Dicas
-        st.markdown("""
-        <h4 style='color: white; margin-bottom: 15px; font-size: 1.1em;'>💡 Dicas</h4>
-        """, unsafe_allow_html=True)
-        
-        tips = [
-            "Use boa iluminação natural",
-            "Foque em uma folha por vez",
-            "Evite sombras na imagem",
-            "Carregue arquivos JPG ou PNG"
-        ]
-        
-        for tip in tips:
-            st.markdown(f"""
-            <div style='color: rgba(255,255,255,0.9); margin-bottom: 8px; font-size: 0.9em;'>
-                ✓ {tip}
-            </div>
-            """, unsafe_allow_html=True)
-        
+        st.markdown(tips, unsafe_allow_html=True)
         st.markdown("---")
-        
-        # Rodapé
-        st.markdown("""
-        <div style='text-align: center; color: rgba(255,255,255,0.6); font-size: 0.8em;'>
-            <p style='margin: 5px 0;'>AgroVision AI • POC 2025</p>
-            <p style='margin: 5px 0;'>Powered by Python & Streamlit</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(footer, unsafe_allow_html=True)
+
+
+def record_analysis(upload: dict, analysis: CachedAnalysis, plot: str) -> None:
+    """Registra no histórico uma análise pedida pelo usuário."""
+    get_history().add(HistoryRecord(
+        datetime.now().timestamp(),
+        upload["key"],
+        plot.strip() or None,
+        tuple(analysis.features),
+        analysis.label,
+        analysis.status,
+    ))
+    metrics.inc("history_records")
+
+
+def get_integral(upload: dict) -> IntegralFeatures:
+    """
+    Imagem integral do upload, montada na primeira consulta do mapa.
+
+    Uma única passada sobre os pixels: as células da grade e cada região
+    de interesse saem dela em O(1). O diagnóstico da imagem inteira continua
+    em `extract_color_features` (kernel configurado).
+    """
+    if upload.get("integral") is None:
+        with timer("integral"):
+            upload["integral"] = IntegralFeatures(upload["img_array"])
+    return upload["integral"]
+
+
+@st.cache_resource
+def get_metrics_exporter() -> Optional[str]:
+    """
+    Sobe o endpoint Prometheus uma vez por processo (AGROVISION_METRICS=1).
+
+    Retorna a URL de coleta, ou None se a porta estiver ocupada (por
+    exemplo, outro processo do app na mesma máquina).
+    """
+    try:
+        server = metrics.start_exporter()
+    except OSError:
+        return None
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/metrics"
+
+
+def render_metrics_panel():
+    """Painel de depuração na sidebar com os tempos por etapa e os contadores."""
+    if not metrics.REGISTRY.enabled:
+        return
+    exporter_url = get_metrics_exporter()
+    snapshot = metrics.REGISTRY.snapshot()
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("🔧 Métricas do Pipeline", expanded=False):
+            if exporter_url:
+                st.caption(f"Prometheus: {exporter_url}")
+            else:
+                st.caption("Endpoint Prometheus indisponível (porta ocupada)")
+            if snapshot["stages"]:
+                st.dataframe(
+                    [
+                        {
+                            "etapa": row["stage"],
+                            "n": row["count"],
+                            "média ms": round(row["mean_ms"], 2),
+                            "p50 ms": round(row["p50_ms"], 2),
+                            "p90 ms": round(row["p90_ms"], 2),
+                            "p99 ms": round(row["p99_ms"], 2),
+                        }
+                        for row in snapshot["stages"]
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            for row in snapshot["counters"]:
+                labels = ", ".join(f"{k}={v}" for k, v in row["labels"].items())
+                st.caption(f"{row['counter']}{f' ({labels})' if labels else ''}: {row['value']:g}")
+            st.caption("Cache de resultados")
+            st.json(get_result_cache().stats(), expanded=False)
+            if NEAR_DUPLICATE_DISTANCE >= 0:
+                st.caption("Índice de quase duplicatas")
+                st.json(get_phash_index().stats(), expanded=False)
+
+
+def render_history_panel():
+    """Últimas análises e resumo dos últimos 30 dias na sidebar (consultas indexadas)."""
+    if not HISTORY_PATH:
+        return
+    history = get_history()
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("🗂️ Histórico de Análises", expanded=False):
+            plots = history.plots()
+            plot = st.selectbox("Talhão / planta", ["Todos"] + plots, key="history_plot")
+            plot = None if plot == "Todos" else plot
+
+            with timer("history_query"):
+                records = history.recent(HISTORY_RECENT, plot=plot)
+                now = datetime.now().timestamp()
+                summary = history.summary(now - 30 * 86400, now, plot=plot)
+
+            if not records:
+                st.caption("Nenhuma análise registrada ainda.")
+                return
+            st.caption(" · ".join(
+                f"{STATUS_ICONS[status]} {summary[status]['count']}"
+                for status in ("healthy", "warning", "danger") if status in summary
+            ) + " nos últimos 30 dias")
+            st.dataframe(
+                [
+                    {
+                        "quando": datetime.fromtimestamp(record.timestamp).strftime("%d/%m %H:%M"),
+                        "talhão": record.plot or "—",
+                        "status": record.label,
+                        "manchas": f"{record.features[3]:.1%}",
+                    }
+                    for record in records
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
 
 
 def render_header():
     """Renderiza header premium com animação"""
-    st.markdown(f"""
-    <div style='text-align: center; margin-bottom: 50px; animation: slideDown 0.6s ease;'>
-        <div style='font-size: 4em; margin-bottom: 20px; animation: float 3s ease-in-out infinite;'>
-            🌿
-        </div>
-        <h1 style='margin: 0 0 15px 0; color: {COLORS["primary_dark"]};'>
-            AgroVision AI
-        </h1>
-        <p style='
-            font-size: 1.4em;
-            color: {COLORS["primary"]};
-            margin: 10px 0 0 0;
-            font-weight: 600;
-            letter-spacing: 0.5px;
-        '>
-            Diagnóstico Inteligente de Saúde de Plantas
-        </p>
-        <p style='
-            color: {COLORS["neutral_600"]};
-            font-size: 1.05em;
-            margin-top: 15px;
-            max-width: 600px;
-            margin-left: auto;
-            margin-right: auto;
-        '>
-            Análise por inteligência artificial em tempo real
-        </p>
-    </div>
-    
-    <style>
-        @keyframes slideDown {{
-            from {{
-                opacity: 0;
-                transform: translateY(-30px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0);
-            }}
-        }}
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(header_html(), unsafe_allow_html=True)
 
 
 def render_features():
     """Renderiza cards de funcionalidades"""
-    st.markdown(f"""
-    <h2 style='text-align: center; margin-bottom: 40px; color: {COLORS["primary"]};'>
-        Por que AgroVision AI?
-    </h2>
-    """, unsafe_allow_html=True)
+    title, cards = features_html()
+    st.markdown(title, unsafe_allow_html=True)
     
-    col1, col2, col3 = st.columns(3, gap="large")
-    
-    features = [
-        {
-            "icon": "⚡",
-            "title": "Análise Rápida",
-            "desc": "Resultados em segundos com processamento otimizado",
-            "col": col1
-        },
-        {
-            "icon": "🎯",
-            "title": "Precisão",
-            "desc": "Algoritmo inteligente baseado em aprendizado de máquina",
-            "col": col2
-        },
-        {
-            "icon": "🚀",
-            "title": "Inovador",
-            "desc": "Tecnologia de ponta em visão computacional",
-            "col": col3
-        }
-    ]
-    
-    for feature in features:
-        with feature["col"]:
-            st.markdown(f"""
-            <div class='feature-card'>
-                <div class='feature-icon'>{feature['icon']}</div>
-                <div class='feature-title'>{feature['title']}</div>
-                <div class='feature-desc'>{feature['desc']}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    columns = st.columns(3, gap="large")
+    for col, card in zip(columns, cards):
+        with col:
+            st.markdown(card, unsafe_allow_html=True)
 
 
 def render_upload_section():
     """Renderiza seção de upload com UX otimizada"""
-    st.markdown(f"""
-    <h2 style='text-align: center; margin: 50px 0 30px 0;'>
-        📸 Envie uma Foto
-    </h2>
-    """, unsafe_allow_html=True)
+    title, requirements = upload_html()
+    st.markdown(title, unsafe_allow_html=True)
     
     col_left, col_right = st.columns([1, 1], gap="large")
     
     with col_left:
-        st.markdown(f"""
-        <div style='
-            background: white;
-            padding: 30px;
-            border-radius: 14px;
-            border: 2px solid {COLORS["neutral_200"]};
-        '>
-            <h3 style='text-align: center; margin-bottom: 15px;'>
-                Requisitos da Imagem
-            </h3>
-            <ul style='color: {COLORS["neutral_700"]}; line-height: 2;'>
-                <li>✓ Formato: JPG, JPEG ou PNG</li>
-                <li>✓ Iluminação: Natural e clara</li>
-                <li>✓ Foco: Folha ou planta inteira</li>
-                <li>✓ Tamanho: Até 200MB</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(requirements, unsafe_allow_html=True)
     
     with col_right:
-        uploaded_file = st.file_uploader(
-            "Selecione uma imagem",
+        uploaded_files = st.file_uploader(
+            "Selecione uma ou mais imagens",
             type=["jpg", "jpeg", "png"],
-            help="Arraste e solte a imagem aqui ou clique para selecionar"
+            accept_multiple_files=True,
+            help="Arraste e solte as imagens aqui ou clique para selecionar"
         )
+        if HISTORY_PATH:
+            st.text_input(
+                "🏷️ Talhão / planta (opcional)",
+                key="plot_id",
+                help="Identificador gravado no histórico junto com a análise",
+            )
         
-        if uploaded_file is not None:
+        if len(uploaded_files) == 1:
             st.success("✅ Arquivo carregado com sucesso!")
-            return uploaded_file
+        elif uploaded_files:
+            st.success(f"✅ {len(uploaded_files)} arquivos carregados com sucesso!")
     
-    return uploaded_file
+    return uploaded_files
+
+
+def region_preview(upload: dict, image: Image.Image) -> Image.Image:
+    """Prévia RGBA (lado <= REGION_PREVIEW_SIZE) sobre a qual o mapa é desenhado, uma por upload."""
+    if upload.get("preview") is None:
+        preview = image.convert("RGB")
+        preview.thumbnail((REGION_PREVIEW_SIZE, REGION_PREVIEW_SIZE))
+        upload["preview"] = preview.convert("RGBA")
+    return upload["preview"]
+
+
+def region_heatmap(
+    preview: Image.Image,
+    statuses: List[List[str]],
+    roi: Optional[Tuple[float, float, float, float]] = None,
+) -> Image.Image:
+    """
+    Sobrepõe à prévia a cor do status de cada célula da grade e, se
+    informada, a região de interesse (frações x0, y0, x1, y1).
+    """
+    rows, cols = len(statuses), len(statuses[0])
+    cells = Image.new("RGBA", (cols, rows))
+    cells.putdata([
+        ImageColor.getrgb(STATUS_COLORS.get(status, STATUS_COLORS["healthy"])) + (90,)
+        for row in statuses for status in row
+    ])
+    heatmap = Image.alpha_composite(preview, cells.resize(preview.size, Image.NEAREST))
+
+    width, height = heatmap.size
+    draw = ImageDraw.Draw(heatmap)
+    for i in range(1, cols):
+        x = round(i * width / cols)
+        draw.line([(x, 0), (x, height)], fill=(255, 255, 255, 110))
+    for i in range(1, rows):
+        y = round(i * height / rows)
+        draw.line([(0, y), (width, y)], fill=(255, 255, 255, 110))
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        draw.rectangle(
+            [(x0 * (width - 1), y0 * (height - 1)), (x1 * (width - 1), y1 * (height - 1))],
+            outline=(255, 255, 255, 255), width=3,
+        )
+    return heatmap
 
 
-def render_analysis_result(image: Image.Image, label: str, explanation: str, status: str):
-    """Renderiza resultado da análise com animação"""
+@st.fragment
+def render_region_map(image: Image.Image, upload: dict):
+    """
+    Mapa por célula da grade e reclassificação de uma região de interesse.
+
+    Fragmento próprio: mexer na grade ou na região refaz só o mapa.
+    """
+    integral = get_integral(upload)
+    model = get_model()
+
+    grid = st.select_slider(
+        "Células por lado", options=REGION_GRID_SIZES, value=REGION_GRID_SIZES[1], key="region_grid"
+    )
+    x_range = st.slider("Região de interesse — horizontal (%)", 0, 100, (25, 75), key="region_x")
+    y_range = st.slider("Região de interesse — vertical (%)", 0, 100, (25, 75), key="region_y")
+
+    with timer("region_map"):
+        _, statuses = integral.classify_grid(model, grid, grid)
+        roi = (x_range[0] / 100, y_range[0] / 100, x_range[1] / 100, y_range[1] / 100)
+        box = integral.box_from_fractions((roi[0], roi[2]), (roi[1], roi[3]))
+        empty = box[0] == box[2] or box[1] == box[3]
+        heatmap = region_heatmap(region_preview(upload, image), statuses, None if empty else roi)
+
+    st.image(heatmap, use_column_width="auto", output_format="PNG")
+
+    flat = [status for row in statuses for status in row]
+    st.caption(" · ".join(
+        f"{STATUS_ICONS[status]} {flat.count(status)} de {len(flat)} células"
+        for status in ("healthy", "warning", "danger") if status in flat
+    ))
+
+    if empty:
+        st.info("Selecione uma região com largura e altura maiores que zero.")
+        return
+    mean_r, mean_g, mean_b, brownish_ratio = integral.region_features(box)
+    label, _, _ = model.classify_features((mean_r, mean_g, mean_b, brownish_ratio))
+    green_ratio = mean_g / (mean_r + mean_g + mean_b + 1e-6)
+    st.markdown(
+        f"**Região selecionada:** {label} — "
+        f"verde {green_ratio:.0%}, pixels amarronzados {brownish_ratio:.1%}"
+    )
+
+
+def render_analysis_result(
+    image: Image.Image, label: str, explanation: str, status: str, upload: Optional[dict] = None
+):
+    """Renderiza resultado da análise com animação (e o mapa por região, com `upload`)"""
     col_image, col_result = st.columns([1, 1], gap="large")
     
     with col_image:
-        st.markdown(f"""
-        <div style='
-            background: white;
-            padding: 20px;
-            border-radius: 14px;
-            border: 2px solid {COLORS["neutral_200"]};
-        '>
-            <h3 style='text-align: center; margin-bottom: 15px;'>📷 Imagem Analisada</h3>
-        </div>
-        """, unsafe_allow_html=True)
-        st.image(image, use_column_width="auto", output_format="auto")
+        st.markdown(panel_title_html("📷 Imagem Analisada"), unsafe_allow_html=True)
+        if upload is None:
+            st.image(image, use_column_width="auto", output_format="auto")
+        else:
+            tab_image, tab_map = st.tabs(["📷 Original", "🗺️ Mapa por Região"])
+            with tab_image:
+                st.image(image, use_column_width="auto", output_format="auto")
+            with tab_map:
+                render_region_map(image, upload)
     
     with col_result:
-        st.markdown(f"""
-        <div style='
-            background: white;
-            padding: 20px;
-            border-radius: 14px;
-            border: 2px solid {COLORS["neutral_200"]};
-            margin-bottom: 20px;
-        '>
-            <h3 style='text-align: center; margin-bottom: 15px;'>🔍 Diagnóstico</h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Mapear status para emojis e cores
-        status_map = {
-            "healthy": ("✅ Saudável", COLORS["success"]),
-            "warning": ("⚠️ Atenção", COLORS["warning"]),
-            "danger": ("🚨 Crítico", COLORS["danger"])
-        }
-        
-        emoji_status, color = status_map.get(status, ("❓ Desconhecido", COLORS["neutral_600"]))
-        
-        st.markdown(f"""
-        <div class='result-container {status}'>
-            <div class='result-icon'>
-                {['✅', '⚠️', '🚨'][['healthy', 'warning', 'danger'].index(status) if status in ['healthy', 'warning', 'danger'] else 0]}
-            </div>
-            <div class='result-label'>{label}</div>
-            <div class='result-text'>{explanation}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(panel_title_html("🔍 Diagnóstico", margin_bottom=20), unsafe_allow_html=True)
+        st.markdown(result_html(status, label, explanation), unsafe_allow_html=True)
+
+
+def render_upload_result(upload: dict, image: Image.Image, analysis: CachedAnalysis):
+    """Resultado, aviso de quase duplicata e recomendações de um upload analisado."""
+    with timer("render_result"):
+        render_analysis_result(image, analysis.label, analysis.explanation, analysis.status, upload)
+    if upload["near_duplicate"] is not None:
+        st.caption(
+            "♻️ Diagnóstico reaproveitado de uma imagem quase idêntica já analisada "
+            f"(diferença de {upload['near_duplicate']} bits no hash perceptual)."
+        )
+    if HISTORY_PATH and SIMILAR_TOP_K > 0:
+        with timer("render_similar"):
+            render_similar_cases(upload, analysis)
+    
+    with timer("render_recommendations"):
+        render_recommendations(analysis.status)
+
+
+def render_similar_cases(upload: dict, analysis: CachedAnalysis):
+    """Análises do histórico mais parecidas (features de cor), exceto a própria imagem."""
+    index = get_similarity_index()
+    history = get_history()
+    with timer("similar_sync"):
+        index.sync_history(history)
+    with timer("similar_query"):
+        # Folga para descartar reenvios da mesma imagem
+        matches = index.search(feature_vector(analysis.features), 3 * SIMILAR_TOP_K)
+        records = history.get(record_id for record_id, _ in matches)
+    cases = [
+        (records[record_id], distance)
+        for record_id, distance in matches
+        if record_id in records and records[record_id].content_key != upload["key"]
+    ][:SIMILAR_TOP_K]
+
+    with st.expander("🔎 Casos Semelhantes", expanded=analysis.status == "danger"):
+        if not cases:
+            st.caption("Nenhuma outra análise no histórico ainda.")
+            return
+        st.dataframe(
+            [
+                {
+                    "quando": datetime.fromtimestamp(record.timestamp).strftime("%d/%m/%Y %H:%M"),
+                    "talhão": record.plot or "—",
+                    "status": record.label,
+                    "manchas": f"{record.features[3]:.1%}",
+                    "distância": round(distance, 4),
+                }
+                for record, distance in cases
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(f"Índice {index.kind} com {len(index)} análises registradas.")
+
+
+def gallery_thumbnail(upload: dict) -> Image.Image:
+    """Miniatura da galeria a partir do array já pré-processado (sem nova decodificação)."""
+    if upload.get("thumb") is None:
+        upload["thumb"] = Image.fromarray(upload["img_array"]).resize(
+            (GALLERY_THUMB_SIZE, GALLERY_THUMB_SIZE), Image.BILINEAR
+        )
+    return upload["thumb"]
+
+
+def render_batch_section(uploaded_files: list):
+    """Vários arquivos: análise concorrente com progresso, galeria e detalhamento."""
+    file_ids = tuple(f.file_id for f in uploaded_files)
+    batch = st.session_state.get("batch")
+    if batch is None or batch["file_ids"] != file_ids:
+        col_btn = st.columns([1, 3, 1])
+        with col_btn[1]:
+            analyze_button = st.button(
+                f"🚀 ANALISAR {len(uploaded_files)} IMAGENS",
+                use_container_width=True,
+                key="analyze_batch_button"
+            )
+        if not analyze_button:
+            return
+        
+        total = len(uploaded_files)
+        progress = st.progress(0.0, text=f"🔄 Processando {total} imagens...")
+        
+        def on_progress(done: int, upload: dict):
+            progress.progress(done / total, text=f"🔄 {done}/{total} — {upload['name']}")
+        
+        with timer("analyze_uploads"):
+            uploads = analyze_uploads(uploaded_files, on_progress)
+        progress.empty()
+        
+        plot = st.session_state.get("plot_id", "")
+        for upload in uploads:
+            # O uploader já guarda os bytes; o detalhamento relê de lá
+            upload.pop("image_bytes", None)
+            if HISTORY_PATH and upload["analysis"] is not None:
+                record_analysis(upload, upload["analysis"], plot)
+        batch = {"file_ids": file_ids, "uploads": uploads}
+        st.session_state["batch"] = batch
+    
+    with timer("render_gallery"):
+        render_batch_gallery(batch["uploads"], uploaded_files)
+
+
+def render_batch_gallery(uploads: List[dict], uploaded_files: list):
+    """Resumo por status, tabela, miniaturas e o resultado completo da imagem escolhida."""
+    analyzed = [upload for upload in uploads if upload["analysis"] is not None]
+    errors = len(uploads) - len(analyzed)
+    statuses = [upload["analysis"].status for upload in analyzed]
+    summary = [
+        f"{STATUS_ICONS[status]} {statuses.count(status)}"
+        for status in ("healthy", "warning", "danger") if status in statuses
+    ]
+    if errors:
+        summary.append(f"❌ {errors} com erro")
+    st.markdown(f"**{len(uploads)} imagens analisadas:** " + " · ".join(summary))
+    
+    rows = []
+    for upload in uploads:
+        analysis = upload["analysis"]
+        if analysis is None:
+            rows.append({"imagem": upload["name"], "diagnóstico": f"❌ {upload['error']}", "verde": "", "manchas": ""})
+            continue
+        mean_r, mean_g, mean_b, brownish_ratio = analysis.features
+        rows.append({
+            "imagem": upload["name"] + (" ♻️" if upload["near_duplicate"] is not None else ""),
+            "diagnóstico": analysis.label,
+            "verde": f"{mean_g / (mean_r + mean_g + mean_b + 1e-6):.0%}",
+            "manchas": f"{brownish_ratio:.1%}",
+        })
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    
+    if not analyzed:
+        return
+    st.image(
+        [gallery_thumbnail(upload) for upload in analyzed],
+        caption=[f"{STATUS_ICONS[upload['analysis'].status]} {upload['name']}" for upload in analyzed],
+        width=GALLERY_THUMB_SIZE,
+        output_format="JPEG",
+    )
+    
+    st.markdown("---")
+    selected = st.selectbox(
+        "🔎 Detalhar imagem",
+        range(len(analyzed)),
+        format_func=lambda i: f"{analyzed[i]['name']} — {analyzed[i]['analysis'].label}",
+        key="batch_detail",
+    )
+    upload = analyzed[selected]
+    uploaded_file = next(f for f in uploaded_files if f.file_id == upload["file_id"])
+    render_upload_result(upload, Image.open(io.BytesIO(uploaded_file.getvalue())), upload["analysis"])
 
 
 def render_recommendations(status: str):
     """Renderiza recomendações baseado no status"""
-    st.markdown(f"""
-    <h3 style='margin-top: 40px; margin-bottom: 20px;'>
-        💡 Recomendações
-    </h3>
-    """, unsafe_allow_html=True)
-    
-    recommendations = {
-        "healthy": [
-            "Mantenha a rega regular conforme necessário",
-            "Forneça luz adequada (6-8 horas diárias)",
-            "Continue com cuidados preventivos",
-            "Faça novas análises mensalmente"
-        ],
-        "warning": [
-            "Aumente a frequência de verificações",
-            "Revise a rega e drenagem do solo",
-            "Inspecione para pragas visíveis",
-            "Considere aumentar a luz ou reduzir umidade"
-        ],
-        "danger": [
-            "Isole a planta de outras imediatamente",
-            "Procure um especialista em plantas",
-            "Considere tratamento com fungicida/inseticida",
-            "Revise completamente as condições ambientais"
-        ]
-    }
+    title, cards = recommendations_html(status)
+    st.markdown(title, unsafe_allow_html=True)
     
-    recs = recommendations.get(status, [])
+    if not cards:
+        return
     
-    cols = st.columns(len(recs))
-    for i, (col, rec) in enumerate(zip(cols, recs)):
+    for col, card in zip(st.columns(len(cards)), cards):
         with col:
-            color_map = {
-                "healthy": COLORS["success"],
-                "warning": COLORS["warning"],
-                "danger": COLORS["danger"]
-            }
-            border_color = color_map.get(status, COLORS["primary"])
-            
-            st.markdown(f"""
-            <div style='
-                background: white;
-                padding: 15px;
-                border-radius: 10px;
-                border-left: 4px solid {border_color};
-                box-shadow: 0 2px 8px rgba(0,0,0,0.06);
-                height: 100%;
-            '>
-                <div style='
-                    font-weight: 700;
-                    color: {border_color};
-                    font-size: 2em;
-                    text-align: center;
-                    margin-bottom: 10px;
-                '>
-                    {i+1}
-                </div>
-                <div style='
-                    color: {COLORS["neutral_700"]};
-                    font-size: 0.95em;
-                    text-align: center;
-                    line-height: 1.5;
-                '>
-                    {rec}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(card, unsafe_allow_html=True)
 
 
 def main():
     """Função principal com UX/UI otimizada"""
+    with timer("script_run"):
+        _render_page()
+    # Depois da página, para incluir a análise e os tempos desta execução
+    render_history_panel()
+    render_metrics_panel()
+
+
+def _render_page():
+    """Corpo da página (cronometrado como um todo em `main`)."""
     # Renderizar sidebar
-    render_sidebar()
+    with timer("render_sidebar"):
+        render_sidebar()
     
     # Container principal
     st.markdown(f"""
@@ -901,26 +832,55 @@ def main():
     """, unsafe_allow_html=True)
     
     # Header
-    render_header()
+    with timer("render_header"):
+        render_header()
     
     # Features
-    render_features()
+    with timer("render_features"):
+        render_features()
     
     st.markdown("---")
     
+    # Upload, análise e resultado: reexecutados à parte (fragmento)
+    render_analysis_section()
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment
+def render_analysis_section():
+    """
+    Upload -> análise -> resultado/recomendações como fragmento.
+
+    Interações aqui dentro (upload, botão de análise, mapa por região)
+    reexecutam e reenviam só esta parte da página; sidebar, header, cards e
+    CSS não são refeitos. Os painéis da sidebar (histórico, métricas) se
+    atualizam na próxima execução completa.
+    """
+    with timer("fragment_analysis"):
+        _render_analysis_section()
+
+
+def _render_analysis_section():
     # Upload section
-    uploaded_file = render_upload_section()
+    with timer("render_upload"):
+        uploaded_files = render_upload_section()
+    
+    # Vários arquivos: análise concorrente e galeria
+    if len(uploaded_files) > 1:
+        st.markdown("---")
+        render_batch_section(uploaded_files)
+        return
     
     # Seção de análise
+    uploaded_file = uploaded_files[0] if uploaded_files else None
     if uploaded_file is not None:
         st.markdown("---")
         
         with st.spinner("🔄 Processando imagem..."):
-            image_bytes = uploaded_file.read()
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            model = SimpleAgroVisionModel()
-            img_array = model.preprocess_image(image)
+            upload = load_upload(uploaded_file)
+            with timer("open_preview"):
+                image = Image.open(io.BytesIO(upload["image_bytes"]))
             
             col_btn = st.columns([1, 3, 1])
             with col_btn[1]:
@@ -931,98 +891,32 @@ def main():
                 )
         
         if analyze_button:
-            label, explanation, status = model.classify(img_array)
-            
-            # Renderizar resultado
-            render_analysis_result(image, label, explanation, status)
+            upload["requested"] = True
+        
+        # O resultado continua visível nas reexecuções seguintes do mesmo upload
+        if upload["requested"]:
+            analysis = classify_upload(upload)
+            if analyze_button and HISTORY_PATH:
+                record_analysis(upload, analysis, st.session_state.get("plot_id", ""))
             
-            # Renderizar recomendações
-            render_recommendations(status)
+            # Renderizar resultado e recomendações
+            render_upload_result(upload, image, analysis)
             
             # Seção de informações adicionais
             st.markdown("---")
             with st.expander("📚 Como Funciona o Modelo?", expanded=False):
-                st.markdown(f"""
-                <div style='color: {COLORS["neutral_800"]}; line-height: 1.8;'>
-                
-                ## Sistema de Análise
-                
-                **Metodologia:**
-                
-                O AgroVision AI utiliza análise avançada de características de cor em três dimensões:
-                
-                1. **Proporção de Verde** - Indica vitalidade e saúde geral
-                2. **Tons Amarelados/Amarronzados** - Detecta sinais de doença ou estresse
-                3. **Distribuição de Cores** - Identifica padrões anormais
-                
-                **Categorias de Diagnóstico:**
-                
-                - ✅ **Saudável**: Tons verdes predominantes, padrão normal
-                - ⚠️ **Alerta**: Sinais iniciais de problemas
-                - 🚨 **Crítico**: Indicadores de doença avançada
-                
-                **Tecnologia:**
-                
-                - Pré-processamento de imagem (normalização e redimensionamento)
-                - Extração de features de cor RGB
-                - Algoritmo de classificação heurístico
-                - Em produção: seria substituído por Deep Learning CNN
-                
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(model_explainer_html(), unsafe_allow_html=True)
+                st.caption("Backend ativo: " + ", ".join(f"{k}={v}" for k, v in get_backend().describe().items()))
             
             st.markdown("---")
             
             # CTA Final
-            st.markdown(f"""
-            <div style='
-                background: linear-gradient(135deg, {COLORS["primary_light"]} 0%, rgba(16, 185, 129, 0.1) 100%);
-                padding: 30px;
-                border-radius: 14px;
-                text-align: center;
-                border: 2px solid {COLORS["primary"]};
-                margin-top: 40px;
-            '>
-                <h3 style='color: {COLORS["primary_dark"]}; margin-bottom: 10px;'>
-                    📌 Análise Concluída!
-                </h3>
-                <p style='color: {COLORS["neutral_700"]}; margin: 0;'>
-                    Você pode enviar outra imagem para continuar analisando suas plantas.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(completion_html(), unsafe_allow_html=True)
     
     else:
         # Estado vazio - Welcome message
         st.markdown("---")
-        st.markdown(f"""
-        <div class='welcome-box'>
-            <div style='font-size: 4em; margin-bottom: 20px;'>🌾</div>
-            <h2 style='color: {COLORS["primary_dark"]}; margin-bottom: 15px;'>
-                Pronto para Começar?
-            </h2>
-            <p style='
-                color: {COLORS["primary_dark"]};
-                font-size: 1.1em;
-                margin-bottom: 20px;
-                line-height: 1.6;
-            '>
-                Envie uma foto clara de sua planta para receber um diagnóstico instantâneo
-                e recomendações personalizadas para mantê-la saudável.
-            </p>
-            <div style='
-                background: rgba(16, 185, 129, 0.1);
-                padding: 15px;
-                border-radius: 10px;
-                color: {COLORS["primary_dark"]};
-                font-size: 0.95em;
-            '>
-                💡 <b>Dica:</b> Use uma foto bem iluminada com foco na folha ou planta
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown(welcome_html(), unsafe_allow_html=True)
 
 
 if __name__ == "__main__":
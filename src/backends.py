@@ -0,0 +1,312 @@
+"""
+Backends de modelo: quem decide o diagnóstico a partir dos arrays
+(256, 256, 3) uint8 de `preprocess_image`.
+
+    heuristic   regras de cor do `SimpleAgroVisionModel` (padrão; mesmos
+                rótulos de sempre)
+    onnx        rede exportada em ONNX, executada pelo ONNX Runtime na CPU
+
+Contrato dos modelos ONNX: uma entrada float32 (N, 3, 256, 256) com os
+canais RGB em [0, 1] e uma saída (N, 3) com as pontuações de
+"healthy", "warning" e "danger" (`STATUSES`), nesta ordem; o status é o de
+maior pontuação. Rótulo e explicação vêm de `SimpleAgroVisionModel.DIAGNOSES`.
+
+Com `int8`, o backend carrega a versão quantizada do modelo
+(`<modelo>.int8.onnx`, gerada por `quantize_model`). O `onnxruntime` é
+opcional e só é importado ao criar o backend ONNX.
+
+Caches de diagnóstico (cache de resultados, índice de quase duplicatas)
+separam as entradas por `cache_namespace()`: trocar de backend, de modelo
+ou ligar o int8 não reaproveita diagnósticos do backend anterior.
+
+O modelo de teste `models/agrovision_tiny.onnx` (e a versão int8) é gerado
+por `models/build_tiny_model.py`.
+"""
+
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import SimpleAgroVisionModel
+from metrics import timer
+
+MODELS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+TINY_MODEL = os.path.join(MODELS_DIR, "agrovision_tiny.onnx")
+
+# ==================== CONFIGURAÇÃO ====================
+MODEL_BACKEND = os.environ.get("AGROVISION_MODEL_BACKEND", "heuristic")
+ONNX_MODEL_PATH = os.environ.get("AGROVISION_ONNX_MODEL", TINY_MODEL)
+# Threads do ONNX Runtime: intra-op (dentro de cada operador) e inter-op
+# (operadores em paralelo); 0 = padrão do ONNX Runtime
+ONNX_INTRA_OP_THREADS = int(os.environ.get("AGROVISION_ONNX_INTRA_OP_THREADS", "0"))
+ONNX_INTER_OP_THREADS = int(os.environ.get("AGROVISION_ONNX_INTER_OP_THREADS", "0"))
+ONNX_INT8 = os.environ.get("AGROVISION_ONNX_INT8", "0") == "1"
+
+# Ordem das pontuações na saída dos modelos ONNX
+STATUSES = ("healthy", "warning", "danger")
+
+Diagnosis = Tuple[str, str, str]
+
+
+class BackendError(RuntimeError):
+    """Backend indisponível: dependência ausente ou modelo inválido."""
+
+
+def int8_path(path: str) -> str:
+    """Caminho da versão int8 de um modelo (`modelo.onnx` -> `modelo.int8.onnx`)."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.int8{ext or '.onnx'}"
+
+
+def to_model_input(batch: np.ndarray) -> np.ndarray:
+    """Lote (N, H, W, 3) uint8 -> float32 (N, 3, H, W) em [0, 1]."""
+    x = np.ascontiguousarray(np.asarray(batch).transpose(0, 3, 1, 2), dtype=np.float32)
+    x *= 1 / 255
+    return x
+
+
+class ModelBackend(ABC):
+    """
+    Interface dos backends.
+
+    `classify_batch` recebe um lote empilhado (N, 256, 256, 3) uint8 e,
+    opcionalmente, as features de cor já calculadas (N, 4); devolve
+    (classe, explicação, status) por imagem.
+    """
+
+    name = ""
+
+    def __init__(self, model: Optional[SimpleAgroVisionModel] = None):
+        self.model = model or SimpleAgroVisionModel()
+
+    @abstractmethod
+    def classify_batch(self, batch: np.ndarray, features: Optional[np.ndarray] = None) -> List[Diagnosis]:
+        """(classe, explicação, status) de cada imagem do lote."""
+
+    def classify(self, img_array: np.ndarray, features: Optional[Sequence[float]] = None) -> Diagnosis:
+        """Uma imagem (256, 256, 3); mesmo resultado de `classify_batch`."""
+        return self.classify_batch(img_array[None], None if features is None else np.asarray([features]))[0]
+
+    def describe(self) -> Dict[str, object]:
+        """Configuração exibida no app e no /health do serviço."""
+        return {"backend": self.name}
+
+    def identity(self) -> Dict[str, object]:
+        """
+        O que decide os diagnósticos (não threads nem lotes): backend e a
+        ingestão do modelo, que define o array classificado.
+        """
+        return {"backend": self.name, "fast_ingest": self.model.fast_ingest}
+
+    def cache_namespace(self) -> str:
+        """Prefixo das chaves dos caches de diagnóstico (hash de `identity`)."""
+        identity = json.dumps(self.identity(), sort_keys=True)
+        return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
+class HeuristicBackend(ModelBackend):
+    """Regras de cor do modelo (`classify_features`)."""
+
+    name = "heuristic"
+
+    def classify_batch(self, batch: np.ndarray, features: Optional[np.ndarray] = None) -> List[Diagnosis]:
+        if features is None:
+            features = self.model.extract_color_features_batch(batch)
+        return [self.model.classify_features(row, batch[i]) for i, row in enumerate(features)]
+
+    def classify(self, img_array: np.ndarray, features: Optional[Sequence[float]] = None) -> Diagnosis:
+        if features is None:
+            features = self.model.extract_color_features(img_array)
+        return self.model.classify_features(features, img_array)
+
+
+class OnnxBackend(ModelBackend):
+    """Modelo ONNX na CPU (ONNX Runtime), com lotes e threads configuráveis."""
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model: Optional[SimpleAgroVisionModel] = None,
+        path: str = ONNX_MODEL_PATH,
+        intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+        inter_op_threads: int = ONNX_INTER_OP_THREADS,
+        int8: bool = ONNX_INT8,
+        max_batch_size: int = 8,
+    ):
+        super().__init__(model)
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise BackendError("Backend ONNX requer o onnxruntime (pip install onnxruntime)") from exc
+
+        if int8:
+            path = int8_path(path)
+        if not os.path.isfile(path):
+            hint = " (gere com backends.quantize_model)" if int8 else ""
+            raise BackendError(f"Modelo ONNX não encontrado: {path}{hint}")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        if inter_op_threads > 1:
+            # Threads inter-op só são usadas no modo paralelo
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        try:
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        except Exception as exc:  # protobuf inválido, operador sem suporte...
+            raise BackendError(f"Falha ao carregar {path}: {exc}") from exc
+
+        inputs = self.session.get_inputs()
+        if len(inputs) != 1 or len(inputs[0].shape) != 4 or inputs[0].shape[1] != 3:
+            raise BackendError(f"{path}: esperada uma entrada (N, 3, H, W), recebido {[i.shape for i in inputs]}")
+        self._input = inputs[0].name
+        self.path = path
+        self.int8 = int8
+        self.model_digest = _file_digest(path)
+        # Lotes maiores são divididos: a arena do ONNX Runtime guarda o pico
+        # de memória das ativações (~350 MB para 32 imagens no modelo de
+        # teste) e, fora do cache, lotes de 32 rendiam metade dos de 8
+        self.max_batch_size = max(1, max_batch_size)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Pontuações (N, 3) na ordem de `STATUSES`."""
+        step = self.max_batch_size
+        with timer("onnx_inference"):
+            scores = np.concatenate([
+                self.session.run(None, {self._input: to_model_input(batch[i:i + step])})[0]
+                for i in range(0, len(batch), step)
+            ])
+        if scores.ndim != 2 or scores.shape[1] != len(STATUSES):
+            raise BackendError(f"Saída do modelo com forma {scores.shape}; esperado (N, {len(STATUSES)})")
+        return scores
+
+    def classify_batch(self, batch: np.ndarray, features: Optional[np.ndarray] = None) -> List[Diagnosis]:
+        results = []
+        for index in np.argmax(self.predict(np.asarray(batch)), axis=1):
+            status = STATUSES[index]
+            label, explanation = self.model.DIAGNOSES[status]
+            results.append((label, explanation, status))
+        return results
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "backend": self.name,
+            "model": os.path.basename(self.path),
+            "int8": self.int8,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+        }
+
+    def identity(self) -> Dict[str, object]:
+        # O conteúdo do arquivo, não só o nome: um modelo retreinado no mesmo caminho é outro modelo
+        return {
+            **super().identity(),
+            "model": os.path.abspath(self.path),
+            "model_digest": self.model_digest,
+            "int8": self.int8,
+        }
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+MODEL_BACKENDS = {
+    "heuristic": HeuristicBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def load_backend(name: str = MODEL_BACKEND, model: Optional[SimpleAgroVisionModel] = None, **options) -> ModelBackend:
+    """Instância do backend `name`; `options` vão para o construtor (ex.: path, int8)."""
+    if name not in MODEL_BACKENDS:
+        raise ValueError(f"Backend de modelo desconhecido: {name!r} (opções: {', '.join(MODEL_BACKENDS)})")
+    return MODEL_BACKENDS[name](model, **options)
+
+
+def add_backend_arguments(parser) -> None:
+    """Opções de linha de comando do backend (batch_cli.py, service.py)."""
+    parser.add_argument(
+        "--backend", choices=sorted(MODEL_BACKENDS), default=MODEL_BACKEND,
+        help="Backend de modelo (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--onnx-model", default=ONNX_MODEL_PATH, metavar="ARQUIVO",
+        help="Modelo ONNX do backend onnx (padrão: modelo de teste em models/)",
+    )
+    parser.add_argument(
+        "--intra-op-threads", type=int, default=ONNX_INTRA_OP_THREADS,
+        help="Threads intra-op do ONNX Runtime; 0 = padrão (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--inter-op-threads", type=int, default=ONNX_INTER_OP_THREADS,
+        help="Threads inter-op do ONNX Runtime; 0 = padrão (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--int8", action="store_true", default=ONNX_INT8,
+        help="Usa a versão quantizada em int8 do modelo ONNX",
+    )
+
+
+def backend_options(args) -> Dict[str, object]:
+    """Argumentos de `load_backend` a partir das opções de `add_backend_arguments`."""
+    if args.backend != "onnx":
+        return {}
+    return {
+        "path": args.onnx_model,
+        "intra_op_threads": args.intra_op_threads,
+        "inter_op_threads": args.inter_op_threads,
+        "int8": args.int8,
+    }
+
+
+def quantize_model(
+    path: str,
+    calibration: Iterable[np.ndarray],
+    output: Optional[str] = None,
+    op_types: Sequence[str] = ("Conv", "Relu"),
+) -> str:
+    """
+    Gera a versão int8 (formato QDQ, pesos por canal) de um modelo ONNX.
+
+    `calibration` são lotes (N, 256, 256, 3) uint8 representativos, usados
+    para estimar a faixa das ativações. Só os operadores em `op_types` são
+    quantizados: no modelo de teste, quantizar também a média global e a
+    camada final derrubava a concordância com a versão float de ~98% para
+    ~75% (as médias das ativações diferem pouco entre as classes).
+    Requer `onnxruntime` e `onnx`. Retorna o caminho gravado (padrão:
+    `int8_path(path)`).
+    """
+    try:
+        from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    except ImportError as exc:
+        raise BackendError("Quantização requer onnxruntime e onnx (pip install onnxruntime onnx)") from exc
+
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    batches = iter(calibration)
+
+    class _Reader(CalibrationDataReader):
+        def get_next(self):
+            batch = next(batches, None)
+            return None if batch is None else {input_name: to_model_input(batch)}
+
+    output = output or int8_path(path)
+    quantize_static(
+        path, output, _Reader(),
+        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+        per_channel=True, op_types_to_quantize=list(op_types),
+    )
+    return output
@@ -0,0 +1,500 @@
+"""
+Modo em lote (linha de comando) do AgroVision AI.
+
+Percorre uma árvore de diretórios e classifica cada imagem com
+`preprocess_image` + `classify` em um pool de processos, sem iniciar a
+interface Streamlit. Os resultados são emitidos em JSONL, uma linha por
+imagem, à medida que ficam prontos.
+
+Fluxo:
+    thread leitora (caminhos) -> fila limitada -> N processos
+    (leitura + decodificação + análise) -> fila limitada -> escrita JSONL
+
+As filas limitadas mantêm a decodificação e o cálculo sobrepostos entre
+os processos sem acumular resultados em memória.
+
+Com `--history`, os resultados também são gravados no histórico SQLite
+(ver history.py) em transações de `HISTORY_BATCH` registros.
+
+Com `--backend onnx`, o diagnóstico sai de um modelo ONNX em cada processo
+(ver backends.py) em vez das regras de cor.
+
+Com `--cascade`, cada imagem é decidida primeiro numa miniatura reduzida
+na decodificação e só passa pelo caminho completo perto dos limiares
+(ver cascade.py); o campo `cascade_stage` diz qual estágio decidiu.
+
+Uso:
+    python src/batch_cli.py CAMINHO [-o resultados.jsonl] [-w 8] [--history historico.sqlite]
+"""
+
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, TextIO
+
+from PIL import Image
+
+from backends import (
+    MODEL_BACKEND,
+    BackendError,
+    HeuristicBackend,
+    ModelBackend,
+    add_backend_arguments,
+    backend_options,
+    load_backend,
+)
+from cascade import CascadeClassifier
+from core import FAST_INGEST, FEATURE_KERNEL, FEATURE_KERNELS, SimpleAgroVisionModel
+from history import HistoryRecord, HistoryStore
+from mmap_ingest import MAPPED_EXTENSIONS, NotMappableError, analyze_mapped, is_mappable_path
+from phash_index import MAX_DISTANCE as MAX_PHASH_DISTANCE, PHashIndex, image_signature
+from streaming import DEFAULT_MEMORY_BUDGET, analyze_in_strips
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Registros por transação no histórico
+HISTORY_BATCH = 1000
+
+# Intervalo (s) para checar se algum processo de trabalho morreu
+_POLL_INTERVAL = 1.0
+
+
+def iter_image_paths(root: str, extensions: Sequence[str] = IMAGE_EXTENSIONS) -> Iterator[str]:
+    """Percorre `root` recursivamente, em ordem estável, gerando caminhos de imagens."""
+    extensions = tuple(ext.lower() for ext in extensions)
+
+    if os.path.isfile(root):
+        yield root
+        return
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+
+def analyze_path(
+    model: SimpleAgroVisionModel,
+    path: str,
+    memory_budget: Optional[int] = None,
+    use_mmap: bool = False,
+    near_index: Optional[PHashIndex] = None,
+    cascade: Optional[CascadeClassifier] = None,
+    backend: Optional[ModelBackend] = None,
+) -> Dict[str, Any]:
+    """
+    Lê, decodifica e classifica uma imagem.
+
+    Com `memory_budget` (bytes), usa a análise em faixas (`streaming.py`):
+    o arquivo é lido do disco faixa a faixa em vez de carregado inteiro.
+    Com `use_mmap`, entradas sem compressão (.npy, .rgb/.raw, TIFF) são
+    mapeadas em memória (`mmap_ingest.py`); as demais seguem o caminho acima.
+    Com `near_index`, o caminho padrão reaproveita o diagnóstico de imagens
+    quase idênticas já vistas (`phash_index.py`) pelo mesmo backend.
+    Com `cascade` (mesmo modelo), o caminho padrão passa pela cascata de
+    resoluções (`cascade.py`) e o registro ganha `cascade_stage`.
+    Com `backend`, o caminho padrão tira o diagnóstico dele (`backends.py`)
+    em vez das regras de cor.
+
+    Retorna um registro serializável em JSON com caminho, features, rótulo,
+    status e tempos por etapa (ms). Falhas viram registros com status "error".
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    near_duplicate = None
+    stage = None
+
+    try:
+        result = None
+        if use_mmap and is_mappable_path(path):
+            t0 = time.perf_counter()
+            try:
+                result = analyze_mapped(
+                    path, model, memory_budget if memory_budget is not None else DEFAULT_MEMORY_BUDGET
+                )
+            except NotMappableError:
+                # TIFF comprimido ainda pode ser decodificado pelo Pillow
+                if not path.lower().endswith((".tif", ".tiff")):
+                    raise
+            else:
+                timings["mapped"] = (time.perf_counter() - t0) * 1000
+
+        if result is not None:
+            features, label, status = result.features, result.label, result.status
+        elif memory_budget is not None:
+            t0 = time.perf_counter()
+            with Image.open(path) as image:
+                result = analyze_in_strips(model.draft_on_decode(image), model, memory_budget)
+            timings["strips"] = (time.perf_counter() - t0) * 1000
+            features, label, status = result.features, result.label, result.status
+        elif cascade is not None:
+            t0 = time.perf_counter()
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+            timings["read"] = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            decision = cascade.classify(image_bytes)
+            timings["cascade"] = (time.perf_counter() - t0) * 1000
+            features, label, status, stage = decision.features, decision.label, decision.status, decision.stage
+        else:
+            t0 = time.perf_counter()
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+            timings["read"] = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            image = Image.open(io.BytesIO(image_bytes))
+            if not model.fast_ingest:
+                # No caminho rápido a decodificação (reduzida) ocorre no preprocess
+                image.load()
+            timings["decode"] = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            img_array = model.preprocess_image(image)
+            timings["preprocess"] = (time.perf_counter() - t0) * 1000
+
+            match = signature = None
+            if near_index is not None:
+                t0 = time.perf_counter()
+                namespace = (backend or HeuristicBackend(model)).cache_namespace()
+                signature = image_signature(img_array)
+                match = near_index.lookup(*signature)
+                if match is not None and match[0].get("backend") != namespace:
+                    # Índice compartilhado com outro backend: o diagnóstico não vale aqui
+                    match = None
+                timings["phash"] = (time.perf_counter() - t0) * 1000
+
+            if match is not None:
+                payload, near_duplicate = match
+                features, label, status = tuple(payload["features"]), payload["label"], payload["status"]
+            else:
+                t0 = time.perf_counter()
+                features = model.extract_color_features(img_array)
+                if backend is None:
+                    label, _, status = model.classify_features(features, img_array)
+                else:
+                    label, _, status = backend.classify(img_array, features)
+                timings["classify"] = (time.perf_counter() - t0) * 1000
+                if signature is not None:
+                    near_index.add(
+                        *signature,
+                        {"backend": namespace, "features": list(features), "label": label, "status": status},
+                    )
+    except Exception as exc:  # registro de erro em vez de abortar o lote
+        timings["total"] = (time.perf_counter() - start) * 1000
+        return {
+            "path": path,
+            "features": None,
+            "label": None,
+            "status": "error",
+            "error": f"{type(exc).__name__}: {exc}",
+            "timings_ms": timings,
+        }
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    mean_r, mean_g, mean_b, brownish_ratio = features
+    record = {
+        "path": path,
+        "features": {
+            "mean_r": mean_r,
+            "mean_g": mean_g,
+            "mean_b": mean_b,
+            "brownish_ratio": brownish_ratio,
+        },
+        "label": label,
+        "status": status,
+        "error": None,
+        "timings_ms": timings,
+    }
+    if near_index is not None:
+        record["near_duplicate_distance"] = near_duplicate
+    if cascade is not None:
+        record["cascade_stage"] = stage
+    return record
+
+
+def _worker_loop(
+    task_queue,
+    result_queue,
+    fast_ingest: bool,
+    feature_kernel: str,
+    memory_budget: Optional[int],
+    use_mmap: bool,
+    near_duplicates: Optional[int],
+    use_cascade: bool,
+    backend_name: str,
+    backend_config: Dict[str, Any],
+) -> None:
+    """Processo de trabalho: consome caminhos até receber o sentinela `None`."""
+    model = SimpleAgroVisionModel(fast_ingest=fast_ingest, feature_kernel=feature_kernel)
+    cascade = CascadeClassifier(model) if use_cascade else None
+    # Cada processo carrega a própria sessão do backend (ex.: ONNX Runtime)
+    backend = load_backend(backend_name, model, **backend_config) if backend_name != "heuristic" else None
+    # Um índice por processo: quase duplicatas entre processos diferentes não se encontram
+    near_index = PHashIndex(max_distance=near_duplicates) if near_duplicates is not None else None
+    while True:
+        path = task_queue.get()
+        if path is None:
+            break
+        result_queue.put(analyze_path(model, path, memory_budget, use_mmap, near_index, cascade, backend))
+    result_queue.put(None)
+
+
+def _feed(paths: Iterable[str], task_queue, n_workers: int, stop: threading.Event) -> None:
+    """Thread leitora: enfileira caminhos (bloqueando quando a fila enche)."""
+    for path in paths:
+        if stop.is_set():
+            break
+        task_queue.put(path)
+    for _ in range(n_workers):
+        task_queue.put(None)
+
+
+def run_batch(
+    root: str,
+    output: TextIO,
+    workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    extensions: Sequence[str] = IMAGE_EXTENSIONS,
+    fast_ingest: bool = FAST_INGEST,
+    feature_kernel: str = FEATURE_KERNEL,
+    memory_budget: Optional[int] = None,
+    use_mmap: bool = False,
+    near_duplicates: Optional[int] = None,
+    use_cascade: bool = False,
+    backend: str = MODEL_BACKEND,
+    backend_config: Optional[Dict[str, Any]] = None,
+    history: Optional[HistoryStore] = None,
+    plot: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Classifica todas as imagens sob `root` e escreve um registro JSONL por
+    imagem em `output`, na ordem em que terminam.
+
+    Args:
+        root: diretório (ou arquivo) de entrada.
+        output: destino de texto para as linhas JSONL.
+        workers: número de processos (padrão: número de CPUs).
+        queue_size: capacidade das filas de entrada e saída
+            (padrão: 4 por processo).
+        extensions: extensões de arquivo aceitas.
+        fast_ingest: usa a decodificação em escala reduzida do modelo.
+        feature_kernel: kernel de features de cor ("float", "uint8" ou "histogram").
+        memory_budget: se informado (bytes), analisa cada imagem em faixas
+            com memória limitada; resultado idêntico ao caminho padrão.
+        use_mmap: mapeia em memória as entradas sem compressão.
+        near_duplicates: se informado (bits), reaproveita o diagnóstico de
+            imagens quase idênticas já vistas pelo mesmo processo.
+        use_cascade: decide pela cascata de resoluções, com o caminho
+            completo só perto dos limiares (mesmos rótulos; ver cascade.py).
+        backend: backend de modelo do caminho padrão ("heuristic" ou "onnx").
+        backend_config: opções do backend (ver `backends.load_backend`).
+        history: se informado, grava cada resultado (exceto erros) no histórico.
+        plot: talhão/planta associado aos registros do histórico.
+
+    Retorna:
+        Contagem de registros por status.
+
+    Levanta ValueError para combinações de opções incompatíveis.
+    """
+    _check_options(memory_budget, use_mmap, near_duplicates, use_cascade, backend)
+    workers = max(1, workers or os.cpu_count() or 1)
+    queue_size = max(1, queue_size or 4 * workers)
+
+    ctx = mp.get_context()
+    task_queue = ctx.Queue(maxsize=queue_size)
+    result_queue = ctx.Queue(maxsize=queue_size)
+
+    processes = [
+        ctx.Process(
+            target=_worker_loop,
+            args=(
+                task_queue, result_queue, fast_ingest, feature_kernel, memory_budget, use_mmap, near_duplicates,
+                use_cascade, backend, backend_config or {},
+            ),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    stop = threading.Event()
+    feeder = threading.Thread(
+        target=_feed,
+        args=(iter_image_paths(root, extensions), task_queue, workers, stop),
+        daemon=True,
+    )
+    feeder.start()
+
+    counts: Dict[str, int] = {}
+    finished = 0
+    try:
+        while finished < workers:
+            try:
+                record = result_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in processes):
+                    raise RuntimeError("Um processo de trabalho terminou inesperadamente")
+                continue
+
+            if record is None:
+                finished += 1
+                continue
+
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            if history is not None and record["error"] is None:
+                history.add(HistoryRecord(
+                    time.time(), None, plot, tuple(record["features"].values()), record["label"], record["status"],
+                ))
+    finally:
+        stop.set()
+        if finished < workers:
+            for process in processes:
+                process.terminate()
+        for process in processes:
+            process.join()
+        if history is not None:
+            history.flush()
+
+    output.flush()
+    return counts
+
+
+def _check_options(
+    memory_budget: Optional[int],
+    use_mmap: bool,
+    near_duplicates: Optional[int],
+    use_cascade: bool,
+    backend: str,
+) -> None:
+    """Rejeita (ValueError) valores inválidos e combinações de opções incompatíveis."""
+    if memory_budget is not None and memory_budget <= 0:
+        raise ValueError(f"--memory-budget deve ser maior que zero (recebido {memory_budget} bytes)")
+    if near_duplicates is not None and not 0 <= near_duplicates <= MAX_PHASH_DISTANCE:
+        raise ValueError(f"--near-duplicates deve estar entre 0 e {MAX_PHASH_DISTANCE}")
+    if use_cascade and near_duplicates is not None:
+        # O hash perceptual sai do array 256x256, que a cascata evita montar
+        raise ValueError("--cascade não combina com --near-duplicates")
+    if backend != "heuristic" and (use_cascade or memory_budget is not None or use_mmap):
+        # Cascata, faixas e mapeamento decidem pelas features, sem o array 256x256
+        raise ValueError(f"--backend {backend} não combina com --cascade, --memory-budget ou --mmap")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Classifica em lote as imagens de um diretório (saída JSONL)."
+    )
+    parser.add_argument("root", help="Diretório (ou arquivo) com as imagens")
+    parser.add_argument(
+        "-o", "--output", default="-",
+        help="Arquivo JSONL de saída (padrão: saída padrão)",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None,
+        help="Número de processos (padrão: número de CPUs)",
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=None,
+        help="Capacidade das filas limitadas (padrão: 4 por processo)",
+    )
+    parser.add_argument(
+        "--ext", nargs="+", default=None,
+        help="Extensões aceitas (padrão: .jpg .jpeg .png, mais .npy .rgb .raw .tif .tiff com --mmap)",
+    )
+    ingest = parser.add_mutually_exclusive_group()
+    ingest.add_argument(
+        "--fast-ingest", action="store_true", default=FAST_INGEST,
+        help="Decodifica em escala reduzida (draft/reduce) antes do resize final",
+    )
+    ingest.add_argument(
+        "--memory-budget", type=float, default=None, metavar="MB",
+        help="Analisa em faixas de linhas com este orçamento de memória por imagem",
+    )
+    parser.add_argument(
+        "--mmap", action="store_true",
+        help="Mapeia em memória .npy, RGB cru (LARGURAxALTURA no nome) e TIFF sem compressão",
+    )
+    parser.add_argument(
+        "--feature-kernel", choices=sorted(FEATURE_KERNELS), default=FEATURE_KERNEL,
+        help="Kernel de features de cor (padrão: %(default)s)",
+    )
+    ingest.add_argument(
+        "--cascade", action="store_true",
+        help="Decide primeiro em miniaturas (32/128 px) e só usa 256x256 perto dos limiares",
+    )
+    parser.add_argument(
+        "--near-duplicates", type=int, default=None, metavar="BITS",
+        help="Reaproveita o diagnóstico de imagens a até BITS de distância no hash perceptual",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--history", default=None, metavar="SQLITE",
+        help="Grava os resultados também no histórico de análises (SQLite)",
+    )
+    parser.add_argument(
+        "--plot", default=None,
+        help="Talhão/planta associado aos registros do histórico",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.memory_budget is not None and args.memory_budget <= 0:
+        parser.error("--memory-budget deve ser maior que zero")
+    memory_budget = int(args.memory_budget * 1024 * 1024) if args.memory_budget is not None else None
+    try:
+        _check_options(memory_budget, args.mmap, args.near_duplicates, args.cascade, args.backend)
+    except ValueError as exc:
+        parser.error(str(exc))
+    try:
+        # Falha já aqui (dependência ou modelo ausente), não em cada processo
+        load_backend(args.backend, **backend_options(args))
+    except BackendError as exc:
+        parser.error(str(exc))
+
+    options = dict(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        extensions=args.ext or IMAGE_EXTENSIONS + (MAPPED_EXTENSIONS if args.mmap else ()),
+        fast_ingest=args.fast_ingest,
+        feature_kernel=args.feature_kernel,
+        memory_budget=memory_budget,
+        use_mmap=args.mmap,
+        near_duplicates=args.near_duplicates,
+        use_cascade=args.cascade,
+        backend=args.backend,
+        backend_config=backend_options(args),
+        history=HistoryStore(args.history, batch_size=HISTORY_BATCH) if args.history else None,
+        plot=args.plot,
+    )
+
+    start = time.perf_counter()
+    if args.output == "-":
+        counts = run_batch(args.root, sys.stdout, **options)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            counts = run_batch(args.root, output, **options)
+    elapsed = time.perf_counter() - start
+    if options["history"] is not None:
+        options["history"].close()
+
+    total = sum(counts.values())
+    summary = ", ".join(f"{status}={n}" for status, n in sorted(counts.items()))
+    print(f"{total} imagens em {elapsed:.1f}s ({summary})", file=sys.stderr)
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
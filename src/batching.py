@@ -0,0 +1,159 @@
+"""
+Micro-batching dinâmico para classificações concorrentes.
+
+Com muitas requisições simultâneas, cada uma chamaria `classify` sozinha e o
+NumPy executaria muitos kernels pequenos. O `MicroBatcher` junta os arrays
+pré-processados que chegam dentro de uma janela curta (ou até completar o
+lote), empilha tudo em um único (N, 256, 256, 3), roda o passe vetorizado
+de features e limiares (`extract_color_features_batch`) e devolve a cada
+chamador o seu resultado. Com um backend de modelo (`backends.py`), o
+diagnóstico do lote sai de `backend.classify_batch`.
+
+Latência: nenhum item espera mais que `max_wait_ms` para entrar em um lote,
+e um lote cheio é despachado imediatamente. Com o agrupador ocioso (nenhum
+lote em execução), o item sai já na próxima volta do laço de eventos, junto
+com o que chegou na mesma volta; sob carga, os itens se acumulam enquanto o
+lote anterior roda, e o lote cresce sozinho com a concorrência.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backends import HeuristicBackend, ModelBackend
+
+# Features e (classe, explicação, status) de uma imagem
+BatchResult = Tuple[Tuple[float, float, float, float], str, str, str]
+
+
+class MicroBatcher:
+    """
+    Agrupador assíncrono em volta de um `SimpleAgroVisionModel`.
+
+    `submit` deve ser chamado de dentro do laço de eventos; o passe em lote
+    roda em `executor` (por padrão uma thread dedicada, para que os lotes não
+    disputem a fila com a decodificação).
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        executor: Optional[Executor] = None,
+        backend: Optional[ModelBackend] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser >= 1")
+        self.model = model
+        self.backend = backend or HeuristicBackend(model)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="agrovision-batch")
+
+        self._pending: List[Tuple[np.ndarray, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+        self._in_flight = 0  # lotes no executor
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._wait_total = 0.0
+
+    async def submit(self, img_array: np.ndarray) -> BatchResult:
+        """Enfileira um array (256, 256, 3) uint8 e aguarda o resultado do seu lote."""
+        expected = (self.model.TARGET_SIZE[1], self.model.TARGET_SIZE[0], 3)
+        if img_array.shape != expected or img_array.dtype != np.uint8:
+            raise ValueError(f"Esperado array uint8 {expected}, recebido {img_array.dtype} {img_array.shape}")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((img_array, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            delay = self.max_wait if self._in_flight else 0
+            self._timer = loop.call_later(delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        items = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            # Sobra de um lote cheio: começa a próxima janela
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        self._in_flight += 1
+        task = asyncio.ensure_future(self._dispatch(items))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _dispatch(self, items: List[Tuple[np.ndarray, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        self.batches += 1
+        self.items += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+        self._wait_total += sum(started - enqueued for _, _, enqueued in items)
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, self._run, [item[0] for item in items])
+        except Exception as exc:
+            results = [exc] * len(items)
+        finally:
+            self._in_flight -= 1
+
+        for (_, future, _), result in zip(items, results):
+            if future.done():
+                continue  # chamador cancelado
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        # Itens que chegaram durante este lote não precisam esperar a janela
+        if self._pending and not self._in_flight:
+            self._flush()
+
+    def _run(self, arrays: List[np.ndarray]) -> List[BatchResult]:
+        batch = np.stack(arrays)
+        features = self.model.extract_color_features_batch(batch)
+        diagnoses = self.backend.classify_batch(batch, features)
+        return [
+            (tuple(float(f) for f in image_features), label, explanation, status)
+            for image_features, (label, explanation, status) in zip(features, diagnoses)
+        ]
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores para ajustar a janela e o tamanho máximo do lote."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "mean_wait_ms": self._wait_total / self.items * 1000 if self.items else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    async def close(self) -> None:
+        """Despacha o que estiver pendente e aguarda os lotes em andamento."""
+        self._flush()
+        while self._pending:
+            self._flush()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,166 @@
+"""
+Classificação em cascata de resoluções.
+
+`classify` sempre decodifica a imagem inteira e a reduz a 256x256, mas a
+maior parte das fotos fica longe dos limiares de decisão
+(`green_ratio > 0.40`, `brownish_ratio` 0.05 / 0.15). A cascata:
+
+    1. JPEG grande: decodifica uma miniatura já reduzida na decodificação
+       (`Image.draft`, 1/2 a 1/8 da escala, mais `Image.reduce` por um fator
+       inteiro) com ao menos 256 px por lado, e a leva a 256x256 com o mesmo
+       resize bicúbico de `preprocess_image`. Nos demais formatos (e JPEGs
+       pequenos) não há decodificação reduzida: a miniatura seria tão cara
+       quanto o caminho completo, então os estágios amostram o próprio
+       256x256 de `preprocess_image`;
+    2. estágio 32: features de 32x32 pixels amostrados desse 256x256; se a
+       margem até todo limiar que mudaria a decisão for grande, retorna;
+    3. estágio 128: o mesmo com 128x128 (mesma miniatura, sem nova decodificação);
+    4. estágio 256: o caminho normal do modelo (`preprocess_image` +
+       `classify_features`), que define o rótulo de referência; só o JPEG
+       reduzido é decodificado de novo.
+
+Os estágios rápidos medem a mesma imagem do caminho completo: o filtro do
+resize decide quanto uma mancha pequena se mistura à folha, então amostrar
+a miniatura direto (sem o bicúbico) mede outra imagem, e manchas de poucos
+pixels numa foto de 12 MP chegam a mudar o status. Sobram dois erros, ambos
+limitados pelas tolerâncias:
+    - miniatura x referência (JPEG reduzido): redução por blocos (DCT e
+      `reduce`) antes do bicúbico em vez do bicúbico direto, até ~0.02 na
+      proporção amarronzada;
+    - amostragem: 1 de cada 64 (32x32) ou 4 (128x128) pixels do 256x256.
+
+Tolerâncias por estágio e limiar (`CASCADE_STAGES`) foram calibradas em
+imagens sintéticas (`benchmarks/synthetic.py`: folhagem com manchas suaves,
+0.3 a 12 MP, e folhas de 12 MP com manchas quadradas de 6 a 10 px; JPEG e
+PNG, proporção de manchas de 0 a 40%) com ao menos 1.5x o maior erro observado,
+nos dois sentidos, perto de cada limiar. `benchmarks/bench_cascade.py`
+confere a concordância com o caminho de 256 e mede o ganho.
+"""
+
+import io
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from core import SimpleAgroVisionModel
+import metrics
+from metrics import timer
+
+
+@dataclass(frozen=True)
+class CascadeStage:
+    """Estágio rápido: lado da amostra e tolerâncias de cada limiar."""
+
+    size: int
+    green_tolerance: float  # em green_ratio, em torno de GREEN_RATIO_MIN
+    healthy_tolerance: float  # em brownish_ratio, em torno de BROWNISH_HEALTHY_MAX
+    warning_tolerance: float  # em brownish_ratio, em torno de BROWNISH_WARNING_MAX
+
+
+CASCADE_STAGES = (
+    CascadeStage(32, 0.01, 0.035, 0.07),
+    CascadeStage(128, 0.002, 0.027, 0.035),
+)
+
+
+@dataclass
+class CascadeDecision:
+    """Resultado da cascata; `stage` é o lado da imagem que decidiu (32, 128 ou 256)."""
+
+    label: str
+    explanation: str
+    status: str
+    features: Tuple[float, float, float, float]
+    stage: int
+    # Margem até o limiar mais próximo, em tolerâncias do estágio (None no estágio final)
+    margin: Optional[float]
+
+
+def decision_margin(
+    model: SimpleAgroVisionModel, features: Tuple[float, float, float, float], stage: CascadeStage
+) -> float:
+    """
+    Menor distância, em tolerâncias do estágio, até um limiar cuja travessia
+    mudaria a decisão. Margem >= 1: o rótulo não muda dentro das tolerâncias.
+    """
+    mean_r, mean_g, mean_b, brownish_ratio = features
+    green_ratio = mean_g / (mean_r + mean_g + mean_b + 1e-6)
+
+    to_green = (green_ratio - model.GREEN_RATIO_MIN) / stage.green_tolerance
+    to_healthy = (model.BROWNISH_HEALTHY_MAX - brownish_ratio) / stage.healthy_tolerance
+    to_warning = (model.BROWNISH_WARNING_MAX - brownish_ratio) / stage.warning_tolerance
+
+    if to_warning <= 0:  # danos: só a volta abaixo de 0.15 muda o rótulo
+        return -to_warning
+    if to_green > 0 and to_healthy > 0:  # saudável
+        return min(to_green, to_healthy, to_warning)
+    # estresse: sobe para danos ou, cruzando verde e manchas juntos, vira saudável
+    return min(to_warning, max(-to_green, -to_healthy))
+
+
+class CascadeClassifier:
+    """
+    Classifica decodificando primeiro uma miniatura e só escalando para o
+    caminho completo quando as features ficam perto dos limiares.
+    """
+
+    def __init__(self, model: Optional[SimpleAgroVisionModel] = None, stages=CASCADE_STAGES):
+        self.model = model or SimpleAgroVisionModel()
+        self.stages = tuple(stages)
+
+    @staticmethod
+    def _open(source: Union[str, os.PathLike, bytes]) -> Image.Image:
+        return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    def _reduced(self, image: Image.Image) -> Image.Image:
+        """Miniatura RGB com ao menos `TARGET_SIZE` por eixo, reduzida por um fator inteiro."""
+        width, height = self.model.TARGET_SIZE
+        image = image.convert("RGB")
+        factor_x = max(1, image.width // width)
+        factor_y = max(1, image.height // height)
+        if factor_x > 1 or factor_y > 1:
+            image = image.reduce((factor_x, factor_y))
+        return image
+
+    def classify(self, source: Union[str, os.PathLike, bytes]) -> CascadeDecision:
+        """Classifica a imagem em `source` (caminho ou bytes do arquivo)."""
+        model = self.model
+        with self._open(source) as image:
+            full_size = image.size
+            if image.format == "JPEG":
+                image.draft("RGB", model.TARGET_SIZE)
+            if image.size == full_size:
+                # Sem redução na decodificação, a miniatura custaria a mesma
+                # decodificação: os estágios amostram o próprio 256x256 de referência
+                reference = reduced = model.preprocess_image(image)
+            else:
+                reference = None
+                with timer("cascade_thumbnail"):
+                    # Mesmo resize de `preprocess_image`: os estágios amostram o 256x256
+                    reduced = np.asarray(self._reduced(image).resize(model.TARGET_SIZE))
+
+            for stage in self.stages:
+                step = reduced.shape[1] // stage.size
+                sample = reduced[step // 2::step, step // 2::step]
+                features = model.extract_color_features(sample)
+                margin = decision_margin(model, features, stage)
+                if margin >= 1:
+                    label, explanation, status = model.classify_features(features)
+                    metrics.inc("cascade_decisions", stage=str(stage.size))
+                    return CascadeDecision(label, explanation, status, features, stage.size, margin)
+
+            if reference is None:
+                # Miniatura reduzida na decodificação: decodifica de novo, inteira
+                with self._open(source) as full:
+                    img_array = model.preprocess_image(full)
+            else:
+                img_array = reference
+
+        features = model.extract_color_features(img_array)
+        label, explanation, status = model.classify_features(features, img_array)
+        stage = img_array.shape[1]
+        metrics.inc("cascade_decisions", stage=str(stage))
+        return CascadeDecision(label, explanation, status, features, stage, None)
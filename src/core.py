@@ -0,0 +1,324 @@
+"""
+Núcleo do AgroVision AI: modelo, pré-processamento e features de cor.
+
+Importa só NumPy e Pillow (e `metrics`, que só usa a biblioteca padrão),
+sem Streamlit: workers, CLIs, serviços, benchmarks e testes usam o modelo
+sem o custo de importação e sem os efeitos colaterais da interface
+(`st.set_page_config`, CSS injetado). Os kernels de features alternativos
+são importados só quando escolhidos.
+
+O app (`app.py`) também importa daqui; o código novo deve fazer o mesmo.
+"""
+
+import importlib
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from metrics import timer
+
+# ==================== CONFIGURAÇÃO DO PIPELINE ====================
+# Caminho rápido de ingestão: AGROVISION_FAST_INGEST=1 troca o resize exato
+# pela decodificação em escala reduzida (ver SimpleAgroVisionModel).
+FAST_INGEST = os.environ.get("AGROVISION_FAST_INGEST", "0") == "1"
+
+# Kernel de features de cor: "float" (original), "uint8" (inteiro, sem cópia
+# em float64 e com buffers reutilizáveis; ver feature_kernels.py) ou
+# "histogram" (histogramas do Pillow com tabela da região; ver histogram_features.py).
+FEATURE_KERNEL = os.environ.get("AGROVISION_FEATURE_KERNEL", "float")
+
+# Nome -> "módulo:Classe", importado só quando o kernel é escolhido
+FEATURE_KERNELS = {
+    "float": None,
+    "uint8": "feature_kernels:UInt8FeatureKernel",
+    "histogram": "histogram_features:HistogramFeatureKernel",
+}
+
+# Análise em faixas: uploads acima de AGROVISION_STREAMING_MIN_MP megapixels
+# são redimensionados faixa a faixa dentro do orçamento de memória
+# (resultado idêntico; ver streaming.py). O orçamento limita a memória toda
+# só em formatos lidos faixa a faixa do arquivo (TIFF sem compressão, BMP,
+# PPM); JPEG e PNG, os formatos do upload do app, são decodificados inteiros
+# pelo Pillow e o orçamento limita só a conversão e a reamostragem (pico de
+# ~1.2x a imagem decodificada, contra ~2x do caminho padrão).
+STREAMING_MIN_PIXELS = int(float(os.environ.get("AGROVISION_STREAMING_MIN_MP", "12")) * 1e6)
+STREAMING_MEMORY_BUDGET = int(os.environ.get("AGROVISION_STREAMING_BUDGET_MB", "32")) * 1024 * 1024
+
+# ==================== STATUS ====================
+# Cor de cada status do diagnóstico, compartilhada pela interface
+# (ui_assets, app) e pelo mapa do ortomosaico, que não importa a interface.
+STATUS_COLORS = {
+    "healthy": "#10b981",
+    "warning": "#f59e0b",
+    "danger": "#ef4444",
+}
+
+
+def load_kernel(name: str):
+    """Instância do kernel de features `name` (None para o caminho float)."""
+    if name not in FEATURE_KERNELS:
+        raise ValueError(
+            f"Kernel de features desconhecido: {name!r} "
+            f"(opções: {', '.join(FEATURE_KERNELS)})"
+        )
+    target = FEATURE_KERNELS[name]
+    if target is None:
+        return None
+    module_name, class_name = target.split(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class SimpleAgroVisionModel:
+    """
+    Versão simplificada da ideia do AgroVision AI.
+
+    Em vez de treinar uma CNN completa, esta POC utiliza
+    features simples de cor (média de canais e proporção
+    de pixels amarelados / amarronzados) para classificar
+    a planta em três categorias:
+
+    - Planta Saudável
+    - Possível Praga / Estresse Moderado
+    - Possível Doença ou Danos Graves
+
+    Isso mantém a lógica de "visão computacional + decisão automática",
+    mas em uma forma leve e demonstrável.
+    """
+
+    # Resolução de entrada do modelo
+    TARGET_SIZE = (256, 256)
+
+    # Margem mantida pela redução na decodificação (caminho rápido)
+    _REDUCING_GAP = 2
+
+    # Pixel amarelado/amarronzado: r/255 > 0.4, g/255 > 0.3 e b/255 < 0.4.
+    # Os mesmos limiares em níveis uint8, usados por todos os caminhos inteiros
+    # (kernels, faixas, imagem integral, histogramas): r > 102, g > 76, b < 102
+    BROWNISH_R_MIN = 102
+    BROWNISH_G_MIN = 76
+    BROWNISH_B_MAX = 102
+
+    # Limiares de decisão
+    GREEN_RATIO_MIN = 0.40
+    BROWNISH_HEALTHY_MAX = 0.05
+    BROWNISH_WARNING_MAX = 0.15
+
+    # Rótulo e explicação de cada status (também usados pelos backends em backends.py)
+    DIAGNOSES = {
+        "healthy": (
+            "Planta Saudável",
+            "A imagem apresenta predominância de tons esverdeados e baixa presença de manchas. "
+            "Sua planta está em perfeito estado de saúde! Mantenha os cuidados regulares.",
+        ),
+        "warning": (
+            "⚠️ Possível Estresse",
+            "Detectamos sinais moderados de variação de cor. Pode indicar estresse hídrico, "
+            "deficiência nutricional ou início de pragas. Recomendamos aumentar a atenção.",
+        ),
+        "danger": (
+            "🚨 Danos Graves Detectados",
+            "A proporção elevada de manchas amareladas/amarronzadas sugere doença avançada ou danos "
+            "significativos. Recomendamos ação imediata e consulta com especialista.",
+        ),
+    }
+
+    # Distância ao limiar de verde abaixo da qual o caminho em lote
+    # confirma o rótulo pelo caminho escalar (diferenças de arredondamento).
+    _TIE_TOLERANCE = 1e-9
+
+    def __init__(self, fast_ingest: bool = FAST_INGEST, feature_kernel: str = FEATURE_KERNEL):
+        # True: decodifica em escala reduzida (draft/reduce) antes do resize final
+        self.fast_ingest = fast_ingest
+        self.feature_kernel = feature_kernel
+        self._kernel = load_kernel(feature_kernel)
+
+    def preprocess_image(self, image: Image.Image) -> np.ndarray:
+        """
+        Converte a imagem para RGB, redimensiona e retorna um array numpy.
+
+        Com `fast_ingest`, a imagem é reduzida já na decodificação antes da
+        reamostragem final (resultado próximo, mas não idêntico, ao exato).
+
+        Etapas cronometradas (metrics.py): decode, convert, resize.
+        """
+        with timer("decode"):
+            if self.fast_ingest:
+                image = self._reduce_on_decode(image)
+            # `Image.open` é preguiçoso; carregar aqui separa a decodificação da conversão
+            image.load()
+        with timer("convert"):
+            image = image.convert("RGB")
+        with timer("resize"):
+            image = image.resize(self.TARGET_SIZE)
+            return np.array(image)
+
+    def _reduce_on_decode(self, image: Image.Image) -> Image.Image:
+        """
+        Reduz a imagem por um fator inteiro mantendo ao menos
+        `_REDUCING_GAP` vezes o tamanho final em cada eixo.
+
+        JPEG: `Image.draft` faz o libjpeg decodificar direto em 1/2, 1/4 ou
+        1/8 da escala (só tem efeito antes de a imagem ser carregada).
+        Demais formatos: `Image.reduce` (média por blocos em C) após decodificar.
+        """
+        width, height = self.TARGET_SIZE
+        min_size = (width * self._REDUCING_GAP, height * self._REDUCING_GAP)
+        image = self.draft_on_decode(image)
+
+        if image.mode != "RGB":
+            # reduce() faria a média de índices de paleta em modo "P"
+            image = image.convert("RGB")
+
+        factor_x = max(1, image.width // min_size[0])
+        factor_y = max(1, image.height // min_size[1])
+        if factor_x > 1 or factor_y > 1:
+            image = image.reduce((factor_x, factor_y))
+        return image
+
+    def draft_on_decode(self, image: Image.Image) -> Image.Image:
+        """
+        Com `fast_ingest`, configura a decodificação reduzida do JPEG
+        (`Image.draft`) sem decodificar; `image.size` passa a ser o reduzido.
+
+        Quem escolhe entre `preprocess_image` e a análise em faixas chama
+        isto antes de olhar o tamanho: um JPEG grande reduzido na
+        decodificação já cabe no caminho normal. Os demais formatos só são
+        reduzidos depois de decodificados inteiros (`Image.reduce`), então
+        para eles a análise em faixas continua tendo prioridade, porque é
+        ela que limita a memória.
+        """
+        if self.fast_ingest and image.format == "JPEG":
+            width, height = self.TARGET_SIZE
+            image.draft("RGB", (width * self._REDUCING_GAP, height * self._REDUCING_GAP))
+        return image
+
+    def extract_color_features(self, img_array: np.ndarray) -> Tuple[float, float, float, float]:
+        """
+        Extrai features simples de cor:
+        - média de R, G, B
+        - proporção de pixels 'amarelados/amarronzados'
+        """
+        with timer("features"):
+            if self._kernel is not None and img_array.dtype == np.uint8:
+                return self._kernel(img_array)
+
+            arr = img_array / 255.0
+            r = arr[:, :, 0]
+            g = arr[:, :, 1]
+            b = arr[:, :, 2]
+
+            mean_r = float(r.mean())
+            mean_g = float(g.mean())
+            mean_b = float(b.mean())
+
+            brownish_mask = (r > 0.4) & (g > 0.3) & (b < 0.4)
+            brownish_ratio = float(brownish_mask.mean())
+
+            return mean_r, mean_g, mean_b, brownish_ratio
+
+    def extract_color_features_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Versão vetorizada de `extract_color_features` para um lote empilhado
+        (N, 256, 256, 3) uint8.
+
+        Retorna um array (N, 4) com média de R, G, B e a proporção de pixels
+        'amarelados/amarronzados' de cada imagem, calculados com reduções
+        sobre os eixos de altura e largura (sem laço Python por imagem).
+        """
+        batch = np.asarray(batch)
+        if batch.ndim != 4 or batch.shape[-1] != 3:
+            raise ValueError(f"Esperado lote (N, H, W, 3), recebido {batch.shape}")
+
+        with timer("features_batch"):
+            return self._batch_features(batch)
+
+    @classmethod
+    def _batch_features(cls, batch: np.ndarray) -> np.ndarray:
+        n, height, width = batch.shape[:3]
+        n_pixels = height * width
+        features = np.empty((n, 4), dtype=np.float64)
+        batch = np.ascontiguousarray(batch)
+
+        # Somas inteiras são exatas; a divisão final reproduz a média normalizada.
+        # Reduzir primeiro as linhas (eixo contíguo, uint32) é bem mais rápido
+        # que somar sobre (altura, largura) direto em int64.
+        column_sums = np.add.reduce(batch.reshape(n, height, width * 3), axis=1, dtype=np.uint32)
+        sums = column_sums.reshape(n, width, 3).sum(axis=1, dtype=np.uint64)
+        features[:, :3] = sums / (255.0 * n_pixels)
+
+        # Mesmos limiares do caminho escalar, expressos em inteiros
+        r = batch[..., 0]
+        g = batch[..., 1]
+        b = batch[..., 2]
+        brownish_mask = np.empty((n, height, width), dtype=bool)
+        scratch = np.empty_like(brownish_mask)
+        np.greater(r, cls.BROWNISH_R_MIN, out=brownish_mask)
+        np.logical_and(brownish_mask, np.greater(g, cls.BROWNISH_G_MIN, out=scratch), out=brownish_mask)
+        np.logical_and(brownish_mask, np.less(b, cls.BROWNISH_B_MAX, out=scratch), out=brownish_mask)
+        features[:, 3] = np.count_nonzero(brownish_mask.reshape(n, -1), axis=1) / n_pixels
+
+        return features
+
+    def classify_features(
+        self,
+        features: Tuple[float, float, float, float],
+        img_array: Optional[np.ndarray] = None,
+    ) -> Tuple[str, str, str]:
+        """
+        Aplica as regras de decisão a features já extraídas.
+
+        Quando `img_array` é informado e a proporção de verde cai a uma
+        distância numérica desprezível do limiar, a decisão é refeita pelo
+        caminho escalar (`classify`) para garantir o mesmo rótulo.
+        """
+        mean_r, mean_g, mean_b, brownish_ratio = (float(f) for f in features)
+
+        total_mean = mean_r + mean_g + mean_b + 1e-6
+        green_ratio = mean_g / total_mean
+
+        if img_array is not None and abs(green_ratio - self.GREEN_RATIO_MIN) < self._TIE_TOLERANCE:
+            return self.classify(img_array)
+
+        return self._decide(green_ratio, brownish_ratio)
+
+    def classify_batch(self, batch: np.ndarray) -> List[Tuple[str, str, str]]:
+        """
+        Classifica um lote empilhado (N, 256, 256, 3) uint8.
+
+        Retorna uma lista com (classe, explicação, status) por imagem, com
+        os mesmos rótulos de `classify` aplicado imagem a imagem.
+        """
+        features = self.extract_color_features_batch(batch)
+        return [
+            self.classify_features(image_features, batch[i])
+            for i, image_features in enumerate(features)
+        ]
+
+    def classify(self, img_array: np.ndarray) -> Tuple[str, str, str]:
+        """
+        Classifica a planta com base nas features de cor.
+
+        Retorna:
+            classe (str), explicação (str), status (str)
+        """
+        with timer("classify"):
+            mean_r, mean_g, mean_b, brownish_ratio = self.extract_color_features(img_array)
+
+            total_mean = mean_r + mean_g + mean_b + 1e-6
+            green_ratio = mean_g / total_mean
+
+            return self._decide(green_ratio, brownish_ratio)
+
+    def _decide(self, green_ratio: float, brownish_ratio: float) -> Tuple[str, str, str]:
+        """Regras de decisão compartilhadas entre os caminhos escalar e em lote."""
+        if green_ratio > self.GREEN_RATIO_MIN and brownish_ratio < self.BROWNISH_HEALTHY_MAX:
+            status = "healthy"
+        elif brownish_ratio < self.BROWNISH_WARNING_MAX:
+            status = "warning"
+        else:
+            status = "danger"
+
+        label, explanation = self.DIAGNOSES[status]
+        return label, explanation, status
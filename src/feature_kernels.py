@@ -0,0 +1,81 @@
+"""
+Kernels alternativos para `SimpleAgroVisionModel.extract_color_features`.
+
+O caminho original normaliza a imagem inteira para float64
+(`img_array / 255.0`) e cria três máscaras booleanas temporárias. Os kernels
+daqui trabalham direto sobre o uint8 e retornam a mesma tupla
+(mean_r, mean_g, mean_b, brownish_ratio) dentro da tolerância de ponto
+flutuante.
+"""
+
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from core import SimpleAgroVisionModel
+
+
+class UInt8FeatureKernel:
+    """
+    Kernel inteiro, sem cópia em float e com buffers de rascunho reutilizáveis.
+
+    - Somas dos canais acumuladas em uint32 linha a linha (exatas até
+      16 milhões de linhas) e convertidas para média normalizada no fim.
+    - Limiares inteiros do modelo (`SimpleAgroVisionModel.BROWNISH_*`):
+      r > 102, g > 76, b < 102.
+    - Máscaras escritas em buffers por thread, reaproveitados entre chamadas
+      de mesmo formato (uma instância pode ser compartilhada entre sessões).
+    """
+
+    R_MIN = SimpleAgroVisionModel.BROWNISH_R_MIN
+    G_MIN = SimpleAgroVisionModel.BROWNISH_G_MIN
+    B_MAX = SimpleAgroVisionModel.BROWNISH_B_MAX
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _scratch(self, height: int, width: int):
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None or scratch[0].shape != (height, width):
+            scratch = (
+                np.empty((height, width), dtype=bool),
+                np.empty((height, width), dtype=bool),
+                np.empty(width * 3, dtype=np.uint32),
+            )
+            self._local.scratch = scratch
+        return scratch
+
+    def __call__(self, img_array: np.ndarray) -> Tuple[float, float, float, float]:
+        if img_array.dtype != np.uint8 or img_array.ndim != 3 or img_array.shape[2] < 3:
+            raise ValueError(
+                f"Esperado array uint8 (H, W, 3), recebido {img_array.dtype} {img_array.shape}"
+            )
+
+        height, width = img_array.shape[:2]
+        mask, tmp, row_sums = self._scratch(height, width)
+
+        # Somas por canal: reduz as linhas (memória contígua) e depois as colunas
+        if img_array.shape[2] == 3 and img_array.flags.c_contiguous:
+            np.add.reduce(img_array.reshape(height, width * 3), axis=0, dtype=np.uint32, out=row_sums)
+            sums = row_sums.reshape(width, 3).sum(axis=0, dtype=np.uint64)
+        else:
+            sums = [np.add.reduce(img_array[..., c], axis=None, dtype=np.uint64) for c in range(3)]
+
+        r = img_array[..., 0]
+        g = img_array[..., 1]
+        b = img_array[..., 2]
+        np.greater(r, self.R_MIN, out=mask)
+        np.greater(g, self.G_MIN, out=tmp)
+        np.logical_and(mask, tmp, out=mask)
+        np.less(b, self.B_MAX, out=tmp)
+        np.logical_and(mask, tmp, out=mask)
+
+        n_pixels = height * width
+        scale = 1.0 / (255.0 * n_pixels)
+        return (
+            float(sums[0]) * scale,
+            float(sums[1]) * scale,
+            float(sums[2]) * scale,
+            np.count_nonzero(mask) / n_pixels,
+        )
@@ -0,0 +1,301 @@
+"""
+Histórico persistente das análises (SQLite local).
+
+Cada análise vira uma linha com instante, hash do conteúdo, talhão/planta,
+as quatro features de cor, rótulo e status. Para continuar rápido com
+milhões de registros:
+
+    - WAL + `synchronous=NORMAL`: leitores não bloqueiam o escritor e cada
+      transação não força um fsync;
+    - escritas em lote: `add` acumula em memória e grava `batch_size`
+      registros por transação com `executemany`; `add_many` grava um lote
+      de uma vez (modo em lote);
+    - índices em (ts), (plot, ts) e (status, ts): consultas por intervalo
+      e "mais recentes" leem só o trecho do índice, sem varrer a tabela;
+    - agregado diário (`daily`), mantido na mesma transação das inserções:
+      contagens e médias por dia/talhão/status saem de poucas linhas, não
+      de uma varredura dos registros.
+
+O instante é UNIX (segundos, UTC); os dias do agregado também são UTC.
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_SECONDS_PER_DAY = 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    content_key TEXT,
+    plot TEXT,
+    mean_r REAL NOT NULL,
+    mean_g REAL NOT NULL,
+    mean_b REAL NOT NULL,
+    brownish_ratio REAL NOT NULL,
+    label TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_analyses_ts ON analyses (ts);
+CREATE INDEX IF NOT EXISTS ix_analyses_plot_ts ON analyses (plot, ts);
+CREATE INDEX IF NOT EXISTS ix_analyses_status_ts ON analyses (status, ts);
+
+CREATE TABLE IF NOT EXISTS daily (
+    day INTEGER NOT NULL,
+    plot TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_r REAL NOT NULL,
+    sum_g REAL NOT NULL,
+    sum_b REAL NOT NULL,
+    sum_brownish REAL NOT NULL,
+    PRIMARY KEY (day, plot, status)
+) WITHOUT ROWID;
+"""
+
+_INSERT = """
+INSERT INTO analyses (ts, content_key, plot, mean_r, mean_g, mean_b, brownish_ratio, label, status)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Talhão vazio no agregado (a chave primária não aceita NULL de forma útil)
+_NO_PLOT = ""
+
+_UPSERT_DAILY = """
+INSERT INTO daily (day, plot, status, n, sum_r, sum_g, sum_b, sum_brownish)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, plot, status) DO UPDATE SET
+    n = n + excluded.n,
+    sum_r = sum_r + excluded.sum_r,
+    sum_g = sum_g + excluded.sum_g,
+    sum_b = sum_b + excluded.sum_b,
+    sum_brownish = sum_brownish + excluded.sum_brownish
+"""
+
+_COLUMNS = "ts, content_key, plot, mean_r, mean_g, mean_b, brownish_ratio, label, status"
+
+
+@dataclass
+class HistoryRecord:
+    """Uma análise registrada."""
+
+    timestamp: float
+    content_key: Optional[str]
+    plot: Optional[str]
+    features: Tuple[float, float, float, float]
+    label: str
+    status: str
+
+    def _row(self) -> tuple:
+        return (self.timestamp, self.content_key, self.plot or None, *map(float, self.features), self.label, self.status)
+
+    @classmethod
+    def _from_row(cls, row: Sequence) -> "HistoryRecord":
+        ts, content_key, plot, mean_r, mean_g, mean_b, brownish_ratio, label, status = row
+        return cls(ts, content_key, plot, (mean_r, mean_g, mean_b, brownish_ratio), label, status)
+
+
+class HistoryStore:
+    """
+    Histórico em SQLite, seguro entre threads (uma conexão, um lock).
+
+    `add` só grava quando acumula `batch_size` registros; consultas, `flush`
+    e `close` gravam o que estiver pendente antes, então quem escreve sempre
+    lê os próprios registros.
+    """
+
+    def __init__(self, path: str, batch_size: int = 64):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._pending: List[HistoryRecord] = []
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ==================== ESCRITA ====================
+
+    def add(self, record: HistoryRecord) -> None:
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size:
+                self._write(self._pending)
+                self._pending = []
+
+    def add_many(self, records: Iterable[HistoryRecord]) -> int:
+        """Grava os registros (e os pendentes) em uma única transação."""
+        with self._lock:
+            batch = self._pending + list(records)
+            self._pending = []
+            self._write(batch)
+        return len(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            self._write(self._pending)
+            self._pending = []
+
+    def _write(self, records: List[HistoryRecord]) -> None:
+        if not records:
+            return
+        rows = [record._row() for record in records]
+
+        # Agregado diário do lote, somado em Python antes do upsert
+        daily: Dict[Tuple[int, str, str], List[float]] = {}
+        for ts, _, plot, mean_r, mean_g, mean_b, brownish_ratio, _, status in rows:
+            key = (int(ts // _SECONDS_PER_DAY), plot or _NO_PLOT, status)
+            totals = daily.setdefault(key, [0, 0.0, 0.0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += mean_r
+            totals[2] += mean_g
+            totals[3] += mean_b
+            totals[4] += brownish_ratio
+
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(_INSERT, rows)
+            self._conn.executemany(_UPSERT_DAILY, [(*key, *totals) for key, totals in daily.items()])
+
+    # ==================== CONSULTAS ====================
+
+    def count(self) -> int:
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute("SELECT COALESCE(SUM(n), 0) FROM daily").fetchone()[0]
+
+    def recent(self, limit: int = 20, plot: Optional[str] = None, status: Optional[str] = None) -> List[HistoryRecord]:
+        """Os `limit` registros mais recentes (lidos do fim do índice)."""
+        return self.range(plot=plot, status=status, limit=limit, newest_first=True)
+
+    def range(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        plot: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+    ) -> List[HistoryRecord]:
+        """
+        Registros com `start <= ts < end`, filtrados por talhão e/ou status
+        (`plot=""`: os registros sem talhão).
+        """
+        where, params = self._filters(start, end, plot, status)
+        sql = f"SELECT {_COLUMNS} FROM analyses{where} ORDER BY ts {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params).fetchall()
+        return [HistoryRecord._from_row(row) for row in rows]
+
+    def summary(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        plot: Optional[str] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Contagem e médias das features por status, a partir do agregado
+        diário. `start`/`end` são arredondados para o dia (UTC) que os contém.
+        """
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append(int(start // _SECONDS_PER_DAY))
+        if end is not None:
+            clauses.append("day <= ?")
+            params.append(int(end // _SECONDS_PER_DAY))
+        if plot is not None:
+            clauses.append("plot = ?")
+            params.append(plot or _NO_PLOT)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT status, SUM(n), SUM(sum_r), SUM(sum_g), SUM(sum_b), SUM(sum_brownish) "
+            f"FROM daily{where} GROUP BY status"
+        )
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params).fetchall()
+        return {
+            status: {
+                "count": n,
+                "mean_r": sum_r / n,
+                "mean_g": sum_g / n,
+                "mean_b": sum_b / n,
+                "brownish_ratio": sum_brownish / n,
+            }
+            for status, n, sum_r, sum_g, sum_b, sum_brownish in rows
+        }
+
+    def get(self, ids: Iterable[int]) -> Dict[int, HistoryRecord]:
+        """Registros pelo id (os ids de `feature_rows`); ids inexistentes ficam de fora."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        sql = f"SELECT id, {_COLUMNS} FROM analyses WHERE id IN ({', '.join('?' * len(ids))})"
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, ids).fetchall()
+        return {row[0]: HistoryRecord._from_row(row[1:]) for row in rows}
+
+    def feature_rows(self, after_id: int = 0, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids (n,) int64, features (n, 4) float32) dos registros com id >
+        `after_id`, em ordem de id (chave primária: leitura sequencial).
+        Usado para montar e atualizar o índice de casos semelhantes.
+        """
+        sql = "SELECT id, mean_r, mean_g, mean_b, brownish_ratio FROM analyses WHERE id > ? ORDER BY id"
+        params: list = [int(after_id)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(sql, params).fetchall()
+        table = np.array(rows, dtype=np.float64).reshape(-1, 5)
+        return table[:, 0].astype(np.int64), table[:, 1:].astype(np.float32)
+
+    def plots(self) -> List[str]:
+        """Talhões/plantas já registrados."""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute("SELECT DISTINCT plot FROM daily WHERE plot != ? ORDER BY plot", (_NO_PLOT,))
+            return [plot for (plot,) in rows]
+
+    @staticmethod
+    def _filters(start, end, plot, status) -> Tuple[str, list]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(float(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(float(end))
+        if plot:
+            clauses.append("plot = ?")
+            params.append(plot)
+        elif plot is not None:
+            # Talhão vazio: gravado como NULL (`HistoryRecord._row`), como no agregado
+            clauses.append("plot IS NULL")
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
@@ -0,0 +1,115 @@
+"""
+Imagem integral (summed-area table) das features de cor.
+
+`classify` dá um único veredito para a imagem inteira; uma folha com metade
+doente aparece só como "Possível Estresse". Aqui, uma única passada sobre o
+array pré-processado monta as tabelas acumuladas de R, G, B e da máscara
+amarronzada:
+
+    T[y, x] = soma dos pixels em [0, y) x [0, x)
+
+e a soma de qualquer retângulo sai de quatro leituras:
+
+    S = T[y1, x1] - T[y0, x1] - T[y1, x0] + T[y0, x0]
+
+Assim as features (e o rótulo) de qualquer região, ou de todas as células
+de uma grade, custam O(1) por região, sem voltar aos pixels. As somas são
+inteiras e exatas, com os mesmos limiares do modelo (r > 102, g > 76, b < 102).
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from core import SimpleAgroVisionModel
+
+# Região em pixels do array: (y0, x0, y1, x1), intervalo semiaberto
+Box = Tuple[int, int, int, int]
+
+
+class IntegralFeatures:
+    """Tabelas acumuladas (H+1, W+1, 4): somas de R, G, B e contagem amarronzada."""
+
+    def __init__(self, img_array: np.ndarray):
+        if img_array.dtype != np.uint8 or img_array.ndim != 3 or img_array.shape[2] < 3:
+            raise ValueError(f"Esperado array uint8 (H, W, 3), recebido {img_array.dtype} {img_array.shape}")
+        height, width = img_array.shape[:2]
+        self.height = height
+        self.width = width
+
+        r = img_array[..., 0]
+        g = img_array[..., 1]
+        b = img_array[..., 2]
+        table = np.zeros((height + 1, width + 1, 4), dtype=np.int64)
+        table[1:, 1:, :3] = img_array[..., :3]
+        table[1:, 1:, 3] = (
+            (r > SimpleAgroVisionModel.BROWNISH_R_MIN)
+            & (g > SimpleAgroVisionModel.BROWNISH_G_MIN)
+            & (b < SimpleAgroVisionModel.BROWNISH_B_MAX)
+        )
+        np.cumsum(table, axis=0, out=table)
+        np.cumsum(table, axis=1, out=table)
+        self.table = table
+
+    # ==================== REGIÕES ====================
+
+    def clip_box(self, box: Box) -> Box:
+        y0, x0, y1, x1 = box
+        y0, y1 = sorted((min(max(int(y0), 0), self.height), min(max(int(y1), 0), self.height)))
+        x0, x1 = sorted((min(max(int(x0), 0), self.width), min(max(int(x1), 0), self.width)))
+        return y0, x0, y1, x1
+
+    def box_from_fractions(self, x_range: Tuple[float, float], y_range: Tuple[float, float]) -> Box:
+        """Converte frações (0-1) de largura e altura na região em pixels."""
+        return self.clip_box((
+            round(y_range[0] * self.height), round(x_range[0] * self.width),
+            round(y_range[1] * self.height), round(x_range[1] * self.width),
+        ))
+
+    def region_sums(self, box: Box) -> np.ndarray:
+        """Somas (R, G, B, amarronzados) do retângulo, em quatro leituras."""
+        y0, x0, y1, x1 = self.clip_box(box)
+        t = self.table
+        return t[y1, x1] - t[y0, x1] - t[y1, x0] + t[y0, x0]
+
+    def region_features(self, box: Box) -> Tuple[float, float, float, float]:
+        """(mean_r, mean_g, mean_b, brownish_ratio) da região, como `extract_color_features`."""
+        y0, x0, y1, x1 = self.clip_box(box)
+        pixels = (y1 - y0) * (x1 - x0)
+        if not pixels:
+            raise ValueError(f"Região vazia: {box}")
+        sums = self.region_sums((y0, x0, y1, x1))
+        means = sums[:3] / (255.0 * pixels)
+        return float(means[0]), float(means[1]), float(means[2]), int(sums[3]) / pixels
+
+    def classify_region(self, model, box: Box) -> Tuple[str, str, str]:
+        """(classe, explicação, status) da região pelas regras do modelo."""
+        return model.classify_features(self.region_features(box))
+
+    # ==================== GRADE ====================
+
+    def grid_bounds(self, rows: int, cols: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Bordas das células (linhas e colunas), o mais iguais possível."""
+        if not (1 <= rows <= self.height and 1 <= cols <= self.width):
+            raise ValueError(f"Grade {rows}x{cols} inválida para {self.height}x{self.width}")
+        ys = np.linspace(0, self.height, rows + 1).round().astype(np.intp)
+        xs = np.linspace(0, self.width, cols + 1).round().astype(np.intp)
+        return ys, xs
+
+    def grid_features(self, rows: int, cols: int) -> np.ndarray:
+        """Features (rows, cols, 4) de todas as células, sem laço por célula."""
+        ys, xs = self.grid_bounds(rows, cols)
+        corners = self.table[np.ix_(ys, xs)]
+        sums = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        areas = np.diff(ys)[:, None] * np.diff(xs)[None, :]
+
+        features = np.empty((rows, cols, 4), dtype=np.float64)
+        features[..., :3] = sums[..., :3] / (255.0 * areas[..., None])
+        features[..., 3] = sums[..., 3] / areas
+        return features
+
+    def classify_grid(self, model, rows: int, cols: int) -> Tuple[np.ndarray, List[List[str]]]:
+        """(features por célula, status por célula) de uma grade rows x cols."""
+        features = self.grid_features(rows, cols)
+        statuses = [[model.classify_features(cell)[2] for cell in row] for row in features]
+        return features, statuses
@@ -0,0 +1,263 @@
+"""
+Instrumentação por etapa do pipeline (tempos e contadores).
+
+Cada etapa da análise (leitura do upload, decodificação, conversão RGB,
+redimensionamento, features, classificação, renderização) é cronometrada com
+`timer("etapa")`. Os tempos alimentam um histograma por etapa com:
+    - baldes cumulativos (formato Prometheus, para agregar entre processos);
+    - uma janela das últimas observações, de onde saem p50/p90/p99 recentes.
+
+Desligado por padrão: com AGROVISION_METRICS diferente de "1", `timer`
+devolve um gerenciador de contexto nulo compartilhado e `inc` retorna na
+primeira linha, então o custo no caminho quente é uma chamada de função e a
+leitura de um atributo.
+
+Com as métricas ligadas, `start_exporter` publica tudo em texto Prometheus
+em http://127.0.0.1:AGROVISION_METRICS_PORT/metrics (thread em segundo
+plano, uma por processo).
+"""
+
+import bisect
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+ENABLED = os.environ.get("AGROVISION_METRICS", "0") == "1"
+EXPORTER_HOST = os.environ.get("AGROVISION_METRICS_HOST", "127.0.0.1")
+EXPORTER_PORT = int(os.environ.get("AGROVISION_METRICS_PORT", "9464"))
+
+# Limites superiores dos baldes, em segundos (de 0,5 ms a 10 s)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Observações mantidas por etapa para os quantis recentes
+WINDOW = 1024
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+_PREFIX = "agrovision"
+
+# Série: (nome, ((rótulo, valor), ...))
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """Baldes cumulativos + janela deslizante das últimas observações."""
+
+    __slots__ = ("bucket_counts", "count", "sum", "recent")
+
+    def __init__(self, window: int = WINDOW):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        """Quantis (em segundos) da janela recente; vazio sem observações."""
+        if not self.recent:
+            return {}
+        ordered = sorted(self.recent)
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry: "MetricsRegistry", stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """
+    Histogramas de tempo por etapa e contadores com rótulos.
+
+    Seguro entre threads (sessões do Streamlit e workers do serviço
+    compartilham a instância do processo).
+    """
+
+    def __init__(self, enabled: bool = ENABLED, window: int = WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[SeriesKey, float] = {}
+        self._lock = threading.Lock()
+
+    # ==================== REGISTRO ====================
+
+    def timer(self, stage: str):
+        """Gerenciador de contexto que cronometra `stage` (nulo se desligado)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Soma `value` ao contador `name` com os rótulos dados."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # ==================== LEITURA ====================
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Resumo por etapa (ms) e contadores, para o painel de depuração."""
+        with self._lock:
+            stages = []
+            for stage, histogram in sorted(self._histograms.items()):
+                quantiles = histogram.quantiles()
+                stages.append({
+                    "stage": stage,
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000,
+                    **{f"p{int(q * 100)}_ms": value * 1000 for q, value in quantiles.items()},
+                })
+            counters = [
+                {"counter": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {"stages": stages, "counters": counters}
+
+    def render_prometheus(self) -> str:
+        """Todas as séries no formato de texto do Prometheus (versão 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            if self._histograms:
+                name = f"{_PREFIX}_stage_duration_seconds"
+                lines.append(f"# HELP {name} Tempo de cada etapa do pipeline.")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, histogram in sorted(self._histograms.items()):
+                    stage = _escape(stage)
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9g}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+                name = f"{_PREFIX}_stage_recent_seconds"
+                lines.append(f"# HELP {name} Quantis das últimas {self.window} observações por etapa.")
+                lines.append(f"# TYPE {name} gauge")
+                for stage, histogram in sorted(self._histograms.items()):
+                    stage = _escape(stage)
+                    for q, value in histogram.quantiles().items():
+                        lines.append(f'{name}{{stage="{stage}",quantile="{q:g}"}} {value:.9g}')
+
+            declared = set()
+            for (counter, labels), value in sorted(self._counters.items()):
+                name = f"{_PREFIX}_{counter}_total"
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Valor de rótulo no formato de texto: barra invertida, aspas e quebra de linha escapadas."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registro do processo, usado pelo app, pelo modelo e pelo serviço
+REGISTRY = MetricsRegistry()
+
+
+def timer(stage: str):
+    """Atalho para `REGISTRY.timer`."""
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _Timer(REGISTRY, stage)
+
+
+def inc(name: str, value: float = 1, **labels: str) -> None:
+    """Atalho para `REGISTRY.inc`."""
+    if REGISTRY.enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+# ==================== EXPORTADOR PROMETHEUS ====================
+_exporter: Optional["ThreadingHTTPServer"] = None
+_exporter_lock = threading.Lock()
+
+
+def _make_handler():
+    # http.server só é importado quando o endpoint sobe: importar `metrics`
+    # (todo processo que usa o modelo) continua barato
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        registry = REGISTRY
+
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = self.registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:  # sem log por coleta
+            pass
+
+    return _MetricsHandler
+
+
+def start_exporter(host: str = EXPORTER_HOST, port: int = EXPORTER_PORT) -> "ThreadingHTTPServer":
+    """
+    Sobe o endpoint /metrics em uma thread daemon (idempotente no processo).
+
+    Com `port=0` o sistema escolhe uma porta livre (`server.server_address`).
+    """
+    from http.server import ThreadingHTTPServer
+
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, port), _make_handler())
+            _exporter.daemon_threads = True
+            thread = threading.Thread(target=_exporter.serve_forever, name="agrovision-metrics", daemon=True)
+            thread.start()
+        return _exporter
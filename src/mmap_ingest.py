@@ -0,0 +1,301 @@
+"""
+Ingestão por mapeamento de memória para entradas sem compressão.
+
+`.npy`, dumps RGB crus e TIFF sem compressão (em strips ou em tiles) guardam
+os pixels em posições conhecidas do arquivo. Em vez de `Image.open` +
+`np.array`, que copiam a imagem inteira para a memória do processo, o
+arquivo é mapeado (`mmap`) e exposto como views NumPy sem cópia. A análise
+percorre essas views em faixas de linhas (`streaming.analyze_strips`):
+só as páginas da faixa atual ficam residentes e são liberadas em seguida,
+o que permite analisar arquivos maiores que a RAM.
+
+Formatos aceitos:
+    .npy          uint8 (H, W), (H, W, 1), (H, W, 3) ou (H, W, 4), ordem C
+    .rgb / .raw   pixels intercalados de 8 bits; dimensões em `shape` ou no
+                  nome do arquivo (talhao_8000x6000.rgb, talhao_8000x6000x4.raw)
+    .tif / .tiff  sem compressão, 8 bits, L/RGB/RGBA, planar contíguo
+"""
+
+import mmap
+import os
+import re
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from streaming import DEFAULT_MEMORY_BUDGET, StripAnalysis, analyze_strips, strip_rows_for_budget
+
+MAPPED_EXTENSIONS = (".npy", ".rgb", ".raw", ".tif", ".tiff")
+
+_RAW_EXTENSIONS = (".rgb", ".raw")
+
+# Dimensões no nome do arquivo: LARGURAxALTURA[xCANAIS] antes da extensão
+_SHAPE_IN_NAME = re.compile(r"(\d+)x(\d+)(?:x([134]))?$")
+
+# Rawmodes de TIFF que são bytes intercalados simples -> canais por pixel
+_TIFF_RAWMODES = {"L": 1, "RGB": 3, "RGBX": 4, "RGBA": 4}
+
+_CAN_RELEASE = hasattr(mmap, "MADV_DONTNEED")
+
+
+class NotMappableError(ValueError):
+    """O arquivo não pode ser lido sem decodificação (ex.: TIFF comprimido)."""
+
+
+class MappedImage:
+    """
+    Imagem uint8 mapeada do disco como blocos de pixels sem cópia.
+
+    Cada bloco é uma view (h, w, C) sobre o mapeamento, na posição (x, y) da
+    imagem. Quando os pixels são contíguos no arquivo (.npy, .rgb, TIFF em
+    strips) há um único bloco, exposto também em `array`.
+    """
+
+    def __init__(self, path: str, mapping: mmap.mmap, width: int, height: int, channels: int):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self._mmap = mapping
+        self._buffer = np.frombuffer(mapping, dtype=np.uint8)
+        # [(x, y, view, offset no arquivo, bytes por linha)], ordenados por (y, x)
+        self._blocks: List[Tuple[int, int, np.ndarray, int, int]] = []
+
+    def _add_block(self, x: int, y: int, width: int, height: int, offset: int, stride: int) -> None:
+        end = offset + height * stride
+        if end > len(self._buffer):
+            raise NotMappableError(f"Arquivo truncado: {self.path}")
+        view = self._buffer[offset:end].reshape(height, stride)[:, :width * self.channels]
+        self._blocks.append((x, y, view.reshape(height, width, self.channels), offset, stride))
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def array(self) -> Optional[np.ndarray]:
+        """View (H, W, C) da imagem inteira, se contígua no arquivo."""
+        if len(self._blocks) == 1:
+            return self._blocks[0][2]
+        return None
+
+    def iter_strips(self, rows: int) -> Iterator[np.ndarray]:
+        """
+        Gera faixas RGB (s, W, 3) uint8 de cima para baixo.
+
+        Faixas dentro de um único bloco de largura total são views sem cópia;
+        as demais são montadas a partir dos tiles. As páginas lidas são
+        devolvidas ao sistema depois de cada faixa.
+        """
+        first = 0
+        for y0 in range(0, self.height, rows):
+            y1 = min(self.height, y0 + rows)
+            while self._blocks[first][1] + self._blocks[first][2].shape[0] <= y0:
+                first += 1
+
+            parts = []
+            for block in self._blocks[first:]:
+                if block[1] >= y1:
+                    break
+                parts.append(block)
+
+            x, y, view, _, _ = parts[0]
+            if len(parts) == 1 and view.shape[1] == self.width and y + view.shape[0] >= y1:
+                strip = view[y0 - y:y1 - y]
+            else:
+                strip = np.empty((y1 - y0, self.width, self.channels), dtype=np.uint8)
+                for x, y, view, _, _ in parts:
+                    a = max(y0, y)
+                    b = min(y1, y + view.shape[0])
+                    strip[a - y0:b - y0, x:x + view.shape[1]] = view[a - y:b - y]
+
+            yield _to_rgb(strip)
+            for x, y, view, offset, stride in parts:
+                b = min(y1, y + view.shape[0])
+                # Do início do bloco até a última linha lida (liberar de novo é inócuo)
+                self._release(offset, offset + (b - y) * stride)
+
+    def _release(self, start: int, stop: int) -> None:
+        # Só páginas inteiramente dentro do trecho já consumido
+        if not _CAN_RELEASE:
+            return
+        start = -(-start // mmap.PAGESIZE) * mmap.PAGESIZE
+        stop = stop // mmap.PAGESIZE * mmap.PAGESIZE
+        if stop > start:
+            self._mmap.madvise(mmap.MADV_DONTNEED, start, stop - start)
+
+    def close(self) -> None:
+        self._blocks = []
+        self._buffer = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Ainda há views em uso; o mapeamento fecha quando forem coletadas
+            pass
+
+    def __enter__(self) -> "MappedImage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _to_rgb(strip: np.ndarray) -> np.ndarray:
+    """Mesma conversão do `convert("RGB")` do Pillow, sem cópia."""
+    channels = strip.shape[2]
+    if channels == 3:
+        return strip
+    if channels == 4:
+        return strip[..., :3]
+    return np.broadcast_to(strip, strip.shape[:2] + (3,))
+
+
+def _map_file(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise NotMappableError(f"Arquivo vazio: {path}")
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+    return mapping
+
+
+# ==================== FORMATOS ====================
+def _open_npy(path: str) -> MappedImage:
+    header = np.load(path, mmap_mode="r")
+    shape, dtype, offset = header.shape, header.dtype, header.offset
+    fortran = header.ndim > 1 and not header.flags.c_contiguous
+    del header
+
+    if dtype != np.uint8 or fortran:
+        raise NotMappableError(f"Esperado .npy uint8 em ordem C, recebido {dtype} {shape}")
+    if len(shape) == 2:
+        shape = shape + (1,)
+    if len(shape) != 3 or shape[2] not in (1, 3, 4):
+        raise NotMappableError(f"Formato de array não suportado: {shape}")
+
+    height, width, channels = shape
+    image = MappedImage(path, _map_file(path), width, height, channels)
+    image._add_block(0, 0, width, height, offset, width * channels)
+    return image
+
+
+def _shape_from_name(path: str) -> Optional[Tuple[int, ...]]:
+    match = _SHAPE_IN_NAME.search(os.path.splitext(os.path.basename(path))[0])
+    if match is None:
+        return None
+    width, height, channels = match.groups()
+    return int(width), int(height), int(channels or 3)
+
+
+def _open_raw(path: str, shape: Optional[Sequence[int]]) -> MappedImage:
+    shape = tuple(shape) if shape else _shape_from_name(path)
+    if not shape:
+        raise NotMappableError(
+            f"Dimensões ausentes para {path}: informe shape=(largura, altura) "
+            "ou use o padrão LARGURAxALTURA no nome do arquivo"
+        )
+    width, height = shape[:2]
+    channels = shape[2] if len(shape) > 2 else 3
+
+    image = MappedImage(path, _map_file(path), width, height, channels)
+    image._add_block(0, 0, width, height, 0, width * channels)
+    return image
+
+
+def _open_tiff(path: str) -> MappedImage:
+    with Image.open(path) as tiff:
+        if tiff.format != "TIFF":
+            raise NotMappableError(f"Não é um TIFF: {path}")
+        tiles = list(tiff.tile)
+        width, height = tiff.size
+
+    channels = None
+    layout = []
+    for tile in tiles:
+        codec, (x0, y0, x1, y1), offset, args = tile[0], tile[1], tile[2], tile[3]
+        rawmode, stride, orientation = args[0], args[1], args[2]
+        if codec != "raw" or rawmode not in _TIFF_RAWMODES or orientation != 1:
+            raise NotMappableError(f"TIFF comprimido ou em formato não mapeável: {path}")
+        if channels is None:
+            channels = _TIFF_RAWMODES[rawmode]
+        elif _TIFF_RAWMODES[rawmode] != channels:
+            raise NotMappableError(f"TIFF com tiles heterogêneos: {path}")
+        layout.append((y0, x0, x1 - x0, y1 - y0, offset, stride or (x1 - x0) * channels))
+
+    if not layout:
+        raise NotMappableError(f"TIFF sem dados de pixel: {path}")
+
+    layout.sort()
+    image = MappedImage(path, _map_file(path), width, height, channels)
+
+    # Strips de largura total e consecutivos no arquivo viram um único bloco
+    row_bytes = width * channels
+    contiguous = all(
+        w == width and stride == row_bytes and offset == layout[0][4] + y * row_bytes
+        for y, _, w, _, offset, stride in layout
+    )
+    if contiguous:
+        image._add_block(0, 0, width, height, layout[0][4], row_bytes)
+    else:
+        for y, x, w, h, offset, stride in layout:
+            image._add_block(x, y, w, h, offset, stride)
+    return image
+
+
+# ==================== API ====================
+def is_mappable_path(path: str) -> bool:
+    """Extensão candidata ao mapeamento (TIFF ainda depende da compressão)."""
+    return path.lower().endswith(MAPPED_EXTENSIONS)
+
+
+def open_mapped(path: str, shape: Optional[Sequence[int]] = None) -> MappedImage:
+    """
+    Mapeia `path` sem decodificar.
+
+    Args:
+        path: arquivo .npy, .rgb/.raw ou .tif/.tiff.
+        shape: (largura, altura[, canais]) para dumps crus sem dimensões no nome.
+
+    Raises:
+        NotMappableError: formato comprimido, dtype não suportado ou
+            dimensões ausentes; use o caminho padrão (`Image.open`).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        return _open_npy(path)
+    if ext in _RAW_EXTENSIONS:
+        return _open_raw(path, shape)
+    if ext in (".tif", ".tiff"):
+        return _open_tiff(path)
+    raise NotMappableError(f"Extensão não suportada para mapeamento: {path}")
+
+
+def analyze_mapped(
+    path: str,
+    model,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    shape: Optional[Sequence[int]] = None,
+) -> StripAnalysis:
+    """
+    Analisa um arquivo mapeado em faixas de linhas.
+
+    `model` é um `SimpleAgroVisionModel`; array, features e rótulo são os
+    mesmos de `preprocess_image` + `classify` sobre a imagem decodificada.
+    """
+    with open_mapped(path, shape) as image:
+        rows = strip_rows_for_budget(image.width, memory_budget, model.TARGET_SIZE[0])
+        img_array, features, label, explanation, status = analyze_strips(
+            image.iter_strips(rows), image.width, image.height, model
+        )
+
+    return StripAnalysis(
+        img_array=img_array,
+        features=features,
+        label=label,
+        explanation=explanation,
+        status=status,
+        strip_rows=rows,
+        streamed_from_file=True,
+    )
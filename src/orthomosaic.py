@@ -0,0 +1,368 @@
+"""
+Modo ortomosaico: mapa de status por tile de mosaicos de drone.
+
+`preprocess_image` reduz a imagem inteira a 256x256, o que apaga um
+ortomosaico de dezenas de milhares de pixels por lado. Aqui o mosaico é
+dividido em tiles (`--tile`, padrão 512 px) e cada tile passa pelas mesmas
+regras do modelo (`extract_color_features` + `classify_features`), gerando
+uma grade de status que vira um mapa PNG.
+
+O mosaico é carregado uma única vez e compartilhado com os processos sem
+cópia nem pickle dos pixels:
+    - arquivos sem compressão e contíguos (.npy, RGB cru, TIFF em strips;
+      ver mmap_ingest.py): cada processo mapeia o próprio arquivo, e o cache
+      de páginas do sistema é o mesmo para todos;
+    - demais formatos (JPEG, PNG, TIFF comprimido): decodificados faixa a
+      faixa (`streaming.iter_rgb_strips`) direto para um bloco de
+      `multiprocessing.shared_memory`, que os processos anexam pelo nome.
+
+As tarefas são faixas de linhas de tiles; só as features de cada tile
+(4 floats) voltam ao processo principal. Como cada processo lê uma região
+disjunta de memória já carregada, a vazão escala com o número de núcleos.
+
+Tiles praticamente pretos (bordas sem dados do mosaico) recebem o status
+"nodata" e ficam transparentes no mapa.
+
+Uso:
+    python src/orthomosaic.py mosaico.tif -o mapa.png [--tile 512] [-w 8] [--json grade.json]
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor
+
+from core import FEATURE_KERNEL, FEATURE_KERNELS, STATUS_COLORS, SimpleAgroVisionModel
+from mmap_ingest import NotMappableError, is_mappable_path, open_mapped
+from streaming import iter_rgb_strips, strip_rows_for_budget
+
+DEFAULT_TILE = 512
+
+# Soma das médias normalizadas de R, G e B abaixo da qual o tile é borda sem dados
+NODATA_LEVEL = 0.03
+NODATA = "nodata"
+
+# Faixas decodificadas para a memória compartilhada, em bytes por faixa
+_LOAD_BUDGET = 64 * 1024 * 1024
+
+
+# ==================== CARGA COMPARTILHADA ====================
+@dataclass
+class MosaicSource:
+    """Como um processo obtém a view (H, W, 3) do mosaico sem copiá-lo."""
+
+    kind: str  # "shm" ou "mmap"
+    name: str  # nome do bloco compartilhado ou caminho do arquivo
+    width: int
+    height: int
+
+
+class SharedMosaic:
+    """
+    Mosaico carregado uma vez, visível para os processos de trabalho.
+
+    Use como gerenciador de contexto: na saída o mapeamento é fechado e o
+    bloco de memória compartilhada (se houver) é liberado.
+    """
+
+    def __init__(self, source: MosaicSource, array: np.ndarray, handle):
+        self.source = source
+        self.array = array
+        self._handle = handle
+
+    @property
+    def width(self) -> int:
+        return self.source.width
+
+    @property
+    def height(self) -> int:
+        return self.source.height
+
+    @classmethod
+    def load(cls, path: str) -> "SharedMosaic":
+        if is_mappable_path(path):
+            try:
+                mapped = open_mapped(path)
+            except NotMappableError:
+                mapped = None
+            if mapped is not None:
+                array = mapped.array
+                if array is not None and mapped.channels in (3, 4):
+                    source = MosaicSource("mmap", path, mapped.width, mapped.height)
+                    return cls(source, array[..., :3], mapped)
+                mapped.close()
+        return cls._decode_to_shared(path)
+
+    @classmethod
+    def _decode_to_shared(cls, path: str) -> "SharedMosaic":
+        with Image.open(path) as image:
+            width, height = image.size
+            shm = shared_memory.SharedMemory(create=True, size=width * height * 3)
+            try:
+                array = np.ndarray((height, width, 3), dtype=np.uint8, buffer=shm.buf)
+                y = 0
+                for strip in iter_rgb_strips(image, strip_rows_for_budget(width, _LOAD_BUDGET)):
+                    array[y:y + strip.shape[0]] = strip
+                    y += strip.shape[0]
+            except BaseException:
+                shm.close()
+                shm.unlink()
+                raise
+        return cls(MosaicSource("shm", shm.name, width, height), array, shm)
+
+    def close(self) -> None:
+        self.array = None
+        if isinstance(self._handle, shared_memory.SharedMemory):
+            self._handle.close()
+            self._handle.unlink()
+        else:
+            self._handle.close()
+
+    def __enter__(self) -> "SharedMosaic":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach(source: MosaicSource):
+    """(view (H, W, 3), objeto a manter vivo) do mosaico em outro processo."""
+    if source.kind == "mmap":
+        mapped = open_mapped(source.name)
+        return mapped.array[..., :3], mapped
+    shm = shared_memory.SharedMemory(name=source.name)
+    return np.ndarray((source.height, source.width, 3), dtype=np.uint8, buffer=shm.buf), shm
+
+
+# ==================== ANÁLISE POR TILE ====================
+@dataclass
+class TileGrid:
+    """Grade de status do mosaico: tile (i, j) cobre linhas i*tile.. e colunas j*tile.."""
+
+    tile_size: int
+    width: int
+    height: int
+    features: np.ndarray  # (linhas, colunas, 4)
+    statuses: List[List[str]]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.features.shape[:2]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for row in self.statuses:
+            for status in row:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def to_dict(self) -> dict:
+        return {
+            "tile_size": self.tile_size,
+            "width": self.width,
+            "height": self.height,
+            "rows": self.shape[0],
+            "cols": self.shape[1],
+            "counts": self.counts(),
+            "statuses": self.statuses,
+            "features": np.round(self.features, 6).tolist(),
+        }
+
+
+def analyze_tile_rows(
+    mosaic: np.ndarray, model, tile_size: int, row_start: int, row_end: int
+) -> Tuple[np.ndarray, List[List[str]]]:
+    """Features e status das linhas de tiles [row_start, row_end)."""
+    height, width = mosaic.shape[:2]
+    cols = -(-width // tile_size)
+    features = np.empty((row_end - row_start, cols, 4), dtype=np.float64)
+    statuses = []
+    for i, row in enumerate(range(row_start, row_end)):
+        band = mosaic[row * tile_size:min(height, (row + 1) * tile_size)]
+        row_statuses = []
+        for col in range(cols):
+            tile = band[:, col * tile_size:min(width, (col + 1) * tile_size)]
+            tile_features = model.extract_color_features(tile)
+            features[i, col] = tile_features
+            if sum(tile_features[:3]) < NODATA_LEVEL:
+                row_statuses.append(NODATA)
+            else:
+                row_statuses.append(model.classify_features(tile_features, tile)[2])
+        statuses.append(row_statuses)
+    return features, statuses
+
+
+# Estado de cada processo de trabalho (definido em `_init_worker`)
+_worker: dict = {}
+
+
+def _init_worker(source: MosaicSource, feature_kernel: str, tile_size: int) -> None:
+    mosaic, handle = attach(source)
+    _worker.update(
+        mosaic=mosaic,
+        handle=handle,
+        model=SimpleAgroVisionModel(feature_kernel=feature_kernel),
+        tile_size=tile_size,
+    )
+
+
+def _run_task(rows: Tuple[int, int]):
+    features, statuses = analyze_tile_rows(_worker["mosaic"], _worker["model"], _worker["tile_size"], *rows)
+    return rows[0], features, statuses
+
+
+def _row_tasks(n_rows: int, rows_per_task: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, n_rows, rows_per_task):
+        yield start, min(n_rows, start + rows_per_task)
+
+
+def analyze_mosaic(
+    mosaic: SharedMosaic,
+    tile_size: int = DEFAULT_TILE,
+    workers: Optional[int] = None,
+    feature_kernel: str = FEATURE_KERNEL,
+    rows_per_task: int = 1,
+) -> TileGrid:
+    """
+    Classifica todos os tiles do mosaico em `workers` processos.
+
+    Com `workers=1` roda no próprio processo, sobre a mesma view.
+    """
+    if tile_size < 1:
+        raise ValueError("tile_size deve ser positivo")
+    workers = max(1, workers or os.cpu_count() or 1)
+    n_rows = -(-mosaic.height // tile_size)
+    n_cols = -(-mosaic.width // tile_size)
+    features = np.empty((n_rows, n_cols, 4), dtype=np.float64)
+    statuses: List[List[str]] = [[] for _ in range(n_rows)]
+
+    def store(start, part_features, part_statuses):
+        features[start:start + len(part_statuses)] = part_features
+        statuses[start:start + len(part_statuses)] = part_statuses
+
+    tasks = _row_tasks(n_rows, rows_per_task)
+    if workers == 1:
+        model = SimpleAgroVisionModel(feature_kernel=feature_kernel)
+        for start, end in tasks:
+            store(start, *analyze_tile_rows(mosaic.array, model, tile_size, start, end))
+    else:
+        with mp.get_context().Pool(
+            workers, initializer=_init_worker, initargs=(mosaic.source, feature_kernel, tile_size)
+        ) as pool:
+            for result in pool.imap_unordered(_run_task, tasks):
+                store(*result)
+
+    return TileGrid(tile_size, mosaic.width, mosaic.height, features, statuses)
+
+
+# ==================== MAPA ====================
+_MAP_COLORS = {status: ImageColor.getrgb(color) + (255,) for status, color in STATUS_COLORS.items()}
+_MAP_COLORS[NODATA] = (0, 0, 0, 0)
+
+
+def render_status_map(
+    grid: TileGrid,
+    cell_px: int = 8,
+    background: Optional[np.ndarray] = None,
+    alpha: int = 110,
+) -> Image.Image:
+    """
+    Mapa RGBA com `cell_px` pixels por tile. Com `background` (o mosaico),
+    as cores são sobrepostas a uma miniatura dele, amostrada sem cópia.
+    """
+    rows, cols = grid.shape
+    cells = Image.new("RGBA", (cols, rows))
+    cells.putdata([_MAP_COLORS.get(status, _MAP_COLORS["warning"]) for row in grid.statuses for status in row])
+    size = (cols * cell_px, rows * cell_px)
+    status_map = cells.resize(size, Image.NEAREST)
+    if background is None:
+        return status_map
+
+    # Cada tile ocupa cell_px pixels do mapa: a miniatura usa essa escala,
+    # inclusive quando o tile é menor que a célula (ampliação) ou o passo
+    # da amostragem não divide o tile
+    scale = cell_px / grid.tile_size
+    thumb_size = (max(1, round(grid.width * scale)), max(1, round(grid.height * scale)))
+    step = max(1, grid.tile_size // cell_px)
+    thumb = Image.fromarray(np.ascontiguousarray(background[::step, ::step])).convert("RGBA")
+    if thumb.size != thumb_size:
+        thumb = thumb.resize(thumb_size, Image.NEAREST)
+    if thumb.size != size:
+        # Tiles parciais da borda: o resto da célula fica transparente
+        canvas = Image.new("RGBA", size)
+        canvas.paste(thumb, (0, 0))
+        thumb = canvas
+    overlay = status_map.copy()
+    overlay.putalpha(status_map.getchannel("A").point(lambda a: alpha if a else 0))
+    return Image.alpha_composite(thumb, overlay)
+
+
+# ==================== CLI ====================
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Classifica um ortomosaico tile a tile e gera o mapa de status."
+    )
+    parser.add_argument("mosaic", help="Ortomosaico (TIFF, JPEG, PNG, .npy ou RGB cru)")
+    parser.add_argument("-o", "--output", default=None, help="Mapa de status em PNG")
+    parser.add_argument("--json", default=None, help="Grade de status e features em JSON")
+    parser.add_argument(
+        "--tile", type=int, default=DEFAULT_TILE,
+        help="Lado do tile em pixels (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None,
+        help="Número de processos (padrão: número de CPUs)",
+    )
+    parser.add_argument(
+        "--feature-kernel", choices=sorted(FEATURE_KERNELS), default=FEATURE_KERNEL,
+        help="Kernel de features de cor (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--cell", type=int, default=8,
+        help="Pixels por tile no mapa (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--overlay", action="store_true",
+        help="Desenha o mapa sobre uma miniatura do mosaico",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    Image.MAX_IMAGE_PIXELS = None  # ortomosaicos passam do limite anti "decompression bomb"
+
+    start = time.perf_counter()
+    with SharedMosaic.load(args.mosaic) as mosaic:
+        loaded = time.perf_counter()
+        grid = analyze_mosaic(mosaic, args.tile, args.workers, args.feature_kernel)
+        analyzed = time.perf_counter()
+        if args.output:
+            render_status_map(grid, args.cell, mosaic.array if args.overlay else None).save(args.output)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(grid.to_dict(), f, ensure_ascii=False)
+
+    rows, cols = grid.shape
+    megapixels = grid.width * grid.height / 1e6
+    summary = ", ".join(f"{status}={n}" for status, n in sorted(grid.counts().items()))
+    print(
+        f"{grid.width}x{grid.height} ({mosaic.source.kind}), {rows}x{cols} tiles de {grid.tile_size} px: "
+        f"carga {loaded - start:.1f}s, análise {analyzed - loaded:.1f}s "
+        f"({megapixels / (analyzed - loaded):.0f} MP/s) ({summary})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
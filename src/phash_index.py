@@ -0,0 +1,242 @@
+"""
+Índice de hash perceptual para reaproveitar diagnósticos de fotos quase iguais.
+
+Passadas de drone geram muitas imagens sobrepostas; o cache de resultados
+(`result_cache.py`) só reconhece bytes idênticos. Aqui cada array 256x256
+pré-processado vira uma assinatura:
+
+    - dHash de 64 bits: miniatura 9x8 em cinza, um bit por par de vizinhos
+      horizontais (o da direita é mais claro?). Resiste a recompressão,
+      pequenos deslocamentos e variação de exposição;
+    - cor média da miniatura: o dHash só vê gradientes de luminância, então a
+      mesma folha amarelada teria o mesmo hash; a cor barra esses casos.
+
+Busca por distância de Hamming com multi-index hashing: o hash é dividido
+em `max_distance + 1` blocos e, pelo princípio da casa dos pombos, qualquer
+hash a até `max_distance` bits coincide exatamente com a consulta em pelo
+menos um bloco. Cada bloco tem uma tabela (valor do bloco -> entradas), e só
+os candidatos dessas tabelas têm a distância calculada.
+
+Cada entrada é guardada por (hash, faixa de cor): fotos com o mesmo dHash e
+cores distantes (a mesma folha, verde e amarelada) convivem no índice, em
+vez de uma substituir a outra.
+
+O índice é limitado (LRU por número de entradas) e pode ser salvo em JSON.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+HASH_BITS = 64
+# Maior distância aceita: com mais blocos que isso, cada bloco do
+# multi-index hashing fica com menos de 4 bits e quase não filtra nada
+MAX_DISTANCE = HASH_BITS // 4 - 1
+
+# Pesos de luminância (ITU-R BT.601)
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+# Cor média (r, g, b) da miniatura, em níveis 0-255
+Color = Tuple[float, float, float]
+# Chave das entradas: (hash, faixa de cor)
+EntryKey = Tuple[int, tuple]
+
+
+def _thumbnail(img_array: np.ndarray, rows: int = 8, cols: int = 9) -> np.ndarray:
+    """Médias por bloco (rows, cols, 3) em float32, com somas inteiras do NumPy."""
+    height, width = img_array.shape[:2]
+    if height % rows == 0:
+        # Caso comum (256 linhas): as linhas de cada bloco são contíguas
+        row_sums = img_array.reshape(rows, height // rows, width, 3).sum(axis=1, dtype=np.uint32)
+        row_counts = np.full(rows, height // rows)
+    else:
+        row_bounds = np.linspace(0, height, rows + 1).astype(np.intp)
+        row_sums = np.add.reduceat(img_array, row_bounds[:-1], axis=0, dtype=np.uint32)
+        row_counts = np.diff(row_bounds)
+    col_bounds = np.linspace(0, width, cols + 1).astype(np.intp)
+    sums = np.add.reduceat(row_sums, col_bounds[:-1], axis=1)
+    counts = row_counts[:, None, None] * np.diff(col_bounds)[None, :, None]
+    return (sums / counts).astype(np.float32)
+
+
+def image_signature(img_array: np.ndarray) -> Tuple[int, Color]:
+    """(dHash de 64 bits, cor média) de um array (H, W, 3) uint8."""
+    thumb = _thumbnail(img_array[..., :3])
+    gray = thumb @ _LUMA
+    bits = (gray[:, 1:] > gray[:, :-1]).ravel()
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    mean = thumb.reshape(-1, 3).mean(axis=0)
+    return value, (float(mean[0]), float(mean[1]), float(mean[2]))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class PHashIndex:
+    """
+    Índice LRU de (hash, cor) -> valor com busca por distância de Hamming.
+
+    Seguro entre threads. `max_distance` (bits) e `color_tolerance` (níveis
+    por canal) definem o que conta como quase igual; `max_entries` limita o
+    tamanho. Com `path`, o índice é carregado na criação e `save` grava ali
+    (também automaticamente a cada `autosave_every` inserções).
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        color_tolerance: float = 3.0,
+        max_entries: int = 10_000,
+        path: Optional[str] = None,
+        autosave_every: int = 32,
+    ):
+        if not 0 <= max_distance <= MAX_DISTANCE:
+            raise ValueError(f"max_distance deve estar entre 0 e {MAX_DISTANCE}, recebido {max_distance}")
+        self.max_distance = max_distance
+        self.color_tolerance = color_tolerance
+        self.max_entries = max_entries
+        self.path = path
+        self.autosave_every = autosave_every
+
+        # Blocos do multi-index hashing: (deslocamento, máscara)
+        n_blocks = max_distance + 1
+        bounds = [HASH_BITS * i // n_blocks for i in range(n_blocks + 1)]
+        self._blocks = [
+            (start, (1 << (end - start)) - 1) for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        self._tables: List[Dict[int, Set[EntryKey]]] = [{} for _ in self._blocks]
+        self._entries: "OrderedDict[EntryKey, Tuple[Color, Any]]" = OrderedDict()  # -> (cor, valor)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ==================== API PÚBLICA ====================
+
+    def lookup(self, value: int, color: Color) -> Optional[Tuple[Any, int]]:
+        """(valor, distância) da entrada mais próxima dentro dos limites, ou None."""
+        with self._lock:
+            best = None
+            for candidate in self._candidates(value):
+                distance = hamming(value, candidate[0])
+                if distance > self.max_distance or (best is not None and distance >= best[1]):
+                    continue
+                stored_color = self._entries[candidate][0]
+                if max(abs(a - b) for a, b in zip(color, stored_color)) <= self.color_tolerance:
+                    best = (candidate, distance)
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[0])
+            return self._entries[best[0]][1], best[1]
+
+    def add(self, value: int, color: Color, payload: Any) -> None:
+        """Insere (ou substitui) a entrada do hash nesta faixa de cor e despeja as menos usadas."""
+        with self._lock:
+            self._insert(value, color, payload)
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.autosave_every
+        if should_save:
+            self.save()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Grava o índice em JSON (escrita atômica), na ordem de uso."""
+        path = path or self.path
+        if not path:
+            raise ValueError("Nenhum caminho para salvar o índice")
+        with self._lock:
+            data = {
+                "version": 1,
+                "entries": [
+                    [f"{value:016x}", list(color), payload]
+                    for (value, _), (color, payload) in self._entries.items()
+                ],
+            }
+            self._unsaved = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "max_distance": self.max_distance,
+            }
+
+    # ==================== MULTI-INDEX HASHING ====================
+
+    def _block_keys(self, value: int) -> List[int]:
+        return [(value >> start) & mask for start, mask in self._blocks]
+
+    def _color_bucket(self, color: Color) -> tuple:
+        """Faixa de cor de largura `color_tolerance` (cor exata com tolerância 0)."""
+        if self.color_tolerance <= 0:
+            return tuple(color)
+        return tuple(int(c // self.color_tolerance) for c in color)
+
+    def _candidates(self, value: int) -> Set[EntryKey]:
+        candidates: Set[EntryKey] = set()
+        for table, key in zip(self._tables, self._block_keys(value)):
+            bucket = table.get(key)
+            if bucket:
+                candidates |= bucket
+        return candidates
+
+    def _insert(self, value: int, color: Color, payload: Any) -> None:
+        entry = (value, self._color_bucket(color))
+        if entry in self._entries:
+            self._entries.move_to_end(entry)
+        else:
+            for table, key in zip(self._tables, self._block_keys(value)):
+                table.setdefault(key, set()).add(entry)
+        self._entries[entry] = (tuple(color), payload)
+
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._unindex(evicted)
+
+    def _unindex(self, entry: EntryKey) -> None:
+        for table, key in zip(self._tables, self._block_keys(entry[0])):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(entry)
+                if not bucket:
+                    del table[key]
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            return  # arquivo corrompido: começa vazio
+        for hex_value, color, payload in entries[-self.max_entries:]:
+            self._insert(int(hex_value, 16), tuple(color), payload)
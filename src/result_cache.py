@@ -0,0 +1,272 @@
+"""
+Cache de resultados endereçado por conteúdo.
+
+A chave é um hash dos bytes enviados, então reenvios do mesmo arquivo
+(ou reexecuções do script Streamlit) reaproveitam o array pré-processado,
+as features e a classificação sem decodificar a imagem novamente.
+
+Duas camadas:
+    - memória: LRU limitado pelo total de bytes dos arrays;
+    - disco (opcional): um `.npz` por entrada, com despejo dos arquivos
+      menos usados quando o diretório passa do limite. Arquivos ilegíveis
+      (truncados, corrompidos) contam como falta e são apagados.
+
+O lock protege só os índices; leitura e escrita dos arquivos acontecem
+fora dele, para que uma sessão lendo do disco não segure as demais.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CachedAnalysis:
+    """Resultado completo de uma análise, pronto para ser reexibido."""
+
+    img_array: np.ndarray
+    features: Tuple[float, float, float, float]
+    label: str
+    explanation: str
+    status: str
+
+    @property
+    def nbytes(self) -> int:
+        # Os textos são pequenos frente ao array (256x256x3 = 196KB)
+        return int(self.img_array.nbytes) + 512
+
+
+def content_key(data: bytes, namespace: str = "") -> str:
+    """
+    Hash do conteúdo enviado (BLAKE2b, 160 bits). Com `namespace` (ex.:
+    `ModelBackend.cache_namespace()`), o mesmo conteúdo ganha outra chave.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if namespace:
+        digest.update(namespace.encode() + b"\0")
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Cache LRU em memória com camada opcional em disco.
+
+    Seguro para uso entre threads (sessões do Streamlit compartilham a
+    mesma instância via `st.cache_resource`).
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, CachedAnalysis]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # chave -> tamanho do arquivo
+        self._disk_bytes = 0
+        self._writing: Set[str] = set()  # chaves com arquivo sendo gravado
+        self._lock = threading.Lock()
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    # ==================== API PÚBLICA ====================
+
+    def get(self, key: str) -> Optional[CachedAnalysis]:
+        """Busca na memória e depois no disco; acerto no disco sobe para a memória."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry
+            on_disk = key in self._disk
+
+        entry = self._read_disk(key) if on_disk else None
+
+        with self._lock:
+            if entry is None:
+                if on_disk:
+                    # Arquivo removido ou ilegível (já apagado por `_read_disk`)
+                    self._disk_bytes -= self._disk.pop(key, 0)
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._put_memory(key, entry)
+            return entry
+
+    def put(self, key: str, entry: CachedAnalysis) -> None:
+        """Armazena a entrada na memória e, se configurado, no disco."""
+        with self._lock:
+            self._put_memory(key, entry)
+            write = bool(self.disk_dir) and key not in self._disk and key not in self._writing
+            if write:
+                self._writing.add(key)
+        if not write:
+            return
+
+        try:
+            size = self._write_disk(key, entry)
+        finally:
+            with self._lock:
+                self._writing.discard(key)
+        if size is None:
+            return
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._disk_bytes += size
+            evicted = self._evict_disk()
+        self._remove_files(evicted)
+
+    def get_or_compute(
+        self, data: bytes, compute: Callable[[bytes], CachedAnalysis]
+    ) -> Tuple[str, CachedAnalysis]:
+        """Retorna (chave, análise), calculando e armazenando em caso de falta."""
+        key = content_key(data)
+        entry = self.get(key)
+        if entry is None:
+            entry = compute(data)
+            self.put(key, entry)
+        return key, entry
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores para dimensionar o cache."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Esvazia a camada em memória (o disco é mantido)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    # ==================== CAMADA EM MEMÓRIA ====================
+
+    def _put_memory(self, key: str, entry: CachedAnalysis) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+
+        if entry.nbytes > self.max_memory_bytes:
+            return
+
+        # Entradas compartilhadas entre sessões não devem ser alteradas
+        entry.img_array.setflags(write=False)
+        self._memory[key] = entry
+        self._memory_bytes += entry.nbytes
+
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    # ==================== CAMADA EM DISCO ====================
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def _scan_disk(self) -> None:
+        """Reconstrói o índice do disco em ordem de uso (mtime)."""
+        entries = []
+        for filename in os.listdir(self.disk_dir):
+            if not filename.endswith(".npz"):
+                continue
+            stat = os.stat(os.path.join(self.disk_dir, filename))
+            entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._remove_files(self._evict_disk())
+
+    def _read_disk(self, key: str) -> Optional[CachedAnalysis]:
+        """Lê a entrada do disco (sem o lock); arquivo ilegível é apagado e vira None."""
+        path = self._path(key)
+        try:
+            # Arquivo aberto aqui: `np.load(path)` vaza o descritor num zip inválido
+            with open(path, "rb") as f, np.load(f) as data:
+                meta = json.loads(str(data["meta"]))
+                entry = CachedAnalysis(
+                    img_array=data["img_array"],
+                    features=tuple(float(f) for f in data["features"]),
+                    label=meta["label"],
+                    explanation=meta["explanation"],
+                    status=meta["status"],
+                )
+            os.utime(path)
+        except FileNotFoundError:
+            # Despejado por outra sessão entre a consulta ao índice e a leitura
+            return None
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Truncado ou corrompido: sem apagar, todo reenvio da imagem falharia de novo
+            self._remove_files([key])
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: CachedAnalysis) -> Optional[int]:
+        """Grava a entrada (sem o lock) e retorna o tamanho do arquivo, ou None se falhar."""
+        meta = json.dumps(
+            {"label": entry.label, "explanation": entry.explanation, "status": entry.status}
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    img_array=entry.img_array,
+                    features=np.asarray(entry.features, dtype=np.float64),
+                    meta=np.array(meta),
+                )
+            os.replace(tmp_path, self._path(key))
+            return os.path.getsize(self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def _evict_disk(self) -> List[str]:
+        """Tira do índice as entradas menos usadas além do limite (com o lock); retorna as chaves."""
+        evicted = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(key)
+        return evicted
+
+    def _remove_files(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
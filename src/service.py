@@ -0,0 +1,649 @@
+"""
+Serviço HTTP de inferência do AgroVision AI (asyncio, só biblioteca padrão).
+
+Expõe o `SimpleAgroVisionModel` para outros sistemas (backend de gestão da
+fazenda, uploads do app móvel) sem passar pela interface Streamlit.
+
+Endpoints:
+    GET  /health           estado do serviço e limites configurados
+    POST /classify         corpo = bytes da imagem (ou multipart com um arquivo)
+    POST /classify/batch   multipart/form-data com vários arquivos
+
+Decodificação e pré-processamento rodam em um pool de threads (Pillow e
+NumPy liberam o GIL nas partes pesadas), então o laço de eventos continua
+aceitando conexões e respondendo /health durante a inferência. A
+classificação de requisições concorrentes é agrupada em lotes
+(`MicroBatcher`) com espera máxima configurável. Corpos acima do limite
+são recusados pelo Content-Length, sem ir para a memória (são descartados
+depois da resposta 413). O diagnóstico sai do backend de modelo escolhido
+(`--backend`, ver backends.py; padrão: regras de cor).
+
+Uso:
+    python src/service.py [--host 127.0.0.1] [--port 8080] [--workers 4] [--backend onnx --int8]
+
+    curl --data-binary @folha.jpg http://127.0.0.1:8080/classify
+    curl -F a=@folha1.jpg -F b=@folha2.jpg http://127.0.0.1:8080/classify/batch
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import Message
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from backends import (
+    BackendError, HeuristicBackend, ModelBackend, add_backend_arguments, backend_options, load_backend,
+)
+from core import STREAMING_MEMORY_BUDGET, STREAMING_MIN_PIXELS, SimpleAgroVisionModel
+from batching import MicroBatcher
+import metrics
+from streaming import preprocess_in_strips
+
+# Limites padrão (sobrescritos por variável de ambiente ou linha de comando)
+MAX_BODY_BYTES = int(float(os.environ.get("AGROVISION_SERVICE_MAX_BODY_MB", "20")) * 1024 * 1024)
+MAX_BATCH_ITEMS = int(os.environ.get("AGROVISION_SERVICE_MAX_BATCH", "32"))
+MAX_PENDING = int(os.environ.get("AGROVISION_SERVICE_MAX_PENDING", "64"))
+
+# Micro-batching da classificação (ver batching.py); tamanho 1 desativa
+BATCH_SIZE = int(os.environ.get("AGROVISION_SERVICE_BATCH_SIZE", "32"))
+BATCH_WAIT_MS = float(os.environ.get("AGROVISION_SERVICE_BATCH_WAIT_MS", "2"))
+
+# Linha de requisição + cabeçalhos
+MAX_HEADER_BYTES = 16 * 1024
+
+# Tempo máximo (s) esperando cabeçalhos (inclui conexões keep-alive ociosas)
+# e o corpo de uma requisição
+HEADER_TIMEOUT = 15.0
+BODY_TIMEOUT = 60.0
+
+# Ao encerrar a conexão após um erro (ex.: 413), o que o cliente ainda
+# estiver enviando é lido e descartado, até LINGER_BYTES ou LINGER_TIMEOUT
+# segundos: fechar o socket com dados não lidos faz o kernel mandar RST e o
+# cliente recebe ConnectionResetError em vez da resposta.
+LINGER_BYTES = 64 * 1024 * 1024
+LINGER_TIMEOUT = 5.0
+
+_STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+_ROUTES = {
+    "/health": "GET",
+    "/classify": "POST",
+    "/classify/batch": "POST",
+}
+
+
+class HTTPError(Exception):
+    """Erro que vira uma resposta JSON `{"error": ...}` com o status dado."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None, close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        self.close = close
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+@dataclass
+class UploadPart:
+    """Um arquivo de um corpo multipart/form-data."""
+
+    name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+    data: bytes
+
+
+# ==================== ANÁLISE ====================
+def preprocess_bytes(
+    model: SimpleAgroVisionModel,
+    data: bytes,
+    streaming_min_pixels: int = STREAMING_MIN_PIXELS,
+    memory_budget: int = STREAMING_MEMORY_BUDGET,
+) -> Tuple[np.ndarray, Dict[str, Any], Dict[str, float]]:
+    """
+    Decodifica e redimensiona os bytes de uma imagem.
+
+    Imagens acima de `streaming_min_pixels` são redimensionadas em faixas,
+    como na interface. Retorna (array 256x256, dimensões/formato, tempos em
+    ms); erros de decodificação sobem como exceção.
+    """
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    info = {"width": image.width, "height": image.height, "format": image.format}
+    image = model.draft_on_decode(image)
+
+    if image.width * image.height > streaming_min_pixels:
+        img_array = preprocess_in_strips(image, memory_budget, model.TARGET_SIZE)
+        timings["strips"] = (time.perf_counter() - t0) * 1000
+    else:
+        if not model.fast_ingest:
+            image.load()
+        timings["decode"] = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        img_array = model.preprocess_image(image)
+        timings["preprocess"] = (time.perf_counter() - t0) * 1000
+
+    return img_array, info, timings
+
+
+def _record(
+    features: Tuple[float, float, float, float],
+    label: str,
+    explanation: str,
+    status: str,
+    info: Dict[str, Any],
+    timings: Dict[str, float],
+) -> Dict[str, Any]:
+    mean_r, mean_g, mean_b, brownish_ratio = features
+    return {
+        "label": label,
+        "status": status,
+        "explanation": explanation,
+        "features": {
+            "mean_r": mean_r,
+            "mean_g": mean_g,
+            "mean_b": mean_b,
+            "brownish_ratio": brownish_ratio,
+        },
+        "image": info,
+        "timings_ms": timings,
+    }
+
+
+def analyze_bytes(
+    model: SimpleAgroVisionModel, data: bytes, backend: Optional[ModelBackend] = None, **options
+) -> Dict[str, Any]:
+    """
+    Decodifica e classifica os bytes de uma imagem, sem agrupamento.
+
+    Retorna rótulo, status, explicação, features, dimensões e tempos por
+    etapa (ms). Sem `backend`, o diagnóstico vem das regras de cor do modelo.
+    """
+    img_array, info, timings = preprocess_bytes(model, data, **options)
+
+    t0 = time.perf_counter()
+    features = model.extract_color_features(img_array)
+    if backend is None:
+        label, explanation, status = model.classify_features(features, img_array)
+    else:
+        label, explanation, status = backend.classify(img_array, features)
+    timings["classify"] = (time.perf_counter() - t0) * 1000
+
+    return _record(features, label, explanation, status, info, timings)
+
+
+# ==================== HTTP ====================
+def _header_param(value: str, param: str) -> Optional[str]:
+    """Parâmetro de um cabeçalho estruturado (ex.: boundary, filename)."""
+    message = Message()
+    message["x"] = value
+    result = message.get_param(param, header="x")
+    return result if isinstance(result, str) else None
+
+
+def parse_multipart(body: bytes, content_type: str) -> List[UploadPart]:
+    """Separa um corpo multipart/form-data em partes (apenas campos com conteúdo)."""
+    boundary = _header_param(content_type, "boundary")
+    if not boundary:
+        raise HTTPError(400, "multipart/form-data sem boundary")
+
+    delimiter = b"\r\n--" + boundary.encode("latin-1")
+    sections = (b"\r\n" + body).split(delimiter)
+    if len(sections) < 2:
+        raise HTTPError(400, "Corpo multipart malformado")
+
+    parts = []
+    # sections[0] é o preâmbulo; a seção que começa com "--" encerra o corpo
+    for section in sections[1:]:
+        if section.startswith(b"--"):
+            break
+        head, sep, data = section.partition(b"\r\n\r\n")
+        if not sep:
+            raise HTTPError(400, "Parte multipart sem cabeçalhos")
+
+        headers = {}
+        for line in head.decode("latin-1").split("\r\n"):
+            key, _, value = line.partition(":")
+            if key.strip():
+                headers[key.strip().lower()] = value.strip()
+
+        disposition = headers.get("content-disposition", "")
+        parts.append(UploadPart(
+            name=_header_param(disposition, "name") or "",
+            filename=_header_param(disposition, "filename"),
+            content_type=headers.get("content-type"),
+            data=data,
+        ))
+    return parts
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body_bytes: int) -> Optional[Request]:
+    """Lê uma requisição; None se o cliente fechou a conexão entre requisições."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+    except asyncio.IncompleteReadError as exc:
+        if exc.partial.strip():
+            raise HTTPError(400, "Cabeçalhos incompletos", close=True)
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "Cabeçalhos grandes demais", close=True)
+    except asyncio.TimeoutError:
+        return None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "Linha de requisição inválida", close=True)
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise HTTPError(400, "Cabeçalho inválido", close=True)
+        headers[key.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+    if "transfer-encoding" in headers:
+        raise HTTPError(411, "Transfer-Encoding não suportado; envie Content-Length", close=True)
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(400, "Content-Length inválido", close=True)
+    if length < 0:
+        raise HTTPError(400, "Content-Length inválido", close=True)
+    if length > max_body_bytes:
+        # O corpo não é guardado: é descartado após a resposta (`_discard_unread`)
+        raise HTTPError(413, f"Corpo maior que o limite de {max_body_bytes} bytes", close=True)
+
+    body = b""
+    if length:
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), BODY_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPError(408, "Tempo esgotado lendo o corpo", close=True)
+
+    return Request(
+        method=method.upper(),
+        path=target.split("?", 1)[0],
+        headers=headers,
+        body=body,
+        keep_alive=keep_alive,
+    )
+
+
+async def _discard_unread(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Fecha o lado de escrita (a resposta já foi enviada) e descarta o que o
+    cliente ainda enviar, dentro de LINGER_BYTES e LINGER_TIMEOUT.
+    """
+    if writer.can_write_eof():
+        writer.write_eof()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LINGER_TIMEOUT
+    remaining = LINGER_BYTES
+    try:
+        while remaining > 0:
+            chunk = await asyncio.wait_for(reader.read(min(remaining, 1 << 16)), max(0.0, deadline - loop.time()))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+
+def _encode_response(
+    status: int, payload: Dict[str, Any], keep_alive: bool, headers: Optional[Dict[str, str]] = None
+) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{key}: {value}" for key, value in (headers or {}).items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+# ==================== SERVIÇO ====================
+class AgroVisionService:
+    """
+    Servidor HTTP assíncrono em volta de um `SimpleAgroVisionModel`.
+
+    Pode ser embutido em outro laço de eventos (`start`/`close`) ou rodado
+    pela linha de comando (`main`). Com `port=0` o sistema escolhe uma porta
+    livre, útil para testes locais.
+    """
+
+    def __init__(
+        self,
+        model: Optional[SimpleAgroVisionModel] = None,
+        workers: Optional[int] = None,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        max_batch_items: int = MAX_BATCH_ITEMS,
+        max_pending: int = MAX_PENDING,
+        batch_size: int = BATCH_SIZE,
+        batch_wait_ms: float = BATCH_WAIT_MS,
+        backend: Optional[ModelBackend] = None,
+    ):
+        self.model = model or SimpleAgroVisionModel()
+        self.backend = backend or HeuristicBackend(self.model)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_items = max_batch_items
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agrovision")
+        self.batcher = (
+            MicroBatcher(self.model, max_batch_size=batch_size, max_wait_ms=batch_wait_ms, backend=self.backend)
+            if batch_size > 1
+            else None
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._started_at = time.monotonic()
+        self._pending = 0
+        self._counts: Dict[str, int] = {}
+
+    # ==================== CICLO DE VIDA ====================
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(
+            self._handle_connection, host, port, limit=MAX_HEADER_BYTES
+        )
+        self._started_at = time.monotonic()
+        return self._server
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.batcher is not None:
+            await self.batcher.close()
+        self._executor.shutdown(wait=True)
+
+    # ==================== CONEXÕES ====================
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                headers: Dict[str, str] = {}
+                try:
+                    request = await _read_request(reader, self.max_body_bytes)
+                    if request is None:
+                        break
+                    keep_alive = request.keep_alive
+                    status, payload = await self._dispatch(request)
+                except HTTPError as exc:
+                    keep_alive = not exc.close
+                    status, payload, headers = exc.status, {"error": exc.message}, exc.headers
+                except Exception as exc:  # resposta 500 em vez de derrubar a conexão
+                    keep_alive = False
+                    status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+                self._counts[str(status)] = self._counts.get(str(status), 0) + 1
+                writer.write(_encode_response(status, payload, keep_alive, headers))
+                await writer.drain()
+                if not keep_alive:
+                    if status >= 400:
+                        await _discard_unread(reader, writer)
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, request: Request) -> Tuple[int, Dict[str, Any]]:
+        allowed = _ROUTES.get(request.path)
+        if allowed is None:
+            raise HTTPError(404, f"Rota desconhecida: {request.path}")
+        if request.method != allowed:
+            raise HTTPError(405, f"Use {allowed} em {request.path}", headers={"Allow": allowed})
+
+        if request.path == "/health":
+            return 200, self.health()
+        if request.path == "/classify":
+            return 200, await self._classify_single(request)
+        return 200, await self._classify_batch(request)
+
+    # ==================== ENDPOINTS ====================
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime_s": round(time.monotonic() - self._started_at, 3),
+            "workers": self.workers,
+            "model": self.backend.describe(),
+            "pending": self._pending,
+            "responses": dict(self._counts),
+            "limits": {
+                "max_body_bytes": self.max_body_bytes,
+                "max_batch_items": self.max_batch_items,
+                "max_pending": self.max_pending,
+            },
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+        }
+
+    async def _classify_single(self, request: Request) -> Dict[str, Any]:
+        content_type = request.headers.get("content-type", "")
+        if content_type.lower().startswith("multipart/form-data"):
+            parts = [p for p in parse_multipart(request.body, content_type) if p.data]
+            if len(parts) != 1:
+                raise HTTPError(400, "Envie exatamente um arquivo (use /classify/batch para vários)")
+            data = parts[0].data
+        else:
+            data = request.body
+
+        if not data:
+            raise HTTPError(400, "Corpo vazio: envie os bytes da imagem")
+
+        self._reserve(1)
+        try:
+            return await self.classify(data)
+        except HTTPError:
+            raise
+        except Exception as exc:
+            raise HTTPError(*_analysis_error(exc))
+        finally:
+            self._pending -= 1
+
+    async def _classify_batch(self, request: Request) -> Dict[str, Any]:
+        content_type = request.headers.get("content-type", "")
+        if not content_type.lower().startswith("multipart/form-data"):
+            raise HTTPError(400, "Use multipart/form-data com um campo por imagem")
+
+        parts = [p for p in parse_multipart(request.body, content_type) if p.data]
+        if not parts:
+            raise HTTPError(400, "Nenhum arquivo no corpo")
+        if len(parts) > self.max_batch_items:
+            raise HTTPError(413, f"Máximo de {self.max_batch_items} imagens por lote")
+
+        self._reserve(len(parts))
+        try:
+            outcomes = await asyncio.gather(
+                *(self.classify(part.data) for part in parts), return_exceptions=True
+            )
+        finally:
+            self._pending -= len(parts)
+
+        results = []
+        counts: Dict[str, int] = {}
+        for part, outcome in zip(parts, outcomes):
+            if isinstance(outcome, BaseException):
+                record = {"status": "error", "error": _analysis_error(outcome)[1]}
+            else:
+                record = outcome
+            results.append({"name": part.name, "filename": part.filename, **record})
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        return {"results": results, "counts": counts}
+
+    # ==================== INFERÊNCIA ====================
+
+    def _reserve(self, n: int) -> None:
+        """Contrapressão: recusa trabalho além de `max_pending` imagens em voo."""
+        if self._pending + n > self.max_pending:
+            raise HTTPError(503, "Serviço ocupado, tente novamente", headers={"Retry-After": "1"})
+        self._pending += n
+
+    async def classify(self, data: bytes) -> Dict[str, Any]:
+        """
+        Analisa os bytes de uma imagem: decodificação no pool de threads e
+        classificação no lote corrente do `MicroBatcher` (se ativo).
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+
+        if self.batcher is None:
+            record = await loop.run_in_executor(self._executor, self._analyze, data, submitted)
+        else:
+            img_array, info, timings = await loop.run_in_executor(
+                self._executor, self._preprocess, data, submitted
+            )
+            t0 = time.perf_counter()
+            features, label, explanation, status = await self.batcher.submit(img_array)
+            timings["classify"] = (time.perf_counter() - t0) * 1000
+            record = _record(features, label, explanation, status, info, timings)
+
+        record["timings_ms"]["total"] = (time.perf_counter() - submitted) * 1000
+        return record
+
+    def _preprocess(self, data: bytes, submitted: float) -> Tuple[np.ndarray, Dict[str, Any], Dict[str, float]]:
+        queued = (time.perf_counter() - submitted) * 1000
+        img_array, info, timings = preprocess_bytes(self.model, data)
+        return img_array, info, {"queue": queued, **timings}
+
+    def _analyze(self, data: bytes, submitted: float) -> Dict[str, Any]:
+        queued = (time.perf_counter() - submitted) * 1000
+        record = analyze_bytes(self.model, data, self.backend)
+        record["timings_ms"] = {"queue": queued, **record["timings_ms"]}
+        return record
+
+
+def _analysis_error(exc: BaseException) -> Tuple[int, str]:
+    """Status HTTP e mensagem para uma falha de análise."""
+    if isinstance(exc, Image.DecompressionBombError):
+        return 413, f"Imagem grande demais: {exc}"
+    if isinstance(exc, UnidentifiedImageError):
+        return 422, "Imagem inválida: formato não reconhecido"
+    if isinstance(exc, (OSError, ValueError, SyntaxError)):
+        return 422, f"Imagem inválida: {type(exc).__name__}: {exc}"
+    return 500, f"{type(exc).__name__}: {exc}"
+
+
+# ==================== LINHA DE COMANDO ====================
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serviço HTTP de inferência do AgroVision AI.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço (padrão: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="Porta (padrão: %(default)s)")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None,
+        help="Threads de inferência (padrão: número de CPUs)",
+    )
+    parser.add_argument(
+        "--max-body-mb", type=float, default=MAX_BODY_BYTES / (1024 * 1024),
+        help="Tamanho máximo do corpo da requisição (padrão: %(default)s MB)",
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=MAX_BATCH_ITEMS,
+        help="Imagens por requisição em /classify/batch (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-pending", type=int, default=MAX_PENDING,
+        help="Imagens em processamento antes de responder 503 (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE,
+        help="Tamanho máximo do lote de classificação; 1 desativa (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--batch-wait-ms", type=float, default=BATCH_WAIT_MS,
+        help="Espera máxima para completar um lote (padrão: %(default)s ms)",
+    )
+    add_backend_arguments(parser)
+    return parser
+
+
+async def serve(args: argparse.Namespace) -> None:
+    model = SimpleAgroVisionModel()
+    service = AgroVisionService(
+        model=model,
+        backend=load_backend(args.backend, model, **backend_options(args)),
+        workers=args.workers,
+        max_body_bytes=int(args.max_body_mb * 1024 * 1024),
+        max_batch_items=args.max_batch,
+        max_pending=args.max_pending,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+    )
+    server = await service.start(args.host, args.port)
+    print(f"AgroVision AI em http://{args.host}:{service.port}", file=sys.stderr)
+    if metrics.REGISTRY.enabled:
+        exporter = metrics.start_exporter()
+        host, port = exporter.server_address[:2]
+        print(f"Métricas Prometheus em http://{host}:{port}/metrics", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    except BackendError as exc:
+        print(f"Erro: {exc}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
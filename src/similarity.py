@@ -0,0 +1,285 @@
+"""
+Busca de casos semelhantes por vetores de features de cor.
+
+Cada análise vira um vetor float32: as quatro features de
+`extract_color_features` (médias de R, G, B e proporção amarronzada),
+opcionalmente seguidas de histogramas de cor por canal (`color_histogram`,
+agrupados de um `histogram_features.ColorHistogram`).
+Os vetores ficam em matrizes contíguas (n, d) float32, 16 bytes por análise
+no caso básico, e a distância é a euclidiana.
+
+    - `BruteForceIndex`: busca exata; as distâncias a todos os vetores saem
+      de um produto matriz-vetor (BLAS), com as normas pré-calculadas:
+      |x - q|² = |x|² - 2 x·q + |q|²;
+    - `IVFIndex`: índice particionado (k-means em `nlist` centróides e uma
+      lista invertida contígua por centróide); a consulta só varre as
+      `nprobe` listas mais próximas, resultado aproximado;
+    - `SimilarityIndex`: começa exato e passa a IVF ao atingir
+      `IVF_MIN_SIZE` vetores; sincroniza com o histórico (history.py) pelo
+      id dos registros.
+
+Benchmark (latência, recall do IVF, memória): `python benchmarks/bench_similarity.py`.
+"""
+
+import math
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from histogram_features import ColorHistogram
+
+# A partir deste tamanho o índice exato dá lugar ao IVF
+IVF_MIN_SIZE = 250_000
+# Listas visitadas por consulta no IVF (mais listas: recall maior, consulta mais lenta)
+DEFAULT_NPROBE = 16
+# Vetores por bloco ao atribuir a centróides (limita a matriz de distâncias)
+_ASSIGN_CHUNK = 4096
+
+
+def color_histogram(img_array: np.ndarray, bins: int = 8) -> np.ndarray:
+    """Histogramas de R, G e B (`bins` faixas cada), normalizados para somar 1 por canal."""
+    histogram = ColorHistogram.from_array(img_array)
+    return (histogram.binned(bins) / histogram.pixels).ravel().astype(np.float32)
+
+
+def feature_vector(features: Sequence[float], histogram: Optional[np.ndarray] = None) -> np.ndarray:
+    """Vetor do índice: features de cor, seguidas do histograma se informado."""
+    vector = np.asarray(features, dtype=np.float32)
+    if histogram is not None:
+        vector = np.concatenate([vector, np.asarray(histogram, dtype=np.float32)])
+    return vector
+
+
+def _as_matrix(vectors, dim: int) -> np.ndarray:
+    matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+    if matrix.ndim != 2 or matrix.shape[1] != dim:
+        raise ValueError(f"Esperados vetores de dimensão {dim}, recebido {matrix.shape}")
+    return matrix
+
+
+def _squared_distances(queries: np.ndarray, vectors: np.ndarray, norms: np.ndarray) -> np.ndarray:
+    """(q, n) distâncias ao quadrado; o termo cruzado é um único produto de matrizes."""
+    d2 = queries @ vectors.T
+    d2 *= -2
+    d2 += norms
+    d2 += np.einsum("ij,ij->i", queries, queries)[:, None]
+    return d2
+
+
+def _top_k(d2: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(distâncias, ids) dos `k` menores valores de cada linha, em ordem crescente."""
+    k = min(k, d2.shape[1])
+    if k < d2.shape[1]:
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    else:
+        nearest = np.broadcast_to(np.arange(d2.shape[1]), d2.shape)
+    nearest_d2 = np.take_along_axis(d2, nearest, axis=1)
+    order = np.argsort(nearest_d2, axis=1, kind="stable")
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    distances = np.sqrt(np.maximum(np.take_along_axis(nearest_d2, order, axis=1), 0))
+    return distances, ids[nearest]
+
+
+class BruteForceIndex:
+    """Vetores (n, d) float32 em uma matriz que cresce por duplicação; busca exata."""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        self._vectors = np.empty((capacity, dim), dtype=np.float32)
+        self._norms = np.empty(capacity, dtype=np.float32)
+        self._ids = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self.size]
+
+    @property
+    def norms(self) -> np.ndarray:
+        return self._norms[:self.size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._vectors.nbytes + self._norms.nbytes + self._ids.nbytes
+
+    def add(self, ids, vectors) -> None:
+        vectors = _as_matrix(vectors, self.dim)
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        if len(ids) != len(vectors):
+            raise ValueError(f"{len(ids)} ids para {len(vectors)} vetores")
+        end = self.size + len(vectors)
+        if end > len(self._vectors):
+            self._grow(end)
+        self._vectors[self.size:end] = vectors
+        self._norms[self.size:end] = np.einsum("ij,ij->i", vectors, vectors)
+        self._ids[self.size:end] = ids
+        self.size = end
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(needed, 2 * len(self._vectors))
+        for name in ("_vectors", "_norms", "_ids"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(distâncias (q, k), ids (q, k)) dos vizinhos mais próximos de cada consulta."""
+        queries = _as_matrix(queries, self.dim)
+        if self.size == 0 or k < 1:
+            return np.empty((len(queries), 0), np.float32), np.empty((len(queries), 0), np.int64)
+        return _top_k(_squared_distances(queries, self.vectors, self.norms), self.ids, k)
+
+
+class IVFIndex:
+    """
+    Índice particionado: cada vetor vai para a lista do centróide mais
+    próximo; a consulta varre só as `nprobe` listas mais próximas.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = DEFAULT_NPROBE):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.dim = self.centroids.shape[1]
+        self.nprobe = max(1, min(nprobe, len(self.centroids)))
+        self._centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self._lists = [BruteForceIndex(self.dim, capacity=16) for _ in range(len(self.centroids))]
+
+    @classmethod
+    def train(
+        cls, sample: np.ndarray, nlist: int, nprobe: int = DEFAULT_NPROBE, iterations: int = 12, seed: int = 0
+    ) -> "IVFIndex":
+        """k-means (Lloyd) sobre uma amostra dos vetores."""
+        sample = _as_matrix(sample, np.asarray(sample).shape[-1])
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = cls(centroids)._assign(sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            sums = np.stack(
+                [np.bincount(assignment, weights=sample[:, j], minlength=nlist) for j in range(sample.shape[1])],
+                axis=1,
+            )
+            empty = counts == 0
+            centroids[~empty] = (sums[~empty] / counts[~empty, None]).astype(np.float32)
+            # Centróides sem vetores recomeçam em pontos aleatórios da amostra
+            centroids[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        return cls(centroids, nprobe)
+
+    def __len__(self) -> int:
+        return sum(len(lst) for lst in self._lists)
+
+    @property
+    def nbytes(self) -> int:
+        return self.centroids.nbytes + sum(lst.nbytes for lst in self._lists)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _ASSIGN_CHUNK):
+            chunk = vectors[start:start + _ASSIGN_CHUNK]
+            d2 = _squared_distances(chunk, self.centroids, self._centroid_norms)
+            assignment[start:start + len(chunk)] = np.argmin(d2, axis=1)
+        return assignment
+
+    def add(self, ids, vectors) -> None:
+        vectors = _as_matrix(vectors, self.dim)
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        assignment = self._assign(vectors)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+        for list_no in np.flatnonzero(np.diff(bounds)):
+            members = order[bounds[list_no]:bounds[list_no + 1]]
+            self._lists[list_no].add(ids[members], vectors[members])
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = _as_matrix(queries, self.dim)
+        centroid_d2 = _squared_distances(queries, self.centroids, self._centroid_norms)
+        probes = np.argpartition(centroid_d2, self.nprobe - 1, axis=1)[:, :self.nprobe]
+
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, query in enumerate(queries):
+            lists = [self._lists[list_no] for list_no in probes[row] if len(self._lists[list_no])]
+            if not lists:
+                continue
+            vectors = np.concatenate([lst.vectors for lst in lists])
+            norms = np.concatenate([lst.norms for lst in lists])
+            list_ids = np.concatenate([lst.ids for lst in lists])
+            found_d, found_ids = _top_k(_squared_distances(query[None], vectors, norms), list_ids, k)
+            distances[row, :found_d.shape[1]] = found_d[0]
+            ids[row, :found_ids.shape[1]] = found_ids[0]
+        return distances, ids
+
+
+class SimilarityIndex:
+    """
+    Top-k de casos semelhantes, seguro entre threads.
+
+    Exato (`BruteForceIndex`) até `ivf_min_size` vetores; ao atingi-lo, o
+    índice é reconstruído como IVF com ~4·√n listas, treinadas numa amostra.
+    """
+
+    def __init__(self, dim: int = 4, ivf_min_size: int = IVF_MIN_SIZE, nprobe: int = DEFAULT_NPROBE):
+        self.dim = dim
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._index = BruteForceIndex(dim)
+        self._lock = threading.RLock()
+        # Maior id do histórico já indexado (ver `sync_history`)
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def kind(self) -> str:
+        return "IVF" if isinstance(self._index, IVFIndex) else "exato"
+
+    @property
+    def nbytes(self) -> int:
+        return self._index.nbytes
+
+    def add(self, ids, vectors) -> None:
+        with self._lock:
+            self._index.add(ids, vectors)
+            if isinstance(self._index, BruteForceIndex) and len(self._index) >= self.ivf_min_size:
+                self._index = self._build_ivf(self._index)
+
+    def _build_ivf(self, exact: BruteForceIndex) -> IVFIndex:
+        n = len(exact)
+        nlist = max(16, int(4 * math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = exact.vectors[rng.choice(n, min(n, 64 * nlist), replace=False)]
+        ivf = IVFIndex.train(sample, nlist, self.nprobe)
+        ivf.add(exact.ids, exact.vectors)
+        return ivf
+
+    def search(self, vector, k: int = 5) -> List[Tuple[int, float]]:
+        """[(id, distância)] dos `k` vetores mais próximos, do mais parecido ao menos."""
+        with self._lock:
+            distances, ids = self._index.search(vector, k)
+        return [(int(i), float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+
+    def sync_history(self, store, chunk: int = 100_000) -> int:
+        """
+        Indexa as features dos registros do histórico com id > `last_id`
+        (carga inicial e, depois, só o que foi gravado desde a última
+        chamada). Retorna quantos vetores entraram.
+        """
+        added = 0
+        with self._lock:
+            while True:
+                ids, features = store.feature_rows(after_id=self.last_id, limit=chunk)
+                if len(ids) == 0:
+                    return added
+                self.add(ids, features)
+                self.last_id = int(ids[-1])
+                added += len(ids)
@@ -0,0 +1,401 @@
+"""
+Análise em faixas de linhas com memória limitada.
+
+O caminho padrão (`preprocess_image`) materializa a imagem RGB inteira e só
+então reduz para 256x256. Aqui a imagem é lida em faixas de linhas; cada
+faixa passa pela reamostragem bicúbica e os blocos de saída são somados a
+um histograma de cor (`histogram_features.ColorHistogram`), de onde saem as
+features no fim. Em formatos lidos faixa a
+faixa do arquivo, o pico de memória fica limitado pelo orçamento
+configurado, qualquer que seja o tamanho da entrada.
+
+A reamostragem reproduz bit a bit o `Image.resize` bicúbico do Pillow
+(coeficientes em ponto fixo de 22 bits, passada horizontal e depois
+vertical; vertical primeiro quando a altura passa de 100x a largura, como
+faz o Pillow 12), então o array final é idêntico ao de `preprocess_image`
+e a classificação também.
+
+Formatos com linhas endereçáveis no arquivo (TIFF sem compressão, BMP, PPM)
+são lidos faixa a faixa direto do disco. Formatos de fluxo único (JPEG,
+PNG) não podem ser decodificados parcialmente pelo Pillow: são decodificados
+uma vez e processados em faixas a partir daí, o que evita a cópia RGB
+completa e os temporários do resize, mas não a imagem decodificada.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from histogram_features import ColorHistogram
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+
+# Precisão do ponto fixo do Pillow para imagens de 8 bits (Resample.c)
+_PRECISION_BITS = 32 - 8 - 2
+
+# Bits por pixel dos rawmodes lidos direto do arquivo
+_RAWMODE_BITS = {
+    "L": 8,
+    "RGB": 24,
+    "BGR": 24,
+    "RGBX": 32,
+    "RGBA": 32,
+    "BGRX": 32,
+    "BGRA": 32,
+    "XBGR": 32,
+    "ABGR": 32,
+    "CMYK": 32,
+}
+
+_RAW_MODES = ("L", "RGB", "RGBA", "CMYK")
+
+# O Pillow faz a passada vertical antes da horizontal quando a altura de
+# entrada passa desta razão sobre a largura (imagens muito estreitas)
+_VERTICAL_FIRST_RATIO = 100
+
+# Saídas por bloco denso na passada horizontal (equilíbrio entre o
+# desperdício de pesos nulos e a eficiência do BLAS)
+_CHUNK = 8
+
+
+# ==================== REAMOSTRAGEM BICÚBICA (IDÊNTICA AO PILLOW) ====================
+def _bicubic_filter(x: np.ndarray) -> np.ndarray:
+    a = -0.5
+    x = np.abs(x)
+    near = ((a + 2.0) * x - (a + 3.0)) * x * x + 1
+    far = (((x - 5) * x + 8) * x - 4) * a
+    return np.where(x < 1.0, near, np.where(x < 2.0, far, 0.0))
+
+
+def resample_coefficients(in_size: int, out_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Coeficientes inteiros do filtro bicúbico do Pillow para um eixo.
+
+    Retorna (início da janela, tamanho da janela, pesos) por posição de
+    saída; os pesos são inteiros com `_PRECISION_BITS` bits de fração.
+    """
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = 2.0 * filterscale
+    ksize = int(math.ceil(support)) * 2 + 1
+
+    center = (np.arange(out_size) + 0.5) * scale
+    start = np.maximum((center - support + 0.5).astype(np.int64), 0)
+    stop = np.minimum((center + support + 0.5).astype(np.int64), in_size)
+    count = stop - start
+
+    taps = np.arange(ksize)
+    valid = taps[None, :] < count[:, None]
+    weights = _bicubic_filter((taps[None, :] + start[:, None] - center[:, None] + 0.5) / filterscale)
+    weights = np.where(valid, weights, 0.0)
+
+    # Soma sequencial, como no laço em C (a ordem afeta o arredondamento)
+    total = np.cumsum(weights, axis=1)[:, -1]
+    weights = np.divide(weights, total[:, None], out=weights, where=total[:, None] != 0.0)
+
+    scaled = weights * (1 << _PRECISION_BITS)
+    fixed = np.trunc(np.where(scaled < 0, scaled - 0.5, scaled + 0.5)).astype(np.int64)
+    return start, count, fixed
+
+
+def _clip8(acc: np.ndarray) -> np.ndarray:
+    return np.clip((acc + (1 << (_PRECISION_BITS - 1))) >> _PRECISION_BITS, 0, 255).astype(np.uint8)
+
+
+class StripResampler:
+    """
+    Redimensionamento bicúbico alimentado por faixas de linhas.
+
+    `push` recebe as próximas linhas da imagem (s, W, 3) uint8 e devolve as
+    linhas de saída que ficaram completas; a memória usada é a da faixa mais
+    um acumulador do tamanho da saída. As contas são feitas em float64 com
+    valores inteiros exatos, para usar BLAS sem perder a igualdade bit a bit.
+    """
+
+    def __init__(self, in_width: int, in_height: int, out_size: Tuple[int, int] = (256, 256)):
+        self.in_width = in_width
+        self.in_height = in_height
+        self.out_width, self.out_height = out_size
+
+        self._resize_x = in_width != self.out_width
+        self._resize_y = in_height != self.out_height
+        # Com a vertical primeiro, o acumulador guarda linhas ainda na largura de entrada
+        self._vertical_first = in_height > _VERTICAL_FIRST_RATIO * in_width
+
+        if self._resize_x:
+            self._x_chunks = self._banded_chunks(in_width, self.out_width)
+
+        if self._resize_y:
+            self._y_start, self._y_count, self._ky = resample_coefficients(in_height, self.out_height)
+            self._y_stop = self._y_start + self._y_count
+            acc_width = in_width if self._vertical_first else self.out_width
+            self._acc = np.zeros((self.out_height, acc_width * 3), dtype=np.float64)
+
+        self._rows_seen = 0
+        self._rows_emitted = 0
+
+    @staticmethod
+    def _banded_chunks(in_size: int, out_size: int) -> List[Tuple[int, int, int, np.ndarray]]:
+        """
+        Quebra a matriz de pesos (banda diagonal) em blocos densos de
+        `_CHUNK` saídas: [(saída inicial, coluna inicial, coluna final, pesos)].
+        """
+        start, count, fixed = resample_coefficients(in_size, out_size)
+        chunks = []
+        for o0 in range(0, out_size, _CHUNK):
+            o1 = min(out_size, o0 + _CHUNK)
+            a = int(start[o0:o1].min())
+            b = int((start[o0:o1] + count[o0:o1]).max())
+            weights = np.zeros((b - a, o1 - o0), dtype=np.float64)
+            for j, o in enumerate(range(o0, o1)):
+                weights[start[o] - a:start[o] - a + count[o], j] = fixed[o, :count[o]]
+            chunks.append((o0, a, b, weights))
+        return chunks
+
+    def _resample_x(self, rows: np.ndarray) -> np.ndarray:
+        if not self._resize_x:
+            return rows
+        if not len(rows):
+            return np.empty((0, self.out_width, 3), dtype=np.uint8)
+        # Planos (s * 3, W); cada bloco de colunas vira float64 só na hora do
+        # matmul. Produtos e somas são inteiros < 2**53, então o BLAS é exato
+        # e igual à aritmética inteira do Pillow.
+        planes = np.ascontiguousarray(rows.transpose(0, 2, 1)).reshape(-1, self.in_width)
+        acc = np.empty((planes.shape[0], self.out_width), dtype=np.float64)
+        for o0, a, b, weights in self._x_chunks:
+            band = planes[:, a:b].astype(np.float64)
+            np.matmul(band, weights, out=acc[:, o0:o0 + weights.shape[1]])
+        out = _clip8(acc.astype(np.int64))
+        return out.reshape(rows.shape[0], 3, self.out_width).transpose(0, 2, 1)
+
+    def push(self, rows: np.ndarray) -> np.ndarray:
+        """Processa as próximas linhas e retorna as linhas de saída concluídas."""
+        r0 = self._rows_seen
+        r1 = r0 + rows.shape[0]
+        if r1 > self.in_height:
+            raise ValueError("Mais linhas do que a altura declarada da imagem")
+        self._rows_seen = r1
+
+        if self._vertical_first:
+            return self._resample_x(self._resample_y(rows, r0, r1))
+        return self._resample_y(self._resample_x(rows), r0, r1)
+
+    def _resample_y(self, resampled: np.ndarray, r0: int, r1: int) -> np.ndarray:
+        """Acumula as linhas [r0, r1) e retorna as linhas de saída concluídas."""
+        if not self._resize_y:
+            self._rows_emitted = r1
+            return resampled
+
+        # Linhas de saída cuja janela vertical intersecta [r0, r1)
+        ys = np.nonzero((self._y_start < r1) & (self._y_stop > r0))[0]
+        if len(ys):
+            offsets = np.arange(r0, r1)[None, :] - self._y_start[ys, None]
+            inside = (offsets >= 0) & (offsets < self._y_count[ys, None])
+            weights = np.where(inside, np.take_along_axis(
+                self._ky[ys], np.clip(offsets, 0, self._ky.shape[1] - 1), axis=1
+            ), 0)
+            self._acc[ys] += weights.astype(np.float64) @ resampled.reshape(r1 - r0, -1)
+
+        # Linhas concluídas: janela inteira já acumulada
+        done = self._rows_emitted
+        while done < self.out_height and self._y_stop[done] <= r1:
+            done += 1
+        finished = _clip8(self._acc[self._rows_emitted:done].astype(np.int64))
+        finished = finished.reshape(done - self._rows_emitted, self._acc.shape[1] // 3, 3)
+        self._rows_emitted = done
+        return finished
+
+    @property
+    def complete(self) -> bool:
+        return self._rows_emitted == self.out_height
+
+
+# ==================== LEITURA EM FAIXAS ====================
+def strip_rows_for_budget(width: int, memory_budget: int, out_width: int = 256) -> int:
+    """
+    Altura da faixa que cabe no orçamento.
+
+    Por pixel de linha: bytes crus (até 4), a faixa decodificada pelo
+    Pillow, sua cópia em array, o reagrupamento de strips, os planos
+    transpostos e folga para a banda float64; por linha de saída, os
+    acumuladores da passada horizontal.
+    """
+    per_row = width * (4 + 3 + 3 + 3 + 3 + 8) + out_width * 3 * 8 * 2
+    return max(1, memory_budget // per_row)
+
+
+def _raw_layout(image: Image.Image) -> Optional[List[Tuple[int, int, int, str, int, int]]]:
+    """
+    Descreve os tiles 'raw' de largura total de uma imagem ainda não carregada:
+    [(y0, y1, offset, rawmode, stride, orientação)]. None se não for legível
+    em faixas direto do arquivo.
+    """
+    tiles = getattr(image, "tile", None)
+    if not tiles or image.mode not in _RAW_MODES or getattr(image, "fp", None) is None:
+        return None
+
+    layout = []
+    for tile in tiles:
+        codec, extents, offset, args = tile[0], tile[1], tile[2], tile[3]
+        if codec != "raw":
+            return None
+        x0, y0, x1, y1 = extents
+        if x0 != 0 or x1 != image.width:
+            return None
+
+        if isinstance(args, tuple):
+            rawmode = args[0]
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+        else:
+            rawmode, stride, orientation = args, 0, 1
+        if rawmode not in _RAWMODE_BITS:
+            return None
+        if not stride:
+            stride = (_RAWMODE_BITS[rawmode] * image.width + 7) // 8
+        layout.append((y0, y1, offset, rawmode, stride, orientation))
+
+    return sorted(layout)
+
+
+def _iter_raw_blocks(image: Image.Image, layout, rows: int) -> Iterator[np.ndarray]:
+    fp = image.fp
+    width = image.width
+    for y0, y1, offset, rawmode, stride, orientation in layout:
+        tile_height = y1 - y0
+        for a in range(0, tile_height, rows):
+            b = min(tile_height, a + rows)
+            # Tiles de baixo para cima (BMP): a linha 0 está no fim do tile
+            first = a if orientation > 0 else tile_height - b
+            fp.seek(offset + first * stride)
+            data = fp.read((b - a) * stride)
+            if len(data) < (b - a) * stride:
+                raise OSError("Arquivo truncado")
+            strip = Image.frombytes(image.mode, (width, b - a), data, "raw", rawmode, stride, orientation)
+            if strip.mode != "RGB":
+                strip = strip.convert("RGB")
+            yield np.asarray(strip)
+
+
+def iter_rgb_strips(image: Image.Image, rows: int) -> Iterator[np.ndarray]:
+    """
+    Gera faixas RGB (s, W, 3) uint8 da imagem, de cima para baixo.
+
+    Lê direto do arquivo quando o formato permite; caso contrário decodifica
+    a imagem uma vez e converte para RGB apenas faixa a faixa.
+    """
+    layout = _raw_layout(image)
+    if layout is not None:
+        pending: List[np.ndarray] = []
+        pending_rows = 0
+        # Reagrupa strips pequenos do arquivo (ex.: TIFF com 8 linhas por strip)
+        for block in _iter_raw_blocks(image, layout, rows):
+            pending.append(block)
+            pending_rows += block.shape[0]
+            if pending_rows >= rows:
+                yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                pending, pending_rows = [], 0
+        if pending:
+            yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+        return
+
+    image.load()
+    width, height = image.size
+    for y0 in range(0, height, rows):
+        strip = image.crop((0, y0, width, min(height, y0 + rows)))
+        if strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        yield np.asarray(strip)
+
+
+# ==================== PIPELINE ====================
+@dataclass
+class StripAnalysis:
+    """Resultado da análise em faixas."""
+
+    img_array: np.ndarray
+    features: Tuple[float, float, float, float]
+    label: str
+    explanation: str
+    status: str
+    strip_rows: int
+    streamed_from_file: bool
+
+
+def resample_strips(
+    strips: Iterable[np.ndarray], width: int, height: int, size: Tuple[int, int]
+) -> Iterator[np.ndarray]:
+    """
+    Passa faixas RGB (s, W, 3) uint8, de cima para baixo, pelo
+    `StripResampler` e gera os blocos de linhas de saída concluídos.
+    """
+    resampler = StripResampler(width, height, size)
+    for strip in strips:
+        finished = resampler.push(strip)
+        if len(finished):
+            yield finished
+    if not resampler.complete:
+        raise ValueError("Imagem terminou antes da altura declarada")
+
+
+def analyze_strips(
+    strips: Iterable[np.ndarray], width: int, height: int, model
+) -> Tuple[np.ndarray, Tuple[float, float, float, float], str, str, str]:
+    """
+    Redimensiona as faixas para `model.TARGET_SIZE` e classifica.
+
+    Retorna (img_array, features, rótulo, explicação, status), iguais aos de
+    `preprocess_image` + `classify` sobre a imagem completa.
+    """
+    # Histogramas somáveis: cada bloco de saída entra no mesmo acumulador
+    histogram = ColorHistogram()
+    blocks = []
+    for block in resample_strips(strips, width, height, model.TARGET_SIZE):
+        histogram.update(block)
+        blocks.append(block)
+
+    img_array = np.concatenate(blocks)
+    features = histogram.features()
+    label, explanation, status = model.classify_features(features, img_array)
+    return img_array, features, label, explanation, status
+
+
+def preprocess_in_strips(
+    image: Image.Image,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    size: Tuple[int, int] = (256, 256),
+) -> np.ndarray:
+    """Equivalente a `preprocess_image` (mesmo array), com memória limitada."""
+    rows = strip_rows_for_budget(image.width, memory_budget, size[0])
+    strips = iter_rgb_strips(image, rows)
+    return np.concatenate(list(resample_strips(strips, image.width, image.height, size)))
+
+
+def analyze_in_strips(
+    image: Image.Image,
+    model,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+) -> StripAnalysis:
+    """
+    Redimensiona e extrai as features em faixas, somando os histogramas dos blocos.
+
+    `model` é um `SimpleAgroVisionModel`; o rótulo é o mesmo de
+    `model.classify(model.preprocess_image(image))`.
+    """
+    streamed = _raw_layout(image) is not None
+    rows = strip_rows_for_budget(image.width, memory_budget, model.TARGET_SIZE[0])
+    img_array, features, label, explanation, status = analyze_strips(
+        iter_rgb_strips(image, rows), image.width, image.height, model
+    )
+    return StripAnalysis(
+        img_array=img_array,
+        features=features,
+        label=label,
+        explanation=explanation,
+        status=status,
+        strip_rows=rows,
+        streamed_from_file=streamed,
+    )
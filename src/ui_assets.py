@@ -0,0 +1,866 @@
+"""
+Camada de assets pré-compilados da interface.
+
+A folha de estilo e os fragmentos HTML estáticos são montados uma única vez
+por processo (`functools.lru_cache`) a partir de `COLORS`, em vez de serem
+refeitos como f-strings a cada reexecução do script Streamlit. Os
+fragmentos que dependem do diagnóstico (resultado e recomendações) ficam em
+cache por status.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Tuple
+
+from core import STATUS_COLORS
+
+# ==================== SISTEMA DE CORES - IDENTIDADE VISUAL ====================
+COLORS = {
+    # Paleta primária - Verde profundo (natureza, confiança, crescimento)
+    "primary_dark": "#065f46",      # Verde escuro para headers
+    "primary": "#10b981",            # Verde vibrante principal
+    "primary_light": "#d1fae5",      # Verde claro para backgrounds
+    
+    # Paleta secundária - Tons neutros sofisticados
+    "neutral_900": "#111827",
+    "neutral_800": "#1f2937",
+    "neutral_700": "#374151",
+    "neutral_600": "#4b5563",
+    "neutral_400": "#9ca3af",
+    "neutral_200": "#e5e7eb",
+    "neutral_100": "#f3f4f6",
+    "neutral_50": "#f9fafb",
+    
+    # Alertas - Semáforo inteligente
+    "success": STATUS_COLORS["healthy"],   # Verde - Saudável
+    "warning": STATUS_COLORS["warning"],   # Âmbar - Alerta
+    "danger": STATUS_COLORS["danger"],     # Vermelho - Crítico
+    
+    # Gradientes funcionais
+    "gradient_primary": "linear-gradient(135deg, #10b981 0%, #059669 100%)",
+    "gradient_secondary": "linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%)",
+}
+
+
+# ==================== DESIGN SYSTEM - CSS AVANÇADO ====================
+def _stylesheet_source() -> str:
+    return f"""
+        <style>
+            /* ==================== RESET E VARIÁVEIS GLOBAIS ==================== */
+            :root {{
+                --primary: {COLORS['primary']};
+                --primary-dark: {COLORS['primary_dark']};
+                --neutral-900: {COLORS['neutral_900']};
+                --success: {COLORS['success']};
+                --warning: {COLORS['warning']};
+                --danger: {COLORS['danger']};
+            }}
+        
+            * {{
+                margin: 0;
+                padding: 0;
+                box-sizing: border-box;
+            }}
+        
+            /* ==================== BODY E CONTAINERS PRINCIPAIS ==================== */
+            .stApp {{
+                background: linear-gradient(180deg, {COLORS['neutral_50']} 0%, {COLORS['neutral_100']} 100%);
+                min-height: 100vh;
+            }}
+        
+            .main {{
+                padding: 0 !important;
+            }}
+        
+            [data-testid="stAppViewContainer"] {{
+                padding-top: 2rem !important;
+                padding-left: 2rem !important;
+                padding-right: 2rem !important;
+            }}
+        
+            /* ==================== TIPOGRAFIA ====================*/
+            h1 {{
+                color: {COLORS['primary_dark']} !important;
+                font-size: 2.5em !important;
+                font-weight: 900 !important;
+                letter-spacing: -0.5px !important;
+                margin: 20px 0 10px 0 !important;
+                text-align: center;
+                line-height: 1.2;
+            }}
+        
+            h2 {{
+                color: {COLORS['primary']} !important;
+                font-size: 2em !important;
+                font-weight: 800 !important;
+                margin: 30px 0 15px 0 !important;
+                letter-spacing: -0.3px;
+            }}
+        
+            h3 {{
+                color: {COLORS['primary_dark']} !important;
+                font-size: 1.5em !important;
+                font-weight: 700 !important;
+                margin: 20px 0 10px 0 !important;
+            }}
+        
+            h4 {{
+                color: {COLORS['neutral_800']} !important;
+                font-size: 1.2em !important;
+                font-weight: 600 !important;
+            }}
+        
+            p {{
+                color: {COLORS['neutral_700']} !important;
+                font-size: 1em !important;
+                line-height: 1.6 !important;
+                letter-spacing: 0.3px;
+            }}
+        
+            /* ==================== SIDEBAR PREMIUM ====================*/
+            [data-testid="stSidebar"] {{
+                background: linear-gradient(180deg, {COLORS['primary_dark']} 0%, {COLORS['primary']} 100%);
+                padding: 30px 20px !important;
+            }}
+        
+            [data-testid="stSidebar"] [data-testid="stVerticalBlock"] {{
+                gap: 1.5rem;
+            }}
+        
+            [data-testid="stSidebar"] h1,
+            [data-testid="stSidebar"] h2,
+            [data-testid="stSidebar"] h3,
+            [data-testid="stSidebar"] p {{
+                color: white !important;
+            }}
+        
+            [data-testid="stSidebar"] h1 {{
+                font-size: 1.8em !important;
+                margin-bottom: 15px !important;
+            }}
+        
+            /* ==================== COMPONENTES DE UPLOAD ====================*/
+            .uploadedFile {{
+                border-radius: 12px !important;
+                border: 2px solid {COLORS['neutral_200']} !important;
+                background: {COLORS['neutral_50']} !important;
+                transition: all 0.3s ease !important;
+            }}
+        
+            .uploadedFile:hover {{
+                border-color: {COLORS['primary']} !important;
+                background: {COLORS['primary_light']} !important;
+            }}
+        
+            /* ==================== BOTÕES PREMIUM ====================*/
+            .stButton > button {{
+                background: linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['primary_dark']} 100%) !important;
+                color: white !important;
+                font-size: 1.05em !important;
+                font-weight: 700 !important;
+                padding: 14px 28px !important;
+                border-radius: 10px !important;
+                border: none !important;
+                box-shadow: 0 8px 16px rgba(16, 185, 129, 0.25) !important;
+                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1) !important;
+                cursor: pointer !important;
+                width: 100% !important;
+                letter-spacing: 0.5px;
+                text-transform: uppercase;
+            }}
+        
+            .stButton > button:hover {{
+                transform: translateY(-2px) !important;
+                box-shadow: 0 12px 24px rgba(16, 185, 129, 0.35) !important;
+            }}
+        
+            .stButton > button:active {{
+                transform: translateY(0) !important;
+            }}
+        
+            /* ==================== CARDS E CONTAINERS ====================*/
+            .stContainer, .card {{
+                background: white !important;
+                border-radius: 14px !important;
+                padding: 24px !important;
+                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08) !important;
+                border: 1px solid {COLORS['neutral_200']} !important;
+                transition: all 0.3s ease !important;
+            }}
+        
+            .stContainer:hover {{
+                box-shadow: 0 8px 20px rgba(0, 0, 0, 0.12) !important;
+                transform: translateY(-2px);
+            }}
+        
+            /* ==================== FEATURE BOXES - GRID ====================*/
+            .feature-card {{
+                background: white;
+                border-radius: 14px;
+                padding: 24px;
+                text-align: center;
+                border: 2px solid {COLORS['neutral_200']};
+                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.06);
+                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+            }}
+        
+            .feature-card:hover {{
+                border-color: {COLORS['primary']};
+                box-shadow: 0 8px 24px rgba(16, 185, 129, 0.15);
+                transform: translateY(-4px);
+            }}
+        
+            .feature-icon {{
+                font-size: 3em;
+                margin-bottom: 12px;
+                display: inline-block;
+                animation: float 3s ease-in-out infinite;
+            }}
+        
+            @keyframes float {{
+                0%, 100% {{ transform: translateY(0px); }}
+                50% {{ transform: translateY(-10px); }}
+            }}
+        
+            .feature-title {{
+                font-size: 1.3em;
+                font-weight: 700;
+                color: {COLORS['neutral_800']};
+                margin-bottom: 8px;
+            }}
+        
+            .feature-desc {{
+                color: {COLORS['neutral_600']};
+                font-size: 0.95em;
+            }}
+        
+            /* ==================== RESULTADO - BOXES COLORIDAS ====================*/
+            .result-container {{
+                border-radius: 14px;
+                padding: 28px;
+                margin: 20px 0;
+                border-left: 5px solid;
+                box-shadow: 0 8px 16px rgba(0, 0, 0, 0.08);
+                animation: slideUp 0.5s ease;
+            }}
+        
+            @keyframes slideUp {{
+                from {{
+                    opacity: 0;
+                    transform: translateY(20px);
+                }}
+                to {{
+                    opacity: 1;
+                    transform: translateY(0);
+                }}
+            }}
+        
+            .result-container.healthy {{
+                background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);
+                border-color: {COLORS['success']};
+            }}
+        
+            .result-container.warning {{
+                background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
+                border-color: {COLORS['warning']};
+            }}
+        
+            .result-container.danger {{
+                background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
+                border-color: {COLORS['danger']};
+            }}
+        
+            .result-icon {{
+                font-size: 3em;
+                margin-bottom: 15px;
+                text-align: center;
+            }}
+        
+            .result-label {{
+                font-size: 1.8em;
+                font-weight: 900;
+                margin-bottom: 12px;
+                letter-spacing: -0.5px;
+            }}
+        
+            .result-container.healthy .result-label {{
+                color: {COLORS['primary_dark']};
+            }}
+        
+            .result-container.warning .result-label {{
+                color: #92400e;
+            }}
+        
+            .result-container.danger .result-label {{
+                color: #7f1d1d;
+            }}
+        
+            .result-text {{
+                font-size: 1.05em;
+                line-height: 1.7;
+                font-weight: 500;
+            }}
+        
+            .result-container.healthy .result-text {{
+                color: {COLORS['primary_dark']};
+            }}
+        
+            .result-container.warning .result-text {{
+                color: #78350f;
+            }}
+        
+            .result-container.danger .result-text {{
+                color: #7f1d1d;
+            }}
+        
+            /* ==================== DIVIDERS ====================*/
+            hr {{
+                border: none;
+                height: 2px;
+                background: linear-gradient(90deg, transparent, {COLORS['primary']}, transparent);
+                margin: 40px 0 !important;
+                opacity: 0.5;
+            }}
+        
+            /* ==================== INFO BOXES ====================*/
+            .stInfo, .info-box {{
+                background: linear-gradient(135deg, {COLORS['primary_light']} 0%, rgba(16, 185, 129, 0.1) 100%) !important;
+                border-left: 5px solid {COLORS['primary']} !important;
+                border-radius: 10px !important;
+                padding: 20px !important;
+                color: {COLORS['primary_dark']} !important;
+            }}
+        
+            .welcome-box {{
+                background: linear-gradient(135deg, {COLORS['primary_light']} 0%, {COLORS['primary_light']} 100%);
+                padding: 40px;
+                border-radius: 16px;
+                text-align: center;
+                border: 3px dashed {COLORS['primary']};
+                transition: all 0.3s ease;
+            }}
+        
+            .welcome-box:hover {{
+                border-color: {COLORS['primary_dark']};
+                box-shadow: 0 8px 24px rgba(16, 185, 129, 0.15);
+            }}
+        
+            /* ==================== EXPANDERS ====================*/
+            [data-testid="stExpander"] {{
+                border: 2px solid {COLORS['primary']} !important;
+                border-radius: 12px !important;
+                background: white !important;
+                overflow: hidden;
+            }}
+        
+            [data-testid="stExpanderButton"] {{
+                background: linear-gradient(90deg, {COLORS['primary_light']} 0%, white 100%) !important;
+                border-radius: 10px 10px 0 0 !important;
+            }}
+        
+            [data-testid="stExpanderButton"]:hover {{
+                background: linear-gradient(90deg, {COLORS['primary']} 0%, rgba(16, 185, 129, 0.1) 100%) !important;
+            }}
+        
+            [data-testid="stExpanderButton"] p {{
+                color: {COLORS['primary_dark']} !important;
+                font-weight: 700 !important;
+                font-size: 1.1em !important;
+                margin: 0 !important;
+            }}
+        
+            /* Garantir legibilidade do conteúdo - MUITO IMPORTANTE */
+            [data-testid="stExpanderContent"] {{
+                background: white !important;
+                padding: 25px !important;
+                border-radius: 0 0 10px 10px !important;
+                color: {COLORS['neutral_800']} !important;
+            }}
+        
+            [data-testid="stExpanderContent"] * {{
+                background: transparent !important;
+            }}
+        
+            [data-testid="stExpanderContent"] p {{
+                color: {COLORS['neutral_800']} !important;
+                font-size: 1em !important;
+                line-height: 1.7 !important;
+            }}
+        
+            [data-testid="stExpanderContent"] h1 {{
+                color: {COLORS['primary_dark']} !important;
+                background: transparent !important;
+            }}
+        
+            [data-testid="stExpanderContent"] h2 {{
+                color: {COLORS['primary']} !important;
+                background: transparent !important;
+                font-size: 1.5em !important;
+            }}
+        
+            [data-testid="stExpanderContent"] h3 {{
+                color: {COLORS['primary_dark']} !important;
+                background: transparent !important;
+            }}
+        
+            [data-testid="stExpanderContent"] ul {{
+                color: {COLORS['neutral_800']} !important;
+            }}
+        
+            [data-testid="stExpanderContent"] li {{
+                color: {COLORS['neutral_800']} !important;
+                margin-bottom: 10px !important;
+                background: transparent !important;
+            }}
+        
+            [data-testid="stExpanderContent"] strong {{
+                color: {COLORS['neutral_900']} !important;
+                font-weight: 700 !important;
+                background: transparent !important;
+            }}
+        
+            [data-testid="stExpanderContent"] div {{
+                background: transparent !important;
+                color: {COLORS['neutral_800']} !important;
+            }}
+        
+            /* ==================== RESPONSIVE DESIGN ====================*/
+            @media (max-width: 768px) {{
+                h1 {{ font-size: 2em !important; }}
+                h2 {{ font-size: 1.6em !important; }}
+                h3 {{ font-size: 1.3em !important; }}
+            
+                [data-testid="stAppViewContainer"] {{
+                    padding-left: 1rem !important;
+                    padding-right: 1rem !important;
+                    padding-top: 1rem !important;
+                }}
+            
+                .feature-card {{
+                    padding: 16px;
+                }}
+            
+                .feature-icon {{
+                    font-size: 2.5em;
+                }}
+            
+                .result-container {{
+                    padding: 20px;
+                }}
+            }}
+        
+            @media (max-width: 480px) {{
+                h1 {{ font-size: 1.6em !important; }}
+                h2 {{ font-size: 1.3em !important; }}
+            
+                .result-icon {{ font-size: 2em; }}
+                .result-label {{ font-size: 1.4em; }}
+            }}
+        
+            /* ==================== ACESSIBILIDADE ====================*/
+            button {{
+                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            }}
+        
+            .stButton > button:focus {{
+                outline: 3px solid {COLORS['primary']};
+                outline-offset: 2px;
+            }}
+        
+            /* ==================== LOADING STATE ====================*/
+            .loading {{
+                animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite;
+            }}
+        
+            @keyframes pulse {{
+                0%, 100% {{ opacity: 1; }}
+                50% {{ opacity: 0.5; }}
+            }}
+
+            /* ==================== HEADER ====================*/
+            @keyframes slideDown {{
+                from {{
+                    opacity: 0;
+                    transform: translateY(-30px);
+                }}
+                to {{
+                    opacity: 1;
+                    transform: translateY(0);
+                }}
+            }}
+        </style>
+    """
+
+
+def _minify_css(css: str) -> str:
+    """Remove comentários e espaços redundantes (reduz o payload por reexecução)."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+@lru_cache(maxsize=None)
+def _compiled_stylesheet() -> Tuple[str, str]:
+    source = _stylesheet_source()
+    body = source[source.index("<style>") + len("<style>"):source.rindex("</style>")]
+    css = _minify_css(body)
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return css, digest
+
+
+def stylesheet_hash() -> str:
+    """Hash do conteúdo da folha de estilo (identifica a versão servida)."""
+    return _compiled_stylesheet()[1]
+
+
+def stylesheet() -> str:
+    """Folha de estilo única, minificada e identificada pelo hash do conteúdo."""
+    css, digest = _compiled_stylesheet()
+    return f"<style id='agrovision-{digest}'>{css}</style>"
+
+
+# ==================== CONTEÚDO ESTÁTICO ====================
+SIDEBAR_STEPS = (
+    ("1️⃣", "Carregar Imagem", "Envie uma foto clara da folha ou planta"),
+    ("2️⃣", "Analisar", "Clique no botão de análise"),
+    ("3️⃣", "Resultado", "Receba diagnóstico instantâneo"),
+)
+
+SIDEBAR_TIPS = (
+    "Use boa iluminação natural",
+    "Foque em uma folha por vez",
+    "Evite sombras na imagem",
+    "Carregue arquivos JPG ou PNG",
+)
+
+FEATURES = (
+    ("⚡", "Análise Rápida", "Resultados em segundos com processamento otimizado"),
+    ("🎯", "Precisão", "Algoritmo inteligente baseado em aprendizado de máquina"),
+    ("🚀", "Inovador", "Tecnologia de ponta em visão computacional"),
+)
+
+RECOMMENDATIONS = {
+    "healthy": (
+        "Mantenha a rega regular conforme necessário",
+        "Forneça luz adequada (6-8 horas diárias)",
+        "Continue com cuidados preventivos",
+        "Faça novas análises mensalmente",
+    ),
+    "warning": (
+        "Aumente a frequência de verificações",
+        "Revise a rega e drenagem do solo",
+        "Inspecione para pragas visíveis",
+        "Considere aumentar a luz ou reduzir umidade",
+    ),
+    "danger": (
+        "Isole a planta de outras imediatamente",
+        "Procure um especialista em plantas",
+        "Considere tratamento com fungicida/inseticida",
+        "Revise completamente as condições ambientais",
+    ),
+}
+
+STATUS_ICONS = {
+    "healthy": "✅",
+    "warning": "⚠️",
+    "danger": "🚨",
+}
+
+
+# ==================== FRAGMENTOS HTML ====================
+@lru_cache(maxsize=None)
+def sidebar_html() -> Tuple[str, str, str, str]:
+    """Blocos da sidebar: logo, "Como Usar", "Dicas" e rodapé."""
+    logo = """
+        <div style='text-align: center; margin-bottom: 30px;'>
+            <h1 style='font-size: 2em; color: white; margin: 0;'>🌱</h1>
+            <h3 style='color: white; margin: 10px 0 5px 0;'>AgroVision AI</h3>
+            <p style='color: rgba(255,255,255,0.8); font-size: 0.9em; margin: 0;'>Diagnóstico Inteligente</p>
+        </div>
+    """
+
+    steps = "".join(
+        f"""
+        <div style='
+            background: rgba(255,255,255,0.1);
+            padding: 12px;
+            border-radius: 8px;
+            margin-bottom: 10px;
+            border-left: 3px solid white;
+        '>
+            <div style='font-size: 1.2em; margin-bottom: 5px;'>{icon} <b style='color:white;'>{step}</b></div>
+            <div style='color: rgba(255,255,255,0.7); font-size: 0.85em;'>{desc}</div>
+        </div>
+        """
+        for icon, step, desc in SIDEBAR_STEPS
+    )
+    how_to_use = (
+        "<h4 style='color: white; margin-bottom: 15px; font-size: 1.1em;'>📋 Como Usar</h4>"
+        + steps
+    )
+
+    tips = "".join(
+        f"""
+        <div style='color: rgba(255,255,255,0.9); margin-bottom: 8px; font-size: 0.9em;'>
+            ✓ {tip}
+        </div>
+        """
+        for tip in SIDEBAR_TIPS
+    )
+    tips = "<h4 style='color: white; margin-bottom: 15px; font-size: 1.1em;'>💡 Dicas</h4>" + tips
+
+    footer = """
+        <div style='text-align: center; color: rgba(255,255,255,0.6); font-size: 0.8em;'>
+            <p style='margin: 5px 0;'>AgroVision AI • POC 2025</p>
+            <p style='margin: 5px 0;'>Powered by Python & Streamlit</p>
+        </div>
+    """
+    return logo, how_to_use, tips, footer
+
+
+@lru_cache(maxsize=None)
+def header_html() -> str:
+    """Header com animação (keyframes na folha de estilo)."""
+    return f"""
+    <div style='text-align: center; margin-bottom: 50px; animation: slideDown 0.6s ease;'>
+        <div style='font-size: 4em; margin-bottom: 20px; animation: float 3s ease-in-out infinite;'>
+            🌿
+        </div>
+        <h1 style='margin: 0 0 15px 0; color: {COLORS["primary_dark"]};'>
+            AgroVision AI
+        </h1>
+        <p style='
+            font-size: 1.4em;
+            color: {COLORS["primary"]};
+            margin: 10px 0 0 0;
+            font-weight: 600;
+            letter-spacing: 0.5px;
+        '>
+            Diagnóstico Inteligente de Saúde de Plantas
+        </p>
+        <p style='
+            color: {COLORS["neutral_600"]};
+            font-size: 1.05em;
+            margin-top: 15px;
+            max-width: 600px;
+            margin-left: auto;
+            margin-right: auto;
+        '>
+            Análise por inteligência artificial em tempo real
+        </p>
+    </div>
+    """
+
+
+@lru_cache(maxsize=None)
+def features_html() -> Tuple[str, Tuple[str, ...]]:
+    """Título da seção de funcionalidades e um card por coluna."""
+    title = f"""
+    <h2 style='text-align: center; margin-bottom: 40px; color: {COLORS["primary"]};'>
+        Por que AgroVision AI?
+    </h2>
+    """
+    cards = tuple(
+        f"""
+        <div class='feature-card'>
+            <div class='feature-icon'>{icon}</div>
+            <div class='feature-title'>{title}</div>
+            <div class='feature-desc'>{desc}</div>
+        </div>
+        """
+        for icon, title, desc in FEATURES
+    )
+    return title, cards
+
+
+@lru_cache(maxsize=None)
+def upload_html() -> Tuple[str, str]:
+    """Título da seção de upload e o card de requisitos da imagem."""
+    title = """
+    <h2 style='text-align: center; margin: 50px 0 30px 0;'>
+        📸 Envie uma Foto
+    </h2>
+    """
+    requirements = f"""
+    <div style='
+        background: white;
+        padding: 30px;
+        border-radius: 14px;
+        border: 2px solid {COLORS["neutral_200"]};
+    '>
+        <h3 style='text-align: center; margin-bottom: 15px;'>
+            Requisitos da Imagem
+        </h3>
+        <ul style='color: {COLORS["neutral_700"]}; line-height: 2;'>
+            <li>✓ Formato: JPG, JPEG ou PNG</li>
+            <li>✓ Iluminação: Natural e clara</li>
+            <li>✓ Foco: Folha ou planta inteira</li>
+            <li>✓ Tamanho: Até 200MB</li>
+        </ul>
+    </div>
+    """
+    return title, requirements
+
+
+@lru_cache(maxsize=None)
+def panel_title_html(title: str, margin_bottom: int = 0) -> str:
+    """Caixa de título dos painéis de resultado ("Imagem Analisada", "Diagnóstico")."""
+    margin = f"margin-bottom: {margin_bottom}px;" if margin_bottom else ""
+    return f"""
+    <div style='
+        background: white;
+        padding: 20px;
+        border-radius: 14px;
+        border: 2px solid {COLORS["neutral_200"]};
+        {margin}
+    '>
+        <h3 style='text-align: center; margin-bottom: 15px;'>{title}</h3>
+    </div>
+    """
+
+
+@lru_cache(maxsize=64)
+def result_html(status: str, label: str, explanation: str) -> str:
+    """Card do diagnóstico; em cache por (status, rótulo, explicação)."""
+    icon = STATUS_ICONS.get(status, STATUS_ICONS["healthy"])
+    return f"""
+    <div class='result-container {status}'>
+        <div class='result-icon'>
+            {icon}
+        </div>
+        <div class='result-label'>{label}</div>
+        <div class='result-text'>{explanation}</div>
+    </div>
+    """
+
+
+@lru_cache(maxsize=None)
+def recommendations_html(status: str) -> Tuple[str, Tuple[str, ...]]:
+    """Título e cards (um por coluna) das recomendações de um status."""
+    title = """
+    <h3 style='margin-top: 40px; margin-bottom: 20px;'>
+        💡 Recomendações
+    </h3>
+    """
+    border_color = STATUS_COLORS.get(status, COLORS["primary"])
+    cards = tuple(
+        f"""
+        <div style='
+            background: white;
+            padding: 15px;
+            border-radius: 10px;
+            border-left: 4px solid {border_color};
+            box-shadow: 0 2px 8px rgba(0,0,0,0.06);
+            height: 100%;
+        '>
+            <div style='
+                font-weight: 700;
+                color: {border_color};
+                font-size: 2em;
+                text-align: center;
+                margin-bottom: 10px;
+            '>
+                {i + 1}
+            </div>
+            <div style='
+                color: {COLORS["neutral_700"]};
+                font-size: 0.95em;
+                text-align: center;
+                line-height: 1.5;
+            '>
+                {rec}
+            </div>
+        </div>
+        """
+        for i, rec in enumerate(RECOMMENDATIONS.get(status, ()))
+    )
+    return title, cards
+
+
+@lru_cache(maxsize=None)
+def model_explainer_html() -> str:
+    """Conteúdo do expander "Como Funciona o Modelo?"."""
+    return f"""
+    <div style='color: {COLORS["neutral_800"]}; line-height: 1.8;'>
+
+    ## Sistema de Análise
+
+    **Metodologia:**
+
+    O AgroVision AI utiliza análise avançada de características de cor em três dimensões:
+
+    1. **Proporção de Verde** - Indica vitalidade e saúde geral
+    2. **Tons Amarelados/Amarronzados** - Detecta sinais de doença ou estresse
+    3. **Distribuição de Cores** - Identifica padrões anormais
+
+    **Categorias de Diagnóstico:**
+
+    - ✅ **Saudável**: Tons verdes predominantes, padrão normal
+    - ⚠️ **Alerta**: Sinais iniciais de problemas
+    - 🚨 **Crítico**: Indicadores de doença avançada
+
+    **Tecnologia:**
+
+    - Pré-processamento de imagem (normalização e redimensionamento)
+    - Extração de features de cor RGB
+    - Algoritmo de classificação heurístico (backend padrão)
+    - Backend plugável: uma CNN exportada em ONNX pode substituir as regras,
+      executada na CPU pelo ONNX Runtime (opcionalmente quantizada em int8)
+
+    </div>
+    """
+
+
+@lru_cache(maxsize=None)
+def completion_html() -> str:
+    """Chamada final exibida após a análise."""
+    return f"""
+    <div style='
+        background: linear-gradient(135deg, {COLORS["primary_light"]} 0%, rgba(16, 185, 129, 0.1) 100%);
+        padding: 30px;
+        border-radius: 14px;
+        text-align: center;
+        border: 2px solid {COLORS["primary"]};
+        margin-top: 40px;
+    '>
+        <h3 style='color: {COLORS["primary_dark"]}; margin-bottom: 10px;'>
+            📌 Análise Concluída!
+        </h3>
+        <p style='color: {COLORS["neutral_700"]}; margin: 0;'>
+            Você pode enviar outra imagem para continuar analisando suas plantas.
+        </p>
+    </div>
+    """
+
+
+@lru_cache(maxsize=None)
+def welcome_html() -> str:
+    """Estado vazio (nenhuma imagem enviada)."""
+    return f"""
+    <div class='welcome-box'>
+        <div style='font-size: 4em; margin-bottom: 20px;'>🌾</div>
+        <h2 style='color: {COLORS["primary_dark"]}; margin-bottom: 15px;'>
+            Pronto para Começar?
+        </h2>
+        <p style='
+            color: {COLORS["primary_dark"]};
+            font-size: 1.1em;
+            margin-bottom: 20px;
+            line-height: 1.6;
+        '>
+            Envie uma foto clara de sua planta para receber um diagnóstico instantâneo
+            e recomendações personalizadas para mantê-la saudável.
+        </p>
+        <div style='
+            background: rgba(16, 185, 129, 0.1);
+            padding: 15px;
+            border-radius: 10px;
+            color: {COLORS["primary_dark"]};
+            font-size: 0.95em;
+        '>
+            💡 <b>Dica:</b> Use uma foto bem iluminada com foco na folha ou planta
+        </div>
+    </div>
+    """
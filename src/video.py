@@ -0,0 +1,429 @@
+"""
+Análise de vídeo e de sequências de quadros do AgroVision AI.
+
+Câmeras montadas no trator geram vídeo ou quadros numerados em intervalos
+fixos. Este módulo lê os quadros por geradores, classifica cada um com o
+`SimpleAgroVisionModel` e devolve rótulos por quadro e o status suavizado
+por trecho.
+
+Fontes (`iter_frames`):
+    - vídeo (.mp4, .mov, .avi, .mkv, ...): `ffmpeg` decodifica e já
+      redimensiona para 256x256 em um processo à parte (rawvideo RGB pelo pipe);
+    - sequência numerada: diretório, padrão glob (`quadros/*.jpg`) ou printf
+      (`quadros/f_%05d.jpg`), em ordem natural;
+    - imagem com vários quadros (GIF/WebP/PNG animados, TIFF multipágina).
+
+Quadros quase iguais ao último quadro classificado reaproveitam o
+resultado: cada quadro vira uma assinatura 32x32 em tons de cinza (em JPEG,
+decodificada pelo libjpeg direto em 1/8 da escala, sem a decodificação
+completa) e, se a diferença absoluta média para a do quadro-chave ficar
+abaixo do limiar, o quadro não é pré-processado nem classificado.
+
+Uso:
+    python src/video.py video.mp4 [-o quadros.jsonl] [--fps 10]
+    python src/video.py "quadros/*.jpg" --fps 30
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from core import FAST_INGEST, FEATURE_KERNEL, FEATURE_KERNELS, SimpleAgroVisionModel
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v", ".mpg", ".mpeg")
+SEQUENCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+
+# Diferença média (níveis de cinza, 0-255) abaixo da qual o quadro repete o anterior
+CHANGE_THRESHOLD = float(os.environ.get("AGROVISION_VIDEO_CHANGE_THRESHOLD", "3.0"))
+
+# Quadros seguidos que podem reaproveitar o mesmo resultado antes de reclassificar
+MAX_REUSE = int(os.environ.get("AGROVISION_VIDEO_MAX_REUSE", "30"))
+
+# Taxa assumida para sequências e vídeos sem taxa conhecida
+DEFAULT_FPS = 30.0
+
+# Lado da assinatura usada na detecção de mudança
+SIGNATURE_SIZE = 32
+
+# Gravidade de cada status (empates na suavização ficam com o mais grave)
+_SEVERITY = {"healthy": 0, "warning": 1, "danger": 2}
+
+
+class VideoSourceError(ValueError):
+    """Fonte de quadros inexistente, vazia ou ilegível."""
+
+
+@dataclass
+class VideoFrame:
+    """Um quadro da fonte; `open` devolve a imagem (decodificação preguiçosa)."""
+
+    index: int
+    timestamp: float
+    open: Callable[[], Image.Image]
+
+
+@dataclass
+class FrameResult:
+    index: int
+    timestamp: float
+    label: Optional[str]
+    status: str
+    features: Optional[Tuple[float, float, float, float]]
+    reused: bool
+    change: Optional[float]
+    error: Optional[str] = None
+
+
+@dataclass
+class Segment:
+    """Trecho contínuo com o mesmo status após a suavização."""
+
+    status: str
+    label: str
+    start_index: int
+    end_index: int
+    start_time: float
+    end_time: float
+    frames: int
+    classified_frames: int
+    mean_brownish_ratio: float
+
+
+# ==================== FONTES DE QUADROS ====================
+def _natural_key(path: str) -> List:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def _sequence_paths(source: str) -> List[str]:
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(SEQUENCE_EXTENSIONS)
+        ]
+    elif "%" in source:
+        paths = []
+        start = 0 if os.path.exists(source % 0) else 1
+        while os.path.exists(source % (start + len(paths))):
+            paths.append(source % (start + len(paths)))
+    else:
+        paths = glob.glob(source)
+    return sorted(paths, key=_natural_key)
+
+
+def iter_sequence_frames(source: str, fps: float = DEFAULT_FPS) -> Iterator[VideoFrame]:
+    """Quadros de um diretório, padrão glob ou padrão printf, a `fps` quadros/s."""
+    paths = _sequence_paths(source)
+    if not paths:
+        raise VideoSourceError(f"Nenhum quadro encontrado em {source!r}")
+    for index, path in enumerate(paths):
+        yield VideoFrame(index, index / fps, lambda path=path: Image.open(path))
+
+
+def iter_multiframe_image(path: str, fps: Optional[float] = None) -> Iterator[VideoFrame]:
+    """Quadros de GIF/WebP/PNG animados ou TIFF multipágina (duração de cada quadro, se houver)."""
+    try:
+        image = Image.open(path)
+    except OSError as exc:
+        raise VideoSourceError(f"Não foi possível abrir {path}: {exc}") from exc
+    with image:
+        timestamp = 0.0
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            copy = frame.convert("RGB")
+            yield VideoFrame(index, timestamp, lambda copy=copy: copy)
+            duration = frame.info.get("duration")
+            timestamp += duration / 1000 if duration and fps is None else 1 / (fps or DEFAULT_FPS)
+
+
+def probe_fps(path: str) -> Optional[float]:
+    """Taxa média de quadros via `ffprobe` (None se indisponível)."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    try:
+        out = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=avg_frame_rate",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            check=True, capture_output=True, text=True, timeout=30,
+        ).stdout.strip()
+        num, _, den = out.partition("/")
+        rate = float(num) / float(den or 1)
+    except (OSError, subprocess.SubprocessError, ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def iter_video_frames(
+    path: str, fps: Optional[float] = None, size: Tuple[int, int] = SimpleAgroVisionModel.TARGET_SIZE
+) -> Iterator[VideoFrame]:
+    """
+    Decodifica um vídeo com `ffmpeg`, já redimensionado para `size`.
+
+    Com `fps`, o ffmpeg reamostra a taxa (descarta quadros antes de enviá-los).
+    O redimensionamento do ffmpeg (bicúbico) pode diferir do Pillow em
+    poucos níveis de cor por pixel.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise VideoSourceError("ffmpeg não encontrado no PATH (necessário para arquivos de vídeo)")
+    if not os.path.isfile(path):
+        raise VideoSourceError(f"Arquivo não encontrado: {path}")
+
+    rate = fps or probe_fps(path) or DEFAULT_FPS
+    width, height = size
+    filters = f"scale={width}:{height}:flags=bicubic" + (f",fps={fps}" if fps else "")
+    frame_bytes = width * height * 3
+
+    proc = subprocess.Popen(
+        [ffmpeg, "-v", "error", "-nostdin", "-i", path, "-vf", filters,
+         "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_bytes * 4,
+    )
+    index = 0
+    finished = False
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            image = Image.frombuffer("RGB", size, data, "raw", "RGB", 0, 1)
+            yield VideoFrame(index, index / rate, lambda image=image: image)
+            index += 1
+        finished = True
+    finally:
+        proc.stdout.close()
+        if not finished:  # consumidor parou antes do fim
+            proc.kill()
+        stderr = proc.stderr.read().decode("utf-8", "replace").strip()
+        proc.stderr.close()
+        proc.wait()
+    if proc.returncode != 0:
+        raise VideoSourceError(f"ffmpeg falhou: {stderr or proc.returncode}")
+
+
+def iter_frames(source: str, fps: Optional[float] = None) -> Iterator[VideoFrame]:
+    """Escolhe a fonte pelo tipo de `source` (vídeo, sequência ou imagem com vários quadros)."""
+    lower = source.lower()
+    if lower.endswith(VIDEO_EXTENSIONS):
+        return iter_video_frames(source, fps)
+    if os.path.isfile(source):
+        return iter_multiframe_image(source, fps)
+    return iter_sequence_frames(source, fps or DEFAULT_FPS)
+
+
+# ==================== DETECÇÃO DE MUDANÇA ====================
+def frame_signature(image: Image.Image) -> np.ndarray:
+    """
+    Miniatura 32x32 em cinza (float32) do quadro.
+
+    Em JPEG ainda não carregado, `draft` faz o libjpeg decodificar só a
+    luminância em 1/8 da escala; nos demais formatos a miniatura sai da
+    imagem inteira por média de blocos.
+    """
+    if image.format == "JPEG":
+        image.draft("L", (SIGNATURE_SIZE * 2, SIGNATURE_SIZE * 2))
+    thumb = image.convert("L").resize((SIGNATURE_SIZE, SIGNATURE_SIZE), Image.BOX)
+    return np.asarray(thumb, dtype=np.float32)
+
+
+def signature_change(a: np.ndarray, b: np.ndarray) -> float:
+    """Diferença absoluta média entre duas assinaturas (0-255)."""
+    return float(np.abs(a - b).mean())
+
+
+# ==================== ANÁLISE ====================
+def analyze_frames(
+    frames: Iterable[VideoFrame],
+    model: SimpleAgroVisionModel,
+    change_threshold: float = CHANGE_THRESHOLD,
+    max_reuse: int = MAX_REUSE,
+) -> Iterator[FrameResult]:
+    """
+    Classifica os quadros em sequência, reaproveitando o resultado dos quase iguais.
+
+    A comparação é sempre com o último quadro efetivamente classificado
+    (quadro-chave), para que mudanças lentas não se acumulem sem
+    reclassificação; `max_reuse` limita os reaproveitamentos seguidos.
+    `change_threshold` <= 0 classifica todos os quadros.
+    """
+    key_signature: Optional[np.ndarray] = None
+    key_result: Optional[FrameResult] = None
+    reused_run = 0
+
+    for frame in frames:
+        try:
+            signature = frame_signature(frame.open()) if change_threshold > 0 else None
+            change = None
+            if signature is not None and key_signature is not None:
+                change = signature_change(signature, key_signature)
+                if change < change_threshold and reused_run < max_reuse:
+                    reused_run += 1
+                    yield FrameResult(
+                        frame.index, frame.timestamp, key_result.label, key_result.status,
+                        key_result.features, True, change,
+                    )
+                    continue
+
+            # A assinatura pode ter reduzido a imagem (draft): reabre para a análise completa
+            img_array = model.preprocess_image(frame.open())
+            features = model.extract_color_features(img_array)
+            label, _, status = model.classify_features(features, img_array)
+        except Exception as exc:  # quadro ilegível não interrompe o vídeo
+            yield FrameResult(
+                frame.index, frame.timestamp, None, "error", None, False, None,
+                f"{type(exc).__name__}: {exc}",
+            )
+            continue
+
+        key_signature, reused_run = signature, 0
+        key_result = FrameResult(
+            frame.index, frame.timestamp, label, status,
+            tuple(float(f) for f in features), False, change,
+        )
+        yield key_result
+
+
+def smooth_segments(results: Iterable[FrameResult], window: int = 5, min_frames: int = 15) -> List[Segment]:
+    """
+    Agrupa os quadros em trechos de status estável.
+
+    1. Voto da maioria em janela deslizante de `window` quadros (empate fica
+       com o status mais grave), eliminando oscilações de um ou dois quadros.
+    2. Trechos com menos de `min_frames` quadros são absorvidos pelo trecho
+       anterior (ou pelo seguinte, se forem o primeiro).
+
+    Quadros com erro não votam.
+    """
+    valid = [r for r in results if r.status != "error"]
+    if not valid:
+        return []
+
+    statuses = [r.status for r in valid]
+    half = max(0, window) // 2
+    smoothed = []
+    for i in range(len(statuses)):
+        votes = Counter(statuses[max(0, i - half):i + half + 1])
+        smoothed.append(max(votes, key=lambda s: (votes[s], _SEVERITY.get(s, 0))))
+
+    runs: List[list] = []  # [status, início, fim] (posições em `valid`)
+    for i, status in enumerate(smoothed):
+        if runs and runs[-1][0] == status:
+            runs[-1][2] = i
+        else:
+            runs.append([status, i, i])
+
+    merged: List[list] = []
+    for run in runs:
+        if merged and (run[2] - run[1] + 1 < min_frames or merged[-1][0] == run[0]):
+            merged[-1][2] = run[2]
+        else:
+            merged.append(run)
+    if len(merged) > 1 and merged[0][2] - merged[0][1] + 1 < min_frames:
+        merged[1][1] = merged.pop(0)[1]
+
+    segments = []
+    for status, start, end in merged:
+        members = valid[start:end + 1]
+        labels = Counter(r.label for r in members if r.status == status)
+        segments.append(Segment(
+            status=status,
+            label=labels.most_common(1)[0][0] if labels else members[0].label,
+            start_index=members[0].index,
+            end_index=members[-1].index,
+            start_time=members[0].timestamp,
+            end_time=members[-1].timestamp,
+            frames=len(members),
+            classified_frames=sum(not r.reused for r in members),
+            mean_brownish_ratio=float(np.mean([r.features[3] for r in members])),
+        ))
+    return segments
+
+
+# ==================== LINHA DE COMANDO ====================
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Classifica vídeo ou sequência de quadros (rótulo por quadro e status por trecho)."
+    )
+    parser.add_argument("source", help="Vídeo, diretório, padrão glob/printf ou imagem animada")
+    parser.add_argument("-o", "--output", default=None, help="JSONL com o resultado de cada quadro")
+    parser.add_argument(
+        "--fps", type=float, default=None,
+        help=f"Taxa dos quadros; em vídeo, reamostra (padrão: a do arquivo ou {DEFAULT_FPS:g})",
+    )
+    parser.add_argument(
+        "--change-threshold", type=float, default=CHANGE_THRESHOLD,
+        help="Diferença média de cinza para reclassificar; 0 classifica todos (padrão: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-reuse", type=int, default=MAX_REUSE,
+        help="Reaproveitamentos seguidos antes de reclassificar (padrão: %(default)s)",
+    )
+    parser.add_argument("--window", type=int, default=5, help="Janela da suavização (padrão: %(default)s quadros)")
+    parser.add_argument(
+        "--min-segment", type=float, default=0.5,
+        help="Duração mínima de um trecho (padrão: %(default)s s)",
+    )
+    parser.add_argument(
+        "--fast-ingest", action="store_true", default=FAST_INGEST,
+        help="Decodifica em escala reduzida (draft/reduce) antes do resize final",
+    )
+    parser.add_argument(
+        "--feature-kernel", choices=sorted(FEATURE_KERNELS), default=FEATURE_KERNEL,
+        help="Kernel de features de cor (padrão: %(default)s)",
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    model = SimpleAgroVisionModel(fast_ingest=args.fast_ingest, feature_kernel=args.feature_kernel)
+
+    results: List[FrameResult] = []
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    start = time.perf_counter()
+    try:
+        frames = iter_frames(args.source, args.fps)
+        for result in analyze_frames(frames, model, args.change_threshold, args.max_reuse):
+            results.append(result)
+            if output is not None:
+                output.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+    except VideoSourceError as exc:
+        print(f"Erro: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not None:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    span = results[-1].timestamp - results[0].timestamp if results else 0.0
+    rate = (len(results) - 1) / span if span > 0 else DEFAULT_FPS
+    min_frames = max(1, int(round(args.min_segment * rate)))
+    for segment in smooth_segments(results, args.window, min_frames):
+        print(
+            f"{segment.start_time:>9.2f}s - {segment.end_time:>8.2f}s  {segment.status:<8}"
+            f"{segment.frames:>6} quadros ({segment.classified_frames} classificados)  {segment.label}"
+        )
+
+    counts: Dict[str, int] = Counter(r.status for r in results)
+    reused = sum(r.reused for r in results)
+    print(
+        f"{len(results)} quadros em {elapsed:.1f}s ({len(results) / max(elapsed, 1e-9):.0f} quadros/s, "
+        f"{reused} reaproveitados; " + ", ".join(f"{s}={n}" for s, n in sorted(counts.items())) + ")",
+        file=sys.stderr,
+    )
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
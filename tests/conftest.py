@@ -0,0 +1,7 @@
+"""Testes rápidos dos módulos puros (sem Streamlit); os módulos de src/ são importados direto."""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
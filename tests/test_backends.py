@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from backends import TINY_MODEL, BackendError, HeuristicBackend, ModelBackend, int8_path, load_backend
+from core import SimpleAgroVisionModel
+
+
+@pytest.fixture(scope="module")
+def batch():
+    rng = np.random.default_rng(11)
+    arrays = rng.integers(0, 256, (6, 256, 256, 3), dtype=np.uint8)
+    # Metade das imagens com folha verde e manchas em proporções perto dos limiares
+    for i, fraction in enumerate((0.0, 0.04, 0.12), start=3):
+        arrays[i] = (60, 140, 50)
+        arrays[i, : int(256 * fraction)] = (170, 120, 50)
+    return arrays
+
+
+def test_model_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ModelBackend()
+
+
+def test_heuristic_backend_matches_model_classify(batch):
+    model = SimpleAgroVisionModel()
+    backend = HeuristicBackend(model)
+    expected = [model.classify(img_array) for img_array in batch]
+    assert [backend.classify(img_array) for img_array in batch] == expected
+    assert backend.classify_batch(batch) == expected
+    assert backend.classify_batch(batch, model.extract_color_features_batch(batch)) == expected
+
+
+def test_onnx_backend_loads_and_scores(batch):
+    pytest.importorskip("onnxruntime")
+    if not os.path.isfile(TINY_MODEL):
+        pytest.skip("modelo de teste ausente (models/build_tiny_model.py)")
+    backend = load_backend("onnx", path=TINY_MODEL, max_batch_size=4)
+
+    scores = backend.predict(batch)
+    assert scores.shape == (len(batch), 3)
+    assert np.isfinite(scores).all()
+
+    diagnoses = backend.classify_batch(batch)
+    assert len(diagnoses) == len(batch)
+    assert [backend.classify(img_array) for img_array in batch] == diagnoses
+    for label, explanation, status in diagnoses:
+        assert (label, explanation) == SimpleAgroVisionModel.DIAGNOSES[status]
+
+
+def test_onnx_backend_reports_missing_model(tmp_path):
+    pytest.importorskip("onnxruntime")
+    with pytest.raises(BackendError):
+        load_backend("onnx", path=str(tmp_path / "ausente.onnx"))
+
+
+def test_cache_namespace_separates_backends():
+    model = SimpleAgroVisionModel()
+    heuristic = HeuristicBackend(model).cache_namespace()
+    assert heuristic == HeuristicBackend(SimpleAgroVisionModel()).cache_namespace()
+    assert heuristic != HeuristicBackend(SimpleAgroVisionModel(fast_ingest=True)).cache_namespace()
+
+    pytest.importorskip("onnxruntime")
+    if not os.path.isfile(int8_path(TINY_MODEL)):
+        pytest.skip("modelos de teste ausentes (models/build_tiny_model.py)")
+    onnx = load_backend("onnx", model, path=TINY_MODEL).cache_namespace()
+    onnx_int8 = load_backend("onnx", model, path=TINY_MODEL, int8=True).cache_namespace()
+    assert len({heuristic, onnx, onnx_int8}) == 3
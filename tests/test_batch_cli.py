@@ -0,0 +1,31 @@
+import io
+
+import pytest
+
+from batch_cli import main, run_batch
+
+
+@pytest.mark.parametrize("budget", ["0", "-1"])
+def test_non_positive_memory_budget_rejected(budget, tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "--memory-budget", budget])
+    assert "--memory-budget" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(memory_budget=0),
+        dict(use_cascade=True, near_duplicates=4),
+        dict(near_duplicates=99),
+        dict(backend="onnx", use_cascade=True),
+        dict(backend="onnx", memory_budget=1 << 20),
+        dict(backend="onnx", use_mmap=True),
+    ],
+)
+def test_run_batch_rejects_incompatible_options(options, tmp_path):
+    # Falha antes de criar os processos e sem escrever nada
+    output = io.StringIO()
+    with pytest.raises(ValueError):
+        run_batch(str(tmp_path), output, workers=1, **options)
+    assert output.getvalue() == ""
@@ -0,0 +1,55 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from cascade import CASCADE_STAGES, CascadeClassifier, decision_margin
+from core import SimpleAgroVisionModel
+
+
+def _spotted_jpeg(width: int, height: int, spot_px: int, fraction: float, seed: int) -> bytes:
+    """Folha verde com manchas quadradas de `spot_px` pixels cobrindo ~`fraction` da área."""
+    rng = np.random.default_rng(seed)
+    leaf = np.array((60, 140, 50), dtype=np.int16) + rng.integers(-20, 21, (height, width, 3), dtype=np.int16)
+    cells = rng.random((-(-height // spot_px), -(-width // spot_px))) < fraction
+    spots = np.repeat(np.repeat(cells, spot_px, axis=0), spot_px, axis=1)[:height, :width]
+    image = np.where(spots[..., None], np.array((170, 120, 50), dtype=np.int16), leaf)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _full_status(model: SimpleAgroVisionModel, data: bytes) -> str:
+    img_array = model.preprocess_image(Image.open(io.BytesIO(data)))
+    return model.classify_features(model.extract_color_features(img_array), img_array)[2]
+
+
+@pytest.mark.parametrize("spot_px", [6, 8, 10])
+def test_small_spot_jpegs_match_full_path(spot_px):
+    # Manchas de poucos pixels numa foto de 12 MP: o resize as mistura à folha,
+    # então os estágios rápidos precisam medir o mesmo 256x256 do caminho completo
+    model = SimpleAgroVisionModel()
+    cascade = CascadeClassifier(model)
+    stages = set()
+    for fraction in np.linspace(0.02, 0.30, 8):
+        data = _spotted_jpeg(4000, 3000, spot_px, fraction, seed=spot_px * 1000 + round(fraction * 100))
+        decision = cascade.classify(data)
+        stages.add(decision.stage)
+        assert decision.status == _full_status(model, data), (spot_px, fraction, decision.stage)
+    assert min(stages) < 256
+
+
+def test_image_at_target_size_decides_at_256():
+    model = SimpleAgroVisionModel()
+    data = _spotted_jpeg(256, 256, 2, 0.05, seed=0)
+    decision = CascadeClassifier(model, stages=()).classify(data)
+    assert decision.stage == 256
+    assert decision.status == _full_status(model, data)
+
+
+def test_margin_below_one_near_each_threshold():
+    model = SimpleAgroVisionModel()
+    stage = CASCADE_STAGES[0]
+    for brownish in (model.BROWNISH_HEALTHY_MAX, model.BROWNISH_WARNING_MAX):
+        assert decision_margin(model, (60.0, 140.0, 50.0, brownish), stage) < 1
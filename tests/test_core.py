@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from core import FEATURE_KERNELS, SimpleAgroVisionModel
+
+SIZE = 64
+
+
+def _near_green_threshold(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Imagens com green_ratio a poucos níveis de cinza de GREEN_RATIO_MIN (0.40)."""
+    base = np.array((60, 100, 90), dtype=np.uint8)  # 100 / 250 = 0.40
+    images = np.broadcast_to(base, (n, SIZE, SIZE, 3)).copy()
+    flat = images.reshape(n, -1, 3)
+    for i in range(n):
+        # Alguns pixels um nível acima/abaixo no vermelho ou no verde
+        pixels = rng.choice(SIZE * SIZE, size=int(rng.integers(0, 40)), replace=False)
+        channel = int(rng.integers(0, 2))
+        flat[i, pixels, channel] = base[channel] + rng.choice([-1, 1])
+    return images
+
+
+def _near_brownish_thresholds(model: SimpleAgroVisionModel, rng: np.random.Generator) -> np.ndarray:
+    """Verdes com exatamente k pixels amarronzados, k em torno de 5% e 15% dos pixels."""
+    total = SIZE * SIZE
+    counts = []
+    for limit in (model.BROWNISH_HEALTHY_MAX, model.BROWNISH_WARNING_MAX):
+        center = int(round(limit * total))
+        counts += [center - 1, center, center + 1]
+    images = np.empty((len(counts), SIZE, SIZE, 3), dtype=np.uint8)
+    images[:] = (50, 150, 40)
+    flat = images.reshape(len(counts), -1, 3)
+    for i, count in enumerate(counts):
+        flat[i, rng.choice(total, size=count, replace=False)] = (
+            model.BROWNISH_R_MIN + 1, model.BROWNISH_G_MIN + 1, model.BROWNISH_B_MAX - 1,
+        )
+    return images
+
+
+def _batches(model: SimpleAgroVisionModel):
+    rng = np.random.default_rng(0)
+    yield rng.integers(0, 256, (8, SIZE, SIZE, 3), dtype=np.uint8)
+    yield _near_green_threshold(rng, 16)
+    yield _near_brownish_thresholds(model, rng)
+
+
+@pytest.mark.parametrize("kernel", list(FEATURE_KERNELS))
+def test_batch_matches_single_image_path(kernel):
+    model = SimpleAgroVisionModel(feature_kernel=kernel)
+    for batch in _batches(model):
+        features = model.extract_color_features_batch(batch)
+        for i, img_array in enumerate(batch):
+            assert tuple(features[i]) == pytest.approx(model.extract_color_features(img_array), abs=1e-12)
+        assert model.classify_batch(batch) == [model.classify(img_array) for img_array in batch]
+
+
+def test_near_threshold_batch_covers_every_status():
+    model = SimpleAgroVisionModel()
+    statuses = {status for batch in _batches(model) for _, _, status in model.classify_batch(batch)}
+    assert statuses == {"healthy", "warning", "danger"}
+
+
+def test_tie_tolerance_rechecks_with_scalar_path(monkeypatch):
+    model = SimpleAgroVisionModel()
+    batch = _near_green_threshold(np.random.default_rng(1), 16)
+    ratios = [
+        f[1] / (f[0] + f[1] + f[2] + 1e-6) for f in model.extract_color_features_batch(batch)
+    ]
+    distance = max(abs(r - model.GREEN_RATIO_MIN) for r in ratios)
+
+    # Tolerância que cobre todo o lote: cada imagem passa pelo caminho escalar
+    calls = []
+    classify = model.classify
+    monkeypatch.setattr(model, "_TIE_TOLERANCE", distance * 2)
+    monkeypatch.setattr(model, "classify", lambda img_array: calls.append(1) or classify(img_array))
+    assert model.classify_batch(batch) == [classify(img_array) for img_array in batch]
+    assert len(calls) == len(batch)
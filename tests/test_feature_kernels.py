@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from core import SimpleAgroVisionModel
+from feature_kernels import UInt8FeatureKernel
+
+
+def _reference(img_array: np.ndarray):
+    return SimpleAgroVisionModel(feature_kernel="float").extract_color_features(img_array)
+
+
+@pytest.mark.parametrize("shape", [(1, 1, 3), (256, 256, 3), (37, 211, 3), (64, 48, 4)])
+def test_uint8_kernel_matches_float_reference(shape):
+    img_array = np.random.default_rng(shape[0]).integers(0, 256, shape, dtype=np.uint8)
+    assert UInt8FeatureKernel()(img_array) == pytest.approx(_reference(img_array), abs=1e-12)
+
+
+def test_uint8_kernel_on_views_and_reused_scratch():
+    kernel = UInt8FeatureKernel()
+    img_array = np.random.default_rng(1).integers(0, 256, (120, 90, 3), dtype=np.uint8)
+    views = [img_array[::2, ::3], img_array[:, ::-1], img_array[10:50], img_array]
+    for view in views + views:
+        assert kernel(view) == pytest.approx(_reference(view), abs=1e-12)
+
+
+def test_uint8_kernel_threshold_edges():
+    model = SimpleAgroVisionModel
+    levels = np.array([model.BROWNISH_R_MIN, model.BROWNISH_G_MIN, model.BROWNISH_B_MAX], dtype=np.int64)
+    pixels = np.array([[levels + offset for offset in ([0, 1, -1], [1, 0, -1], [1, 1, 0], [1, 1, -1])]])
+    pixels = pixels.astype(np.uint8)
+    assert UInt8FeatureKernel()(pixels)[3] == _reference(pixels)[3] == 0.25
+
+
+def test_uint8_kernel_rejects_float_input():
+    with pytest.raises(ValueError):
+        UInt8FeatureKernel()(np.zeros((4, 4, 3)))
+
+
+def test_model_with_uint8_kernel_matches_batch_path():
+    batch = np.random.default_rng(2).integers(0, 256, (5, 64, 64, 3), dtype=np.uint8)
+    model = SimpleAgroVisionModel(feature_kernel="uint8")
+    expected = model.extract_color_features_batch(batch)
+    for img_array, row in zip(batch, expected):
+        assert model.extract_color_features(img_array) == pytest.approx(tuple(row), abs=1e-12)
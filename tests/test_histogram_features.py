@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from core import SimpleAgroVisionModel
+from histogram_features import ColorHistogram, HistogramFeatureKernel
+
+
+def _reference(img_array: np.ndarray):
+    return SimpleAgroVisionModel(feature_kernel="float").extract_color_features(img_array)
+
+
+@pytest.mark.parametrize("shape", [(1, 1, 3), (256, 256, 3), (37, 211, 3), (64, 48, 4)])
+def test_histogram_kernel_matches_float_reference(shape):
+    img_array = np.random.default_rng(shape[1]).integers(0, 256, shape, dtype=np.uint8)
+    assert HistogramFeatureKernel()(img_array) == pytest.approx(_reference(img_array), abs=1e-12)
+
+
+def test_every_threshold_combination_lands_in_its_code():
+    model = SimpleAgroVisionModel
+    levels = np.arange(256, dtype=np.uint8)
+    # Todos os níveis de cada canal contra um valor fixo dos outros dois
+    rows = [
+        np.stack([levels, np.full(256, 200), np.full(256, 50)], axis=-1),
+        np.stack([np.full(256, 200), levels, np.full(256, 50)], axis=-1),
+        np.stack([np.full(256, 200), np.full(256, 200), levels], axis=-1),
+    ]
+    img_array = np.stack(rows).astype(np.uint8)
+    histogram = ColorHistogram.from_array(img_array)
+    assert histogram.features() == pytest.approx(_reference(img_array), abs=1e-12)
+    expected = (255 - model.BROWNISH_R_MIN) + (255 - model.BROWNISH_G_MIN) + model.BROWNISH_B_MAX
+    assert histogram.brownish_pixels() == expected
+
+
+def test_merged_strips_equal_whole_image():
+    img_array = np.random.default_rng(3).integers(0, 256, (101, 77, 3), dtype=np.uint8)
+    merged = ColorHistogram()
+    for start in range(0, 101, 17):
+        merged.merge(ColorHistogram.from_array(img_array[start:start + 17]))
+
+    whole = ColorHistogram.from_image(Image.fromarray(img_array))
+    np.testing.assert_array_equal(merged.channels, whole.channels)
+    np.testing.assert_array_equal(merged.joint, whole.joint)
+    assert merged.features() == pytest.approx(_reference(img_array), abs=1e-12)
+
+
+def test_empty_histogram_rejected():
+    with pytest.raises(ValueError):
+        ColorHistogram().features()
+
+
+@pytest.mark.parametrize("bins", [1, 3, 8, 100, 256])
+def test_binned_matches_quantized_levels(bins):
+    img_array = np.random.default_rng(bins).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+    quantized = img_array.reshape(-1, 3).astype(np.int64) * bins // 256
+    expected = np.stack([np.bincount(quantized[:, c], minlength=bins) for c in range(3)])
+    np.testing.assert_array_equal(ColorHistogram.from_array(img_array).binned(bins), expected)
@@ -0,0 +1,110 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from history import HistoryRecord, HistoryStore
+
+DAY = 86400.0
+STATUSES = ("healthy", "warning", "danger")
+
+
+def _records(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        features = tuple(float(x) for x in rng.random(4) * (255, 255, 255, 1))
+        plot = ("A", "B", "", None)[i % 4]
+        status = STATUSES[int(rng.integers(0, 3))]
+        records.append(HistoryRecord(i * DAY / 7, f"k{i}", plot, features, "rótulo", status))
+    return records
+
+
+def _rows_on_disk(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+def test_add_writes_in_batches_and_flush_writes_the_rest(tmp_path):
+    path = str(tmp_path / "historico.sqlite")
+    store = HistoryStore(path, batch_size=4)
+    records = _records(10)
+    for record in records[:3]:
+        store.add(record)
+    assert _rows_on_disk(path) == 0
+    store.add(records[3])
+    assert _rows_on_disk(path) == 4
+
+    for record in records[4:9]:
+        store.add(record)
+    assert _rows_on_disk(path) == 8
+    store.flush()
+    assert _rows_on_disk(path) == 9
+
+    # add_many leva os pendentes junto na mesma transação
+    store.add(records[9])
+    assert store.add_many([]) == 1
+    assert _rows_on_disk(path) == 10
+    store.close()
+
+
+def test_queries_see_pending_records(tmp_path):
+    store = HistoryStore(str(tmp_path / "historico.sqlite"), batch_size=100)
+    store.add(_records(1)[0])
+    assert store.count() == 1
+    assert len(store.recent()) == 1
+    store.close()
+
+
+def test_range_and_recent_filters(tmp_path):
+    store = HistoryStore(str(tmp_path / "historico.sqlite"), batch_size=16)
+    records = _records(60)
+    store.add_many(records)
+
+    def expected(start=None, end=None, plot=None, status=None):
+        return [
+            r for r in records
+            if (start is None or r.timestamp >= start)
+            and (end is None or r.timestamp < end)
+            and (plot is None or (r.plot or "") == plot)
+            and (status is None or r.status == status)
+        ]
+
+    for plot in (None, "A", ""):
+        for status in (None, "warning"):
+            got = store.range(2 * DAY, 6 * DAY, plot=plot, status=status)
+            want = expected(2 * DAY, 6 * DAY, plot, status)
+            assert [r.content_key for r in got] == [r.content_key for r in want]
+
+            newest = store.recent(limit=5, plot=plot, status=status)
+            assert [r.content_key for r in newest] == [r.content_key for r in expected(plot=plot, status=status)[::-1][:5]]
+
+    # Sem talhão: "" e None gravam NULL e voltam como None
+    assert {r.plot for r in store.range(plot="")} == {None}
+    assert store.plots() == ["A", "B"]
+    store.close()
+
+
+def test_summary_matches_records(tmp_path):
+    store = HistoryStore(str(tmp_path / "historico.sqlite"), batch_size=7)
+    records = _records(100, seed=1)
+    for record in records:
+        store.add(record)
+
+    for start, end, plot in ((None, None, None), (3 * DAY, 9 * DAY - 1, None), (None, None, "B"), (None, None, "")):
+        summary = store.summary(start, end, plot)
+        # summary arredonda start/end para o dia que os contém
+        first = None if start is None else start // DAY * DAY
+        last = None if end is None else (end // DAY + 1) * DAY
+        selected = store.range(first, last, plot=plot)
+        assert sum(s["count"] for s in summary.values()) == len(selected)
+        for status in STATUSES:
+            subset = np.array([r.features for r in selected if r.status == status])
+            if not len(subset):
+                assert status not in summary
+                continue
+            means = subset.mean(axis=0)
+            assert summary[status]["count"] == len(subset)
+            assert [summary[status][k] for k in ("mean_r", "mean_g", "mean_b", "brownish_ratio")] == pytest.approx(means)
+    assert store.count() == 100
+    store.close()
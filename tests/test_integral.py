@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from core import SimpleAgroVisionModel
+from integral import IntegralFeatures
+
+
+@pytest.fixture(scope="module")
+def img_array():
+    rng = np.random.default_rng(7)
+    return rng.integers(0, 256, (97, 131, 3), dtype=np.uint8)
+
+
+def test_region_features_match_extract_color_features(img_array):
+    model = SimpleAgroVisionModel()
+    integral = IntegralFeatures(img_array)
+    boxes = [(0, 0, 97, 131), (10, 20, 40, 90), (96, 130, 97, 131), (5, 0, 6, 131)]
+    for y0, x0, y1, x1 in boxes:
+        expected = model.extract_color_features(img_array[y0:y1, x0:x1])
+        assert integral.region_features((y0, x0, y1, x1)) == pytest.approx(expected, abs=1e-12)
+
+
+def test_grid_features_match_region_features(img_array):
+    integral = IntegralFeatures(img_array)
+    ys, xs = integral.grid_bounds(4, 5)
+    grid = integral.grid_features(4, 5)
+    for i in range(4):
+        for j in range(5):
+            box = (ys[i], xs[j], ys[i + 1], xs[j + 1])
+            assert grid[i, j] == pytest.approx(integral.region_features(box), abs=1e-12)
+
+
+def test_threshold_edges_follow_the_model():
+    model = SimpleAgroVisionModel()
+    r_min, g_min, b_max = model.BROWNISH_R_MIN, model.BROWNISH_G_MIN, model.BROWNISH_B_MAX
+    pixels = np.array([[
+        [r_min, g_min + 1, b_max - 1],
+        [r_min + 1, g_min, b_max - 1],
+        [r_min + 1, g_min + 1, b_max],
+        [r_min + 1, g_min + 1, b_max - 1],
+    ]], dtype=np.uint8)
+    integral = IntegralFeatures(pixels)
+    assert integral.region_features((0, 0, 1, 4))[3] == model.extract_color_features(pixels)[3] == 0.25
+
+
+def test_empty_region_rejected(img_array):
+    with pytest.raises(ValueError):
+        IntegralFeatures(img_array).region_features((10, 10, 10, 20))
@@ -0,0 +1,18 @@
+import re
+
+from metrics import MetricsRegistry
+
+# Uma amostra do formato de texto: nome{rótulo="valor",...} número
+_SAMPLE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\[\\"n])*",?)*\})? [-+0-9.e]+(Inf)?$')
+
+
+def test_prometheus_label_values_are_escaped():
+    registry = MetricsRegistry(enabled=True)
+    registry.observe('decode "jpeg"\\\nx', 0.01)
+    registry.inc("uploads", source='a"b\nc')
+    lines = registry.render_prometheus().splitlines()
+
+    samples = [line for line in lines if not line.startswith("#")]
+    assert samples
+    assert all(_SAMPLE.match(line) for line in samples), samples
+    assert any('stage="decode \\"jpeg\\"\\\\\\nx"' in line for line in samples)
@@ -0,0 +1,107 @@
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from core import SimpleAgroVisionModel
+from mmap_ingest import NotMappableError, analyze_mapped, open_mapped
+
+
+def _write_tiled_tiff(path, array: np.ndarray, tile: int = 16) -> None:
+    """TIFF sem compressão em tiles (o Pillow só grava em strips)."""
+    height, width, channels = array.shape
+    rows, cols = -(-height // tile), -(-width // tile)
+    padded = np.zeros((rows * tile, cols * tile, channels), dtype=np.uint8)
+    padded[:height, :width] = array
+    tiles = [
+        padded[r * tile:(r + 1) * tile, c * tile:(c + 1) * tile].tobytes()
+        for r in range(rows) for c in range(cols)
+    ]
+    offsets = [8 + i * len(tiles[0]) for i in range(len(tiles))]
+    bits_at = 8 + len(tiles) * len(tiles[0])
+    offsets_at = bits_at + 2 * channels
+    counts_at = offsets_at + 4 * len(tiles)
+    ifd_at = counts_at + 4 * len(tiles)
+    entries = [
+        (256, 4, 1, width), (257, 4, 1, height), (258, 3, channels, bits_at),
+        (259, 3, 1, 1), (262, 3, 1, 2), (277, 3, 1, channels), (284, 3, 1, 1),
+        (322, 4, 1, tile), (323, 4, 1, tile),
+        (324, 4, len(tiles), offsets_at), (325, 4, len(tiles), counts_at),
+    ]
+    with open(path, "wb") as f:
+        f.write(b"II*\x00" + struct.pack("<I", ifd_at))
+        f.write(b"".join(tiles))
+        f.write(struct.pack(f"<{channels}H", *[8] * channels))
+        f.write(struct.pack(f"<{len(tiles)}I", *offsets))
+        f.write(struct.pack(f"<{len(tiles)}I", *[len(t) for t in tiles]))
+        f.write(struct.pack("<H", len(entries)))
+        for tag, kind, count, value in entries:
+            packed = struct.pack("<HH", value, 0) if kind == 3 and count == 1 else struct.pack("<I", value)
+            f.write(struct.pack("<HHI", tag, kind, count) + packed)
+        f.write(struct.pack("<I", 0))
+
+
+@pytest.fixture(scope="module")
+def pixels():
+    return np.random.default_rng(9).integers(0, 256, (150, 230, 3), dtype=np.uint8)
+
+
+@pytest.fixture(params=["npy", "raw", "tiff_strips", "tiff_tiles"])
+def mapped_path(request, tmp_path, pixels):
+    kind = request.param
+    if kind == "npy":
+        path = tmp_path / "talhao.npy"
+        np.save(path, pixels)
+    elif kind == "raw":
+        path = tmp_path / f"talhao_{pixels.shape[1]}x{pixels.shape[0]}.rgb"
+        path.write_bytes(pixels.tobytes())
+    elif kind == "tiff_strips":
+        path = tmp_path / "talhao.tif"
+        Image.fromarray(pixels).save(path, compression="raw")
+    else:
+        path = tmp_path / "talhao_tiles.tif"
+        _write_tiled_tiff(path, pixels)
+    return str(path)
+
+
+def test_strips_reproduce_the_pixels(mapped_path, pixels):
+    with open_mapped(mapped_path) as image:
+        assert image.size == (pixels.shape[1], pixels.shape[0])
+        strips = list(image.iter_strips(37))
+        np.testing.assert_array_equal(np.concatenate(strips), pixels)
+
+
+def test_analysis_matches_decoded_image(mapped_path, pixels):
+    model = SimpleAgroVisionModel(feature_kernel="float")
+    expected_array = model.preprocess_image(Image.fromarray(pixels))
+
+    result = analyze_mapped(mapped_path, model, memory_budget=64 * 1024)
+    assert result.strip_rows < pixels.shape[0]
+    np.testing.assert_array_equal(result.img_array, expected_array)
+    assert result.features == pytest.approx(model.extract_color_features(expected_array), abs=1e-12)
+    assert (result.label, result.explanation, result.status) == model.classify(expected_array)
+
+
+def test_grayscale_and_rgba_npy_convert_like_pillow(tmp_path, pixels):
+    for array, mode in ((pixels[..., 0], "L"), (np.dstack([pixels, pixels[..., :1]]), "RGBA")):
+        path = tmp_path / f"{mode}.npy"
+        np.save(path, array)
+        with open_mapped(str(path)) as image:
+            strips = np.concatenate(list(image.iter_strips(64)))
+        np.testing.assert_array_equal(strips, np.asarray(Image.fromarray(array, mode).convert("RGB")))
+
+
+def test_unmappable_inputs(tmp_path, pixels):
+    compressed = tmp_path / "lzw.tif"
+    Image.fromarray(pixels).save(compressed, compression="tiff_lzw")
+    raw_without_shape = tmp_path / "talhao.rgb"
+    raw_without_shape.write_bytes(pixels.tobytes())
+    truncated = tmp_path / "talhao_230x150.rgb"
+    truncated.write_bytes(pixels.tobytes()[:-1])
+    floats = tmp_path / "float.npy"
+    np.save(floats, pixels.astype(np.float32))
+
+    for path in (compressed, raw_without_shape, truncated, floats):
+        with pytest.raises(NotMappableError):
+            open_mapped(str(path))
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from orthomosaic import NODATA, TileGrid, render_status_map
+
+
+def _grid(background: np.ndarray, tile_size: int, status: str = NODATA) -> TileGrid:
+    height, width = background.shape[:2]
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    return TileGrid(tile_size, width, height, np.zeros((rows, cols, 4)), [[status] * cols for _ in range(rows)])
+
+
+@pytest.mark.parametrize("tile_size,cell_px", [(4, 16), (2, 8), (8, 2), (16, 4)])
+def test_overlay_background_is_aligned_with_cells(tile_size, cell_px):
+    rng = np.random.default_rng(tile_size)
+    background = rng.integers(0, 256, (48, 80, 3), dtype=np.uint8)
+    grid = _grid(background, tile_size)
+
+    status_map = np.asarray(render_status_map(grid, cell_px, background))
+    rows, cols = grid.shape
+    assert status_map.shape == (rows * cell_px, cols * cell_px, 4)
+    assert (status_map[..., 3] == 255).all()
+
+    # Com tiles "nodata" o mapa é só a miniatura: a célula (i, j) mostra o tile (i, j)
+    step = tile_size / cell_px
+    ys = (np.arange(status_map.shape[0]) * step).astype(int)
+    xs = (np.arange(status_map.shape[1]) * step).astype(int)
+    if tile_size >= cell_px:
+        ys, xs = ys - ys % (tile_size // cell_px), xs - xs % (tile_size // cell_px)
+    np.testing.assert_array_equal(status_map[..., :3], background[np.ix_(ys, xs)])
+
+
+def test_overlay_with_partial_edge_tiles():
+    background = np.full((30, 50, 3), 200, dtype=np.uint8)
+    grid = _grid(background, tile_size=4, status="healthy")
+
+    status_map = render_status_map(grid, cell_px=10, background=background)
+    assert status_map.size == (13 * 10, 8 * 10)
+    alpha = np.asarray(status_map)[..., 3]
+    # 50x30 px de mosaico viram 125x75 px de mapa; o resto das células de borda
+    # não tem fundo e fica só com a cor do status, semitransparente
+    assert (alpha[:75, :125] == 255).all()
+    assert (alpha[75:, :] < 255).all() and (alpha[:, 125:] < 255).all()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from phash_index import MAX_DISTANCE, PHashIndex, hamming, image_signature
+
+
+def test_same_hash_different_colour_both_kept():
+    index = PHashIndex(max_distance=4, color_tolerance=3.0)
+    index.add(0xABCDEF, (60.0, 150.0, 50.0), "verde")
+    index.add(0xABCDEF, (160.0, 140.0, 60.0), "amarelada")
+
+    assert len(index) == 2
+    assert index.lookup(0xABCDEF, (61.0, 149.0, 50.0)) == ("verde", 0)
+    assert index.lookup(0xABCDEF, (159.0, 141.0, 61.0)) == ("amarelada", 0)
+    assert index.lookup(0xABCDEF, (100.0, 100.0, 100.0)) is None
+
+
+def test_lookup_finds_everything_brute_force_finds():
+    rng = np.random.default_rng(0)
+    index = PHashIndex(max_distance=6, max_entries=10_000)
+    stored = [int(v) for v in rng.integers(0, 2**63, 2000, dtype=np.int64)]
+    for i, value in enumerate(stored):
+        index.add(value, (0.0, 0.0, 0.0), i)
+
+    for i in range(300):
+        flips = rng.choice(64, size=int(rng.integers(0, 9)), replace=False)
+        query = stored[i] ^ sum(1 << int(bit) for bit in flips)
+        expected = min(hamming(query, value) for value in stored)
+        found = index.lookup(query, (0.0, 0.0, 0.0))
+        if expected <= 6:
+            assert found is not None and found[1] == expected
+        else:
+            assert found is None
+
+
+def test_signature_survives_recompression_noise():
+    base = np.random.default_rng(1).integers(0, 256, (256, 256, 3), dtype=np.uint8)
+    noisy = np.clip(base.astype(int) + np.random.default_rng(2).integers(-3, 4, base.shape), 0, 255).astype(np.uint8)
+    (a, color_a), (b, color_b) = image_signature(base), image_signature(noisy)
+    assert hamming(a, b) <= 4
+    assert max(abs(x - y) for x, y in zip(color_a, color_b)) < 1
+
+
+def test_max_distance_is_validated():
+    PHashIndex(max_distance=MAX_DISTANCE)
+    with pytest.raises(ValueError, match="max_distance"):
+        PHashIndex(max_distance=MAX_DISTANCE + 1)
+
+
+def test_save_and_load_keep_entries_with_same_hash(tmp_path):
+    path = str(tmp_path / "phash.json")
+    index = PHashIndex(path=path)
+    index.add(7, (10.0, 10.0, 10.0), "a")
+    index.add(7, (90.0, 90.0, 90.0), "b")
+    index.save()
+    reloaded = PHashIndex(path=path)
+    assert len(reloaded) == 2
+    assert reloaded.lookup(7, (90.0, 90.0, 90.0)) == ("b", 0)
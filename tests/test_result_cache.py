@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from result_cache import CachedAnalysis, ResultCache, content_key
+
+
+def _analysis(seed: int) -> CachedAnalysis:
+    img_array = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    return CachedAnalysis(img_array, (0.1, 0.5, 0.2, 0.0), "Planta Saudável", "ok", "healthy")
+
+
+def test_content_key_is_exact():
+    assert content_key(b"folha") == content_key(b"folha")
+    assert content_key(b"folha") != content_key(b"folha ")
+    # Backends diferentes (`ModelBackend.cache_namespace`) não dividem entradas
+    assert content_key(b"folha", "onnx") != content_key(b"folha", "heuristic") != content_key(b"folha")
+
+
+def test_memory_hit_returns_the_stored_analysis():
+    cache = ResultCache()
+    calls = []
+
+    def compute(data: bytes) -> CachedAnalysis:
+        calls.append(data)
+        return _analysis(len(data))
+
+    key, first = cache.get_or_compute(b"upload", compute)
+    again_key, again = cache.get_or_compute(b"upload", compute)
+
+    assert calls == [b"upload"]
+    assert again_key == key and again is first
+    assert not first.img_array.flags.writeable
+    assert cache.stats()["hits_memory"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_budget_evicts_least_recently_used():
+    entry_bytes = _analysis(0).nbytes
+    cache = ResultCache(max_memory_bytes=2 * entry_bytes)
+    for name in ("a", "b"):
+        cache.put(name, _analysis(ord(name)))
+    assert cache.get("a") is not None
+    cache.put("c", _analysis(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_disk_hit_survives_a_new_process(tmp_path):
+    stored = _analysis(5)
+    ResultCache(disk_dir=str(tmp_path)).put("k", stored)
+
+    cache = ResultCache(disk_dir=str(tmp_path))
+    entry = cache.get("k")
+    assert entry is not None
+    np.testing.assert_array_equal(entry.img_array, stored.img_array)
+    assert entry.features == stored.features
+    assert (entry.label, entry.explanation, entry.status) == (stored.label, stored.explanation, stored.status)
+    assert cache.stats()["hits_disk"] == 1
+
+    # Depois do acerto no disco a entrada fica na memória
+    assert cache.get("k") is entry
+
+
+def test_corrupted_disk_entry_is_a_miss(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put("k", _analysis(6))
+    (tmp_path / "k.npz").write_bytes(b"truncado")
+
+    cache = ResultCache(disk_dir=str(tmp_path))
+    assert cache.get("k") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+@pytest.mark.parametrize("limit_entries", [1, 2])
+def test_disk_budget_keeps_the_newest_files(tmp_path, limit_entries):
+    probe = ResultCache(disk_dir=str(tmp_path / "probe"))
+    probe.put("x", _analysis(0))
+    file_bytes = probe.stats()["disk_bytes"]
+
+    cache = ResultCache(disk_dir=str(tmp_path / "cache"), max_disk_bytes=limit_entries * file_bytes + 1)
+    for i in range(3):
+        cache.put(f"k{i}", _analysis(i))
+    cache.clear()
+
+    kept = [i for i in range(3) if cache.get(f"k{i}") is not None]
+    assert kept == list(range(3 - limit_entries, 3))
+
+
+def test_truncated_npz_is_deleted_and_counted_as_miss(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put("k", _analysis(7))
+    path = tmp_path / "k.npz"
+    path.write_bytes(path.read_bytes()[: path.stat().st_size // 2])
+
+    cache = ResultCache(disk_dir=str(tmp_path))
+    assert cache.get("k") is None
+    assert not path.exists()
+    assert cache.stats()["misses"] == 1 and cache.stats()["disk_entries"] == 0
+
+    # O próximo envio grava de novo e volta a acertar no disco
+    cache.put("k", _analysis(7))
+    assert ResultCache(disk_dir=str(tmp_path)).get("k") is not None
+
+
+def test_concurrent_sessions_share_the_disk_layer(tmp_path):
+    import threading
+
+    cache = ResultCache(max_memory_bytes=1, disk_dir=str(tmp_path))
+    entries = {f"k{i}": _analysis(i) for i in range(8)}
+    errors = []
+
+    def session(keys):
+        try:
+            for _ in range(5):
+                for key in keys:
+                    cache.put(key, entries[key])
+                    found = cache.get(key)
+                    assert found is not None and found.status == "healthy"
+        except Exception as exc:  # pragma: no cover - reportado abaixo
+            errors.append(exc)
+
+    threads = [threading.Thread(target=session, args=(list(entries)[i::2],)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.stats()["disk_entries"] == len(entries)
@@ -0,0 +1,58 @@
+import asyncio
+import io
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from service import AgroVisionService
+
+
+@pytest.fixture
+def service_port():
+    """Serviço em uma thread com laço de eventos próprio; corpo máximo de 1 MB."""
+    started = threading.Event()
+    state = {}
+
+    async def serve():
+        service = AgroVisionService(workers=1, max_body_bytes=1 << 20, batch_size=1)
+        await service.start("127.0.0.1", 0)
+        state.update(port=service.port, loop=asyncio.get_running_loop(), stop=asyncio.Event())
+        started.set()
+        await state["stop"].wait()
+        await service.close()
+
+    # asyncio.run cancela as conexões que ainda estiverem abertas ao sair
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield state["port"]
+    state["loop"].call_soon_threadsafe(state["stop"].set)
+    thread.join(10)
+
+
+def _post(port: int, body: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(b"POST /classify HTTP/1.1\r\nHost: t\r\nConnection: close\r\n")
+        sock.sendall(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        response = b""
+        while chunk := sock.recv(65536):
+            response += chunk
+    return response
+
+
+def test_classify(service_port):
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((64, 64, 3), (40, 160, 40), np.uint8)).save(buffer, "PNG")
+    head, _, body = _post(service_port, buffer.getvalue()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(body)["status"] == "healthy"
+
+
+def test_oversize_body_gets_413_instead_of_reset(service_port):
+    # Bem maior que os buffers do socket: o cliente ainda está enviando quando o 413 sai
+    response = _post(service_port, b"x" * (8 << 20))
+    assert response.startswith(b"HTTP/1.1 413")
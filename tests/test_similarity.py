@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from history import HistoryRecord, HistoryStore
+from similarity import BruteForceIndex, IVFIndex, SimilarityIndex, color_histogram, feature_vector
+
+
+def _clustered(n: int, dim: int = 4, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.random((32, dim), dtype=np.float32)
+    return (centers[rng.integers(0, 32, n)] + rng.normal(0, 0.03, (n, dim))).astype(np.float32)
+
+
+def _exact(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    d2 = ((queries[:, None, :].astype(np.float64) - vectors[None].astype(np.float64)) ** 2).sum(axis=2)
+    return np.argsort(d2, axis=1, kind="stable")[:, :k]
+
+
+def test_brute_force_matches_naive_search_across_growth():
+    vectors = _clustered(3000)
+    queries = _clustered(50, seed=1)
+    index = BruteForceIndex(dim=4, capacity=8)
+    for start in range(0, len(vectors), 700):
+        index.add(np.arange(start, min(start + 700, len(vectors))) + 1000, vectors[start:start + 700])
+
+    distances, ids = index.search(queries, k=5)
+    expected = _exact(vectors, queries, 5)
+    np.testing.assert_array_equal(ids, expected + 1000)
+    naive = np.linalg.norm(vectors[expected] - queries[:, None], axis=2)
+    np.testing.assert_allclose(distances, naive, atol=1e-3)
+
+
+def test_brute_force_edge_cases():
+    index = BruteForceIndex(dim=4)
+    distances, ids = index.search(np.zeros(4), k=3)
+    assert distances.shape == ids.shape == (1, 0)
+
+    index.add([7, 8], np.eye(4, dtype=np.float32)[:2])
+    _, ids = index.search(np.zeros(4), k=10)
+    assert sorted(ids[0]) == [7, 8]
+    with pytest.raises(ValueError):
+        index.add([1], np.zeros((1, 5)))
+
+
+def test_ivf_recall_on_clustered_vectors():
+    vectors = _clustered(20_000)
+    queries = _clustered(200, seed=2)
+    ivf = IVFIndex.train(vectors[::4], nlist=64, nprobe=8)
+    ivf.add(np.arange(len(vectors)), vectors)
+    assert len(ivf) == len(vectors)
+
+    _, ids = ivf.search(queries, k=10)
+    expected = _exact(vectors, queries, 10)
+    recall = np.mean([len(set(found) & set(true)) / 10 for found, true in zip(ids, expected)])
+    assert recall >= 0.9
+
+
+def test_similarity_index_switches_to_ivf_and_keeps_ids():
+    vectors = _clustered(2000)
+    index = SimilarityIndex(dim=4, ivf_min_size=1500, nprobe=64)
+    index.add(np.arange(1000), vectors[:1000])
+    assert index.kind == "exato"
+    index.add(np.arange(1000, 2000), vectors[1000:])
+    assert index.kind == "IVF" and len(index) == 2000
+
+    results = index.search(vectors[1234], k=3)
+    assert results[0] == (1234, pytest.approx(0.0, abs=1e-3))
+    assert [d for _, d in results] == sorted(d for _, d in results)
+
+
+def test_sync_history_indexes_only_new_records(tmp_path):
+    store = HistoryStore(str(tmp_path / "historico.sqlite"), batch_size=8)
+    features = _clustered(30)
+    for i, row in enumerate(features[:20]):
+        store.add(HistoryRecord(float(i), None, "A", tuple(row), "Planta Saudável", "healthy"))
+
+    index = SimilarityIndex(dim=4)
+    assert index.sync_history(store, chunk=7) == 20
+    for i, row in enumerate(features[20:]):
+        store.add(HistoryRecord(float(20 + i), None, "B", tuple(row), "Planta Saudável", "healthy"))
+    assert index.sync_history(store) == 10
+    assert index.sync_history(store) == 0
+
+    (record_id, distance), = index.search(features[25], k=1)
+    assert distance == pytest.approx(0.0, abs=1e-6)
+    assert store.get([record_id])[record_id].plot == "B"
+    store.close()
+
+
+def test_feature_vector_with_histogram():
+    img_array = np.random.default_rng(4).integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    histogram = color_histogram(img_array, bins=8)
+    assert histogram.shape == (24,)
+    np.testing.assert_allclose(histogram.reshape(3, 8).sum(axis=1), 1.0, rtol=1e-6)
+    vector = feature_vector((0.1, 0.2, 0.3, 0.4), histogram)
+    assert vector.dtype == np.float32 and vector.shape == (28,)
@@ -0,0 +1,116 @@
+import io
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from core import SimpleAgroVisionModel
+from streaming import analyze_strips, resample_strips
+
+
+def _reference(array: np.ndarray) -> np.ndarray:
+    return np.asarray(Image.fromarray(array).resize((256, 256), Image.BICUBIC))
+
+
+@pytest.mark.parametrize(
+    "width, height, rows",
+    [
+        (1000, 1000, 64),
+        (4000, 300, 17),
+        (300, 4000, 1),
+        (3000, 7, 3),
+        # Mais de 100x mais altas que largas: o Pillow faz a vertical primeiro
+        (7, 3000, 64),
+        (20, 3000, 7),
+        (128, 20000, 500),
+        (256, 30000, 100),
+    ],
+)
+def test_strip_resampler_matches_pillow_bicubic(width, height, rows):
+    array = np.random.default_rng(width + height).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    strips = (array[y:y + rows] for y in range(0, height, rows))
+    resized = np.concatenate(list(resample_strips(strips, width, height, (256, 256))))
+    np.testing.assert_array_equal(resized, _reference(array))
+
+
+def test_analyze_strips_matches_full_image_features():
+    array = np.random.default_rng(0).integers(0, 256, (900, 700, 3), dtype=np.uint8)
+    model = SimpleAgroVisionModel()
+    strips = (array[y:y + 64] for y in range(0, 900, 64))
+    img_array, features, label, _, status = analyze_strips(strips, 700, 900, model)
+
+    expected = model.preprocess_image(Image.fromarray(array))
+    np.testing.assert_array_equal(img_array, expected)
+    assert features == pytest.approx(model.extract_color_features(expected), abs=1e-12)
+    assert (label, status) == tuple(model.classify(expected)[i] for i in (0, 2))
+
+
+def test_fast_ingest_drafts_large_jpeg_before_streaming():
+    array = np.random.default_rng(1).integers(0, 256, (3000, 4000, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, "JPEG")
+    model = SimpleAgroVisionModel(fast_ingest=True)
+
+    drafted = model.draft_on_decode(Image.open(io.BytesIO(buffer.getvalue())))
+    assert drafted.width * drafted.height < array.shape[0] * array.shape[1] // 4
+    # Reduzir duas vezes (draft aqui e em preprocess_image) não muda o resultado
+    np.testing.assert_array_equal(
+        model.preprocess_image(drafted), model.preprocess_image(Image.open(io.BytesIO(buffer.getvalue())))
+    )
+
+
+# VmHWM (pico de RSS do processo), e não ru_maxrss, que o filho herda do pytest
+_PEAK_RSS_SCRIPT = """
+import sys
+from PIL import Image
+from streaming import preprocess_in_strips
+from core import SimpleAgroVisionModel
+
+def peak_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+path, mode, budget = sys.argv[1], sys.argv[2], int(sys.argv[3])
+Image.open(path).close()
+base = peak_mb()
+with Image.open(path) as image:
+    if mode == "strips":
+        preprocess_in_strips(image, budget)
+    else:
+        SimpleAgroVisionModel().preprocess_image(image)
+print(peak_mb() - base)
+"""
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="VmHWM só no Linux")
+def test_peak_rss_of_strip_analysis(tmp_path):
+    height, width = 3000, 4000
+    # O Pillow guarda RGB com 4 bytes por pixel
+    decoded_mb = height * width * 4 / 2**20
+    budget = 4 * 2**20
+    array = np.zeros((height, width, 3), dtype=np.uint8)
+    array[:, : width // 2] = (60, 140, 50)
+    array[::7] = 200
+    paths = {}
+    for ext in ("tif", "png"):
+        paths[ext] = str(tmp_path / f"grande.{ext}")
+        Image.fromarray(array).save(paths[ext], **({"compress_level": 1} if ext == "png" else {}))
+
+    def peak_growth(path: str, mode: str) -> float:
+        src = os.path.join(os.path.dirname(__file__), "..", "src")
+        output = subprocess.run(
+            [sys.executable, "-c", _PEAK_RSS_SCRIPT, path, mode, str(budget)],
+            check=True, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": src},
+        ).stdout
+        return float(output)
+
+    # TIFF sem compressão: lido faixa a faixa, o pico fica na ordem do orçamento
+    assert peak_growth(paths["tif"], "strips") < 4 * budget / 2**20
+    # PNG: a imagem decodificada fica inteira na memória (limitação documentada);
+    # as faixas só evitam a cópia RGB e os temporários do resize
+    png_strips = peak_growth(paths["png"], "strips")
+    assert png_strips < decoded_mb + 4 * budget / 2**20
+    assert png_strips < peak_growth(paths["png"], "full")